@@ -0,0 +1 @@
+"""Performance benchmarks for django_sample_app (not collected by pytest)."""
@@ -0,0 +1,135 @@
+"""Measure the latency of a freshly started worker, with and without warm-up.
+
+Seeds a throwaway SQLite database (or uses ``--database-url``), then starts
+each server with one worker ``--starts`` times per warm-up setting. After the
+port accepts connections and the worker has had ``--settle`` seconds to boot
+(and warm up), it times the first request on a new connection and the
+``--requests`` that follow. Prints one JSON document, e.g.::
+
+    python -m benchmarks.cold_start --starts 5 --servers wsgi-gunicorn
+
+``first`` is what the first user after a deploy or worker recycle sees;
+``steady`` is the same worker once everything is loaded.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.serve_compare import (
+    BASE_DIR,
+    SERVERS,
+    free_port,
+    seed_database,
+    wait_for,
+)
+from benchmarks.stats import summarise
+
+
+def get(port: int, path: str) -> float:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        started = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"{path}: HTTP {response.status}")
+    return elapsed
+
+
+def start_once(name: str, env: dict[str, str], args) -> dict[str, object]:
+    port = free_port()
+    command = [part.format(port=port, workers=1) for part in SERVERS[name]]
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        command,
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port, timeout=60)
+        listening = time.perf_counter() - started
+        time.sleep(args.settle)
+        first = get(port, args.path)
+        steady = [get(port, args.path) for _ in range(args.requests)]
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return {"listening": listening, "first": first, "steady": steady}
+
+
+def bench(name: str, env: dict[str, str], args) -> dict:
+    runs = [start_once(name, env, args) for _ in range(args.starts)]
+    return {
+        "listening": summarise([run["listening"] for run in runs]),
+        "first": summarise([run["first"] for run in runs]),
+        "steady": summarise([value for run in runs for value in run["steady"]]),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--starts", type=int, default=5, help="Per configuration.")
+    parser.add_argument("--requests", type=int, default=20, help="After the first.")
+    parser.add_argument("--path", default="/", help="URL path to request.")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds between the port opening and the first request.",
+    )
+    parser.add_argument(
+        "--servers", nargs="+", choices=sorted(SERVERS), default=sorted(SERVERS)
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Use this (already migrated and seeded) database instead of a "
+        "throwaway SQLite file, e.g. PostgreSQL with DJANGO_DB_POOL.",
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": args.database_url or f"sqlite:///{tmpdir}/bench.sqlite3",
+            "DJANGO_DEBUG": "False",
+            "DJANGO_SECRET_KEY": "benchmark-only-secret-key",
+            "DJANGO_ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "DJANGO_STATICFILES_MANIFEST": "False",
+            # A cold start should not be served from the page cache.
+            "DJANGO_TASKS_PAGE_CACHE_TIMEOUT": "0",
+        }
+        if not args.database_url:
+            seed_database(env, args.rows)
+        results = {
+            "rows": None if args.database_url else args.rows,
+            "starts": args.starts,
+            "path": args.path,
+            "servers": {
+                name: {
+                    setting: bench(name, {**env, "DJANGO_TASKS_WARMUP": flag}, args)
+                    for setting, flag in (("cold", "False"), ("warm", "True"))
+                }
+                for name in args.servers
+            },
+        }
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
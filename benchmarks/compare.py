@@ -0,0 +1,74 @@
+"""Compare two :mod:`benchmarks.run` reports endpoint by endpoint.
+
+Prints p50/p95/p99 and throughput side by side with the relative change and
+exits with status 1 when any endpoint's p95 regressed by more than
+``--threshold`` percent, so it can gate a CI job::
+
+    python -m benchmarks.compare before.json after.json --threshold 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(before: dict, after: dict, threshold: float) -> tuple[list[str], bool]:
+    lines = [
+        f"before: {before['meta']['commit']}  after: {after['meta']['commit']}  "
+        f"dataset: {after['meta']['dataset']}"
+    ]
+    regressed = False
+    for mode, endpoints in after["results"].items():
+        baseline = before["results"].get(mode, {})
+        lines.append(f"\n[{mode}]")
+        lines.append(
+            f"{'endpoint':<18}" + "".join(f"{metric:>22}" for metric in METRICS)
+        )
+        for name, stats in endpoints.items():
+            old = baseline.get(name)
+            if old is None:
+                continue
+            cells = []
+            for metric in METRICS:
+                delta = change(old[metric], stats[metric])
+                cells.append(f"{old[metric]:>8} → {stats[metric]:<8}{delta:+5.0f}%")
+            if change(old["p95_ms"], stats["p95_ms"]) > threshold:
+                regressed = True
+                cells.append("  REGRESSION")
+            lines.append(f"{name:<18}" + "".join(f"{cell:>22}" for cell in cells))
+    return lines, regressed
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Allowed p95 increase in percent (default: %(default)s).",
+    )
+    args = parser.parse_args(argv)
+    before, after = (
+        json.loads(Path(path).read_text(encoding="utf-8"))
+        for path in (args.before, args.after)
+    )
+    if before["meta"]["rows"] != after["meta"]["rows"]:
+        sys.stderr.write("warning: the reports were measured on different datasets\n")
+    lines, regressed = compare(before, after, args.threshold)
+    print("\n".join(lines))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
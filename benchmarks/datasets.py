@@ -0,0 +1,210 @@
+"""Seeded ``Task`` datasets with realistic Japanese titles.
+
+The same ``--size`` and ``--seed`` always produce the same rows, so reports
+from different commits are measured against identical data::
+
+    python -m benchmarks.datasets --size 1m
+
+The tasks of the target database are replaced, so it defaults to the same
+``.benchmarks/tasks-<size>-<seed>.sqlite3`` file that ``benchmarks.run``
+uses; ``DATABASE_URL`` and ``.env`` are ignored and another database has to
+be named with ``--database-url``.
+
+Rows are inserted with ``executemany`` in batches. The search index objects
+are dropped first and rebuilt once at the end, which is much faster than
+maintaining them row by row.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / ".benchmarks"
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_DONE_RATIO = 0.35
+EPOCH = datetime(2026, 1, 1, tzinfo=UTC)
+
+PREFIXES = [
+    "週次",
+    "月次",
+    "四半期",
+    "新規",
+    "既存",
+    "顧客",
+    "社内",
+    "採用",
+    "経理",
+    "営業",
+    "開発",
+    "インフラ",
+]
+NOUNS = [
+    "会議",
+    "資料",
+    "議事録",
+    "見積",
+    "提案書",
+    "契約書",
+    "請求書",
+    "マニュアル",
+    "サーバー",
+    "データベース",
+    "デプロイ",
+    "テスト",
+    "レビュー",
+    "問い合わせ",
+    "ログ",
+    "バックアップ",
+]
+ACTIONS = [
+    "を作成",
+    "を確認",
+    "を修正",
+    "を送付",
+    "を更新",
+    "を準備",
+    "をレビュー",
+    "を整理",
+    "の打ち合わせ",
+    "の手配",
+]
+DETAILS = [
+    "期限は今週中",
+    "担当者と相談してから進める",
+    "前回の指摘事項を反映する",
+    "関係部署に共有する",
+    "優先度高め",
+    "",
+    "",
+]
+
+
+def parse_size(value: str) -> int:
+    try:
+        return SIZES.get(value.lower()) or int(value.replace("_", ""))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"unknown size: {value}") from exc
+
+
+def database_url(dataset: str, seed: int, url: str | None = None) -> str:
+    """``url``, or the dataset's own SQLite file under ``.benchmarks/``."""
+    if url:
+        return url
+    DATA_DIR.mkdir(exist_ok=True)
+    return f"sqlite:///{DATA_DIR / f'tasks-{dataset}-{seed}.sqlite3'}"
+
+
+def generate(
+    size: int, *, seed: int = 42, done_ratio: float = DEFAULT_DONE_RATIO
+) -> Iterator[tuple]:
+    """Yield ``(title, description, is_done, created_at, updated_at)`` rows."""
+    rng = random.Random(seed)
+    # Spread creation times over a year, oldest first, a few seconds apart.
+    step = timedelta(days=365) / max(size, 1)
+    created_at = EPOCH - timedelta(days=365)
+    for number in range(1, size + 1):
+        created_at += step * rng.uniform(0.5, 1.5)
+        is_done = rng.random() < done_ratio
+        updated_at = created_at
+        if is_done:
+            updated_at += timedelta(hours=rng.uniform(1, 24 * 14))
+        # The number keeps titles unique under the case-insensitive constraint.
+        title = (
+            f"{rng.choice(PREFIXES)}{rng.choice(NOUNS)}{rng.choice(ACTIONS)} #{number}"
+        )
+        yield title, rng.choice(DETAILS), is_done, created_at, updated_at
+
+
+def load(
+    size: int,
+    *,
+    seed: int = 42,
+    done_ratio: float = DEFAULT_DONE_RATIO,
+    batch_size: int = 5000,
+    using: str = "default",
+    log=None,
+) -> int:
+    """Replace every task in ``using`` with the generated dataset."""
+    from django.db import connections, transaction
+
+    from django_sample_app.tasks import cache as page_cache
+    from django_sample_app.tasks import counters, search
+    from django_sample_app.tasks.models import Task
+
+    connection = connections[using]
+    table = connection.ops.quote_name(Task._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (title, description, is_done, created_at, updated_at) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    search.uninstall(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table}")
+    rows = generate(size, seed=seed, done_ratio=done_ratio)
+    inserted = 0
+    started = time.perf_counter()
+    while batch := list(itertools.islice(rows, batch_size)):
+        batch = [(*row[:3], adapt(row[3]), adapt(row[4])) for row in batch]
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        inserted += len(batch)
+        if log and inserted % (batch_size * 20) == 0:
+            rate = inserted / (time.perf_counter() - started)
+            log(f"{inserted:,} rows ({rate:,.0f} rows/s)")
+    search.install(connection)
+    # Raw inserts bypass the counter hooks.
+    counters.reconcile(using)
+    page_cache.bump_version(using)
+    return inserted
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", default="10k", help="10k, 1m, 10m or a row count (default: 10k)."
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--database-url",
+        help="Database whose tasks are replaced "
+        "(default: a SQLite file in .benchmarks/).",
+    )
+    parser.add_argument("--done-ratio", type=float, default=DEFAULT_DONE_RATIO)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    try:
+        size = parse_size(args.size)
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+
+    os.environ["DATABASE_URL"] = database_url(args.size, args.seed, args.database_url)
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_sample_app.settings")
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    started = time.perf_counter()
+    count = load(
+        size,
+        seed=args.seed,
+        done_ratio=args.done_ratio,
+        batch_size=args.batch_size,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    print(f"{count:,} tasks in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Drive the task URLs and report throughput and latency percentiles as JSON.
+
+Seeds (or reuses) a dataset from :mod:`benchmarks.datasets`, then requests the
+real URLs one at a time: ``tasks:list`` with status/q/page combinations and a
+create -> update -> toggle -> delete cycle on tasks created by the run itself,
+so the dataset is unchanged afterwards. Each mode drives the same scenario:
+
+- ``client``: ``django.test.Client``, no HTTP server (request handling only);
+- ``wsgi``: an in-process ``wsgiref`` server on a free port;
+- ``asgi``: an in-process uvicorn server (requires ``uvicorn``).
+
+Redirects are not followed. Reports carry the commit and settings they were
+measured with; compare two of them with :mod:`benchmarks.compare`::
+
+    python -m benchmarks.run --dataset 10k --mode client --mode wsgi -o after.json
+    python -m benchmarks.compare before.json after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlencode
+
+from benchmarks.datasets import database_url, parse_size
+from benchmarks.stats import summarise
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODES = ("client", "wsgi", "asgi")
+LIST_CASES = {
+    "list": {},
+    "list_open": {"status": "open"},
+    "list_done": {"status": "done"},
+    "list_search": {"q": "会議"},
+    "list_search_open": {"status": "open", "q": "資料を作成"},
+    "list_page_5": {"page": "5"},
+    "list_page_last": {"page": "last"},
+}
+# Cookie-stored flash messages pile up when redirects are not followed.
+DROPPED_COOKIES = {"messages"}
+
+
+class ClientDriver:
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client()
+
+    def request(self, method, path, data=None) -> int:
+        if method == "GET":
+            response = self.client.get(path)
+        else:
+            response = self.client.post(path, data or {})
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        for name in DROPPED_COOKIES:
+            self.client.cookies.pop(name, None)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Minimal keep-alive HTTP client with a cookie jar and CSRF header."""
+
+    def __init__(self, port: int):
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        self.cookies: dict[str, str] = {}
+
+    def request(self, method, path, data=None) -> int:
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if method == "POST":
+            body = urlencode(data or {})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["X-CSRFToken"] = self.cookies.get("csrftoken", "")
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel.value and name not in DROPPED_COOKIES:
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+        if response.getheader("Connection", "").lower() == "close":
+            self.connection.close()
+        return response.status
+
+    def close(self):
+        self.connection.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class WSGIServer:
+    def __enter__(self):
+        from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = make_server(
+            "127.0.0.1", 0, get_wsgi_application(), handler_class=QuietHandler
+        )
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class ASGIServer:
+    def __enter__(self):
+        import uvicorn
+        from django.core.asgi import get_asgi_application
+
+        self.port = free_port()
+        config = uvicorn.Config(
+            get_asgi_application(),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            lifespan="off",
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def run_scenario(driver, requests: int, warmup: int, run_id: str) -> dict:
+    from django_sample_app.tasks.models import Task
+
+    samples: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+
+    def timed(name, method, path, data=None, expect=200):
+        started = time.perf_counter()
+        status = driver.request(method, path, data)
+        elapsed = time.perf_counter() - started
+        if status == expect:
+            samples.setdefault(name, []).append(elapsed)
+        else:
+            errors[name] = errors.get(name, 0) + 1
+
+    for _ in range(warmup):
+        driver.request("GET", "/")
+    for name, params in LIST_CASES.items():
+        path = "/?" + urlencode(params) if params else "/"
+        for _ in range(requests):
+            timed(name, "GET", path)
+
+    prefix = f"ベンチマーク {run_id}"
+    for number in range(requests):
+        title = f"{prefix} {number}"
+        timed("create", "POST", "/create/", {"title": title}, expect=302)
+    pks = list(
+        Task.objects.filter(title__startswith=prefix).values_list("pk", flat=True)
+    )
+    for pk in pks:
+        data = {"title": f"{prefix} 更新 {pk}", "description": "ベンチマーク"}
+        timed("update", "POST", f"/{pk}/update/", data, expect=302)
+    for pk in pks:
+        timed("toggle", "POST", f"/{pk}/toggle/", expect=302)
+    for pk in pks:
+        timed("delete", "POST", f"/{pk}/delete/", expect=302)
+
+    names = [*LIST_CASES, "create", "update", "toggle", "delete"]
+    return {
+        name: {
+            **summarise(samples.get(name, []), sum(samples.get(name, []))),
+            "errors": errors.get(name, 0),
+        }
+        for name in names
+    }
+
+
+def run_mode(mode: str, args, run_id: str) -> dict:
+    if mode == "client":
+        driver = ClientDriver()
+        try:
+            return run_scenario(driver, args.requests, args.warmup, run_id)
+        finally:
+            driver.close()
+    server_class = WSGIServer if mode == "wsgi" else ASGIServer
+    with server_class() as server:
+        driver = HTTPDriver(server.port)
+        try:
+            return run_scenario(driver, args.requests, args.warmup, run_id)
+        finally:
+            driver.close()
+
+
+def git_commit() -> str:
+    def git(*command):
+        return subprocess.run(
+            ["git", *command], cwd=BASE_DIR, capture_output=True, text=True
+        )
+
+    commit = git("rev-parse", "--short", "HEAD").stdout.strip() or "unknown"
+    if git("diff", "--quiet", "HEAD").returncode:
+        commit += "-dirty"
+    return commit
+
+
+def configure(args) -> None:
+    """Point settings at the benchmark database before Django is set up."""
+    os.environ["DATABASE_URL"] = database_url(
+        args.dataset, args.seed, args.database_url
+    )
+    os.environ["DJANGO_DEBUG"] = "False"
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark-only-secret-key")
+    os.environ["DJANGO_ALLOWED_HOSTS"] = "testserver,127.0.0.1,localhost"
+    # Static files are not measured; skip the collectstatic requirement.
+    os.environ.setdefault("DJANGO_STATICFILES_MANIFEST", "False")
+    if args.no_page_cache:
+        os.environ["DJANGO_TASKS_PAGE_CACHE_TIMEOUT"] = "0"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_sample_app.settings")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", default="10k", help="10k, 1m, 10m or a count.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--database-url",
+        help="Database to seed and use (default: a SQLite file in .benchmarks/). "
+        "Its tasks are replaced by the dataset.",
+    )
+    parser.add_argument(
+        "--mode", dest="modes", action="append", choices=MODES, help="Repeatable."
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Per endpoint.")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--no-page-cache", action="store_true")
+    parser.add_argument("-o", "--output", help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+    args.modes = args.modes or ["client"]
+    size = parse_size(args.dataset)
+
+    configure(args)
+    import django
+
+    django.setup()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    from benchmarks import datasets
+    from django_sample_app.tasks.models import Task
+
+    call_command("migrate", verbosity=0)
+    if Task.objects.count() != size:
+        print(f"Seeding {size:,} tasks...", file=sys.stderr)
+        datasets.load(size, seed=args.seed, log=lambda m: print(m, file=sys.stderr))
+
+    run_id = f"{os.getpid()}-{time.time_ns()}"
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "dataset": args.dataset,
+            "rows": size,
+            "seed": args.seed,
+            "database": connection.vendor,
+            "pagination": settings.TASKS_PAGINATION,
+            "page_cache": settings.TASKS_PAGE_CACHE_TIMEOUT > 0,
+            "requests_per_endpoint": args.requests,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "results": {mode: run_mode(mode, args, run_id) for mode in args.modes},
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main()
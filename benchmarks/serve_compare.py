@@ -0,0 +1,183 @@
+"""Compare WSGI (gunicorn) and ASGI (uvicorn) throughput and latency.
+
+Seeds a throwaway SQLite database through ``manage.py import_tasks``, starts
+each server on a free port, warms it up and then replays the task list URLs
+from a pool of keep-alive client threads. Prints one JSON document with
+requests/s and p50/p95/p99 latency per server and path, e.g.::
+
+    python -m benchmarks.serve_compare --requests 2000 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.stats import summarise
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATHS = ["/", "/?status=open", "/?q=%E8%B3%87%E6%96%99", "/?page=5"]
+SERVERS = {
+    "wsgi-gunicorn": [
+        "gunicorn",
+        "django_sample_app.wsgi:application",
+        "--workers",
+        "{workers}",
+        "--bind",
+        "127.0.0.1:{port}",
+    ],
+    "asgi-uvicorn": [
+        "uvicorn",
+        "django_sample_app.asgi:application",
+        "--workers",
+        "{workers}",
+        "--port",
+        "{port}",
+        "--no-access-log",
+    ],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(env: dict[str, str], rows: int) -> None:
+    words = ["会議", "資料", "作成", "レビュー", "設計", "テスト", "docs", "deploy"]
+    with tempfile.NamedTemporaryFile("w", suffix=".ndjson", delete=False) as fh:
+        for idx in range(rows):
+            title = f"{words[idx % len(words)]}{words[idx * 7 % len(words)]} {idx}"
+            fh.write(json.dumps({"title": title, "is_done": idx % 3 == 0}) + "\n")
+    manage = [sys.executable, str(BASE_DIR / "manage.py")]
+    subprocess.run([*manage, "migrate", "-v0"], env=env, check=True)
+    subprocess.run(
+        [*manage, "import_tasks", fh.name, "--batch-size=5000"],
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    os.unlink(fh.name)
+
+
+def wait_for(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def run_client(port: int, paths: list[str], count: int) -> list[tuple[str, float]]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    samples = []
+    for idx in range(count):
+        path = paths[idx % len(paths)]
+        started = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{path}: HTTP {response.status}")
+        samples.append((path, time.perf_counter() - started))
+        if response.getheader("Connection", "").lower() == "close":
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.close()
+    return samples
+
+
+def summarise_samples(samples: list[tuple[str, float]], elapsed: float) -> dict:
+    by_path: dict[str, list[float]] = {}
+    for path, latency in samples:
+        by_path.setdefault(path, []).append(latency)
+    return {
+        **summarise([latency for _, latency in samples], elapsed),
+        "paths": {path: summarise(values) for path, values in by_path.items()},
+    }
+
+
+def bench_server(name, env, args) -> dict:
+    port = free_port()
+    command = [part.format(port=port, workers=args.workers) for part in SERVERS[name]]
+    server = subprocess.Popen(
+        command,
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port)
+        run_client(port, args.paths, args.warmup)
+        per_client = max(1, args.requests // args.concurrency)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            futures = [
+                pool.submit(run_client, port, args.paths, per_client)
+                for _ in range(args.concurrency)
+            ]
+            samples = [sample for future in futures for sample in future.result()]
+        return summarise_samples(samples, time.perf_counter() - started)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument(
+        "--path", dest="paths", action="append", help="URL path (repeatable)."
+    )
+    parser.add_argument(
+        "--servers", nargs="+", choices=sorted(SERVERS), default=sorted(SERVERS)
+    )
+    parser.add_argument(
+        "--page-cache",
+        action="store_true",
+        help="Keep the task list page cache on (off by default to time the ORM).",
+    )
+    args = parser.parse_args(argv)
+    args.paths = args.paths or DEFAULT_PATHS
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmpdir}/bench.sqlite3",
+            "DJANGO_DEBUG": "False",
+            "DJANGO_SECRET_KEY": "benchmark-only-secret-key",
+            "DJANGO_ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "DJANGO_TASKS_PAGE_CACHE_TIMEOUT": "300" if args.page_cache else "0",
+        }
+        seed_database(env, args.rows)
+        results = {
+            "rows": args.rows,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "servers": {name: bench_server(name, env, args) for name in args.servers},
+        }
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
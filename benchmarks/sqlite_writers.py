@@ -0,0 +1,149 @@
+"""Concurrent SQLite writers: Django's defaults vs the tuned SQLite profile.
+
+Runs the same workload once per profile on a fresh database file: several
+writer processes each perform read-then-write transactions (look up the
+oldest open task, then insert a task and toggle one) while reader processes
+page through the list. Prints one JSON document with committed transactions
+per second, "database is locked" failures and p50/p99 transaction latency::
+
+    python -m benchmarks.sqlite_writers --writers 4 --transactions 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stats import percentile
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Empty pragmas are skipped by settings.sqlite_options(); "baseline" is what
+# Django does out of the box (rollback journal, deferred transactions).
+PROFILES = {
+    "baseline": {
+        "DJANGO_SQLITE_JOURNAL_MODE": "",
+        "DJANGO_SQLITE_SYNCHRONOUS": "",
+        "DJANGO_SQLITE_MMAP_SIZE": "",
+        "DJANGO_SQLITE_CACHE_SIZE": "",
+        "DJANGO_SQLITE_TEMP_STORE": "",
+        "DJANGO_SQLITE_BUSY_TIMEOUT": "5000",
+        "DJANGO_SQLITE_IMMEDIATE_TRANSACTIONS": "False",
+    },
+    "tuned": {},
+}
+
+
+def run_worker(role: str, worker: int, count: int) -> dict:
+    """Body of one worker process; settings come from the environment."""
+    import django
+
+    django.setup()
+    from django.db import OperationalError, transaction
+
+    from django_sample_app.tasks.models import Task
+
+    latencies, failures = [], 0
+    for idx in range(count):
+        started = time.perf_counter()
+        try:
+            if role == "writer":
+                with transaction.atomic():
+                    oldest = Task.objects.filter(is_done=False).order_by("pk").first()
+                    Task.objects.create(title=f"writer {worker} task {idx}")
+                    if oldest is not None:
+                        Task.objects.filter(pk=oldest.pk).update(is_done=True)
+            else:
+                list(Task.objects.filter_list("open")[:10])
+        except OperationalError:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return {"role": role, "latencies": latencies, "failures": failures}
+
+
+def run_profile(name: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {
+            **os.environ,
+            **PROFILES[name],
+            "DJANGO_SETTINGS_MODULE": "django_sample_app.settings",
+            "DATABASE_URL": f"sqlite:///{tmpdir}/bench.sqlite3",
+        }
+        subprocess.run(
+            [sys.executable, str(BASE_DIR / "manage.py"), "migrate", "-v0"],
+            env=env,
+            check=True,
+        )
+        roles = ["writer"] * args.writers + ["reader"] * args.readers
+        started = time.perf_counter()
+        procs = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.sqlite_writers",
+                    "--worker",
+                    role,
+                    str(worker),
+                    str(args.transactions),
+                ],
+                cwd=BASE_DIR,
+                env=env,
+                stdout=subprocess.PIPE,
+            )
+            for worker, role in enumerate(roles)
+        ]
+        results = [json.loads(proc.communicate()[0]) for proc in procs]
+        elapsed = time.perf_counter() - started
+
+    summary = {}
+    for role in ("writer", "reader"):
+        latencies = [v for r in results if r["role"] == role for v in r["latencies"]]
+        summary[role + "s"] = {
+            "committed": len(latencies),
+            "locked_errors": sum(r["failures"] for r in results if r["role"] == role),
+            "per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    summary["elapsed_s"] = round(elapsed, 2)
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument(
+        "--transactions", type=int, default=300, help="Per worker process."
+    )
+    parser.add_argument(
+        "--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES)
+    )
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        role, worker, count = args.worker
+        json.dump(run_worker(role, int(worker), int(count)), sys.stdout)
+        return
+
+    results = {
+        "writers": args.writers,
+        "readers": args.readers,
+        "transactions": args.transactions,
+        "profiles": {name: run_profile(name, args) for name in args.profiles},
+    }
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Latency summaries shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import statistics
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def summarise(latencies: list[float], elapsed: float | None = None) -> dict:
+    """Return the request count, p50/p95/p99 in ms and, given ``elapsed``, rps."""
+    summary = {"requests": len(latencies)}
+    if elapsed is not None:
+        summary["rps"] = round(len(latencies) / elapsed, 1) if elapsed else 0.0
+    summary.update(
+        p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 99) * 1000, 2),
+    )
+    return summary
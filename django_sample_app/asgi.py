@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_sample_app.settings")
+# Lets settings enable the native async task views (TASKS_ASYNC_VIEWS).
+os.environ.setdefault("DJANGO_SERVER_INTERFACE", "asgi")
 
 application = get_asgi_application()
+
+# Imported after the app registry is ready.
+from django_sample_app.tasks import warmup  # noqa: E402
+
+warmup.on_startup()
@@ -16,12 +16,16 @@ import os
 from pathlib import Path
 
 import dj_database_url
-from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-load_dotenv(BASE_DIR / ".env")
+# Deployments usually pass real environment variables and ship no .env, so
+# python-dotenv (and the modules it pulls in) is only imported to read one.
+if (BASE_DIR / ".env").exists():
+    from dotenv import load_dotenv
+
+    load_dotenv(BASE_DIR / ".env")
 
 
 def env_bool(name: str, default: bool = False) -> bool:
@@ -74,7 +78,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "django_sample_app.tasks.timing.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "django_sample_app.tasks.assets.StaticAssetsMiddleware",
+    "django_sample_app.tasks.replicas.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -85,6 +92,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "django_sample_app.urls"
 
+# No explicit "loaders": Django then wraps the filesystem and app loaders in the
+# cached loader, so each template is compiled once per process.
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -100,25 +109,212 @@ TEMPLATES = [
     },
 ]
 
+# App profiles
+# "full" (default) serves everything. "lean" is for nodes that only serve the
+# task pages and reads, behind a proxy that routes /admin/ to a full node: it
+# drops the admin, auth (with the contenttypes it needs) and flash messages
+# from INSTALLED_APPS, MIDDLEWARE and the context processors, which shortens
+# worker start-up. Run migrate from a full node.
+APP_PROFILES = {
+    "full": (),
+    "lean": (
+        "django.contrib.admin",
+        "django.contrib.auth",
+        "django.contrib.contenttypes",
+        "django.contrib.messages",
+    ),
+}
+APP_PROFILE = os.getenv("DJANGO_APP_PROFILE", "full").strip().lower()
+if APP_PROFILE not in APP_PROFILES:
+    raise ValueError(f"Unknown DJANGO_APP_PROFILE: {APP_PROFILE!r}")
+
+
+def without_apps(paths: list[str], apps) -> list[str]:
+    """Drop ``paths`` that are, or live inside, one of ``apps``."""
+    return [
+        path
+        for path in paths
+        if not any(path == app or path.startswith(f"{app}.") for app in apps)
+    ]
+
+
+INSTALLED_APPS = without_apps(INSTALLED_APPS, APP_PROFILES[APP_PROFILE])
+MIDDLEWARE = without_apps(MIDDLEWARE, APP_PROFILES[APP_PROFILE])
+TEMPLATES[0]["OPTIONS"]["context_processors"] = without_apps(
+    TEMPLATES[0]["OPTIONS"]["context_processors"], APP_PROFILES[APP_PROFILE]
+)
+
 WSGI_APPLICATION = "django_sample_app.wsgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# CONN_HEALTH_CHECKS pings a reused connection (or, with the pool, one taken
+# from it) before the first query of a request, so a connection dropped by a
+# database restart or failover is replaced instead of failing the request.
+DATABASE_HEALTH_CHECKS = env_bool("DJANGO_DB_HEALTH_CHECKS", default=True)
+
 DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
         conn_max_age=600,
-        engine="django.db.backends.sqlite3",
+        conn_health_checks=DATABASE_HEALTH_CHECKS,
     )
 }
 
+# SQLite profile for concurrent workers: WAL lets readers proceed during a
+# write, BEGIN IMMEDIATE takes the write lock up front (instead of failing a
+# read-to-write upgrade with "database is locked") and busy_timeout makes
+# writers queue for it. Set a pragma's variable to an empty string to skip it.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("DJANGO_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DJANGO_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": os.getenv("DJANGO_SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)),
+    # Negative values are KiB: -20000 is about 20 MB of page cache.
+    "cache_size": os.getenv("DJANGO_SQLITE_CACHE_SIZE", "-20000"),
+    "temp_store": os.getenv("DJANGO_SQLITE_TEMP_STORE", "MEMORY"),
+}
+SQLITE_BUSY_TIMEOUT = int(os.getenv("DJANGO_SQLITE_BUSY_TIMEOUT", "5000"))
+SQLITE_IMMEDIATE_TRANSACTIONS = env_bool(
+    "DJANGO_SQLITE_IMMEDIATE_TRANSACTIONS", default=True
+)
+
+
+def sqlite_options() -> dict:
+    """Return ``OPTIONS`` applying the SQLite profile to every new connection."""
+    pragmas = []
+    for name, value in SQLITE_PRAGMAS.items():
+        value = value.strip()
+        if not value:
+            continue
+        if not value.lstrip("-").isalnum():
+            raise ValueError(f"Invalid value for SQLite pragma {name}: {value!r}")
+        pragmas.append(f"PRAGMA {name}={value};")
+    options = {"timeout": SQLITE_BUSY_TIMEOUT / 1000, "init_command": "".join(pragmas)}
+    if SQLITE_IMMEDIATE_TRANSACTIONS:
+        options["transaction_mode"] = "IMMEDIATE"
+    return options
+
+
+# PostgreSQL connection pool (Django's psycopg_pool integration, requires
+# "psycopg[pool]"). Each worker process keeps between MIN_SIZE and MAX_SIZE
+# connections open instead of one persistent connection per thread, so new
+# threads and recycled workers skip the TCP/TLS/auth handshake. Sizes are per
+# process: workers x MAX_SIZE must stay below the server's max_connections.
+DATABASE_POOL = env_bool("DJANGO_DB_POOL", default=False)
+DATABASE_POOL_OPTIONS = {
+    "min_size": int(os.getenv("DJANGO_DB_POOL_MIN_SIZE", "2")),
+    "max_size": int(os.getenv("DJANGO_DB_POOL_MAX_SIZE", "10")),
+    # Seconds a request waits for a free connection before failing.
+    "timeout": float(os.getenv("DJANGO_DB_POOL_TIMEOUT", "10")),
+    "max_idle": float(os.getenv("DJANGO_DB_POOL_MAX_IDLE", "600")),
+    "max_lifetime": float(os.getenv("DJANGO_DB_POOL_MAX_LIFETIME", "3600")),
+}
+
+
+def configure_database(database: dict) -> dict:
+    """Apply the SQLite profile, or SSL and pooling, to a ``DATABASES`` entry."""
+    engine = database["ENGINE"]
+    if engine.endswith("sqlite3"):
+        database["OPTIONS"] = sqlite_options()
+        return database
+    options = {}
+    if env_bool("DJANGO_DB_SSL", default=False):
+        options["sslmode"] = "require"
+    if DATABASE_POOL and engine.endswith("postgresql"):
+        options["pool"] = dict(DATABASE_POOL_OPTIONS)
+        # Pooled connections go back to the pool after each request.
+        database["CONN_MAX_AGE"] = 0
+    if options:
+        database["OPTIONS"] = options
+    return database
+
+
 if DATABASES["default"]["ENGINE"].endswith("sqlite3"):
     DATABASES["default"].setdefault("NAME", BASE_DIR / "db.sqlite3")
+configure_database(DATABASES["default"])
+
+# Optional read replicas (comma-separated URLs) become "replica1", "replica2",
+# ... List, search and export reads go to a healthy replica, round-robin;
+# everything else, and every request within DATABASE_REPLICA_PIN_SECONDS of
+# the same client's last write, stays on "default".
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+    filter(None, map(str.strip, os.getenv("DATABASE_REPLICA_URLS", "").split(","))),
+    start=1,
+):
+    replica = configure_database(
+        dj_database_url.parse(
+            url, conn_max_age=600, conn_health_checks=DATABASE_HEALTH_CHECKS
+        )
+    )
+    replica["TEST"] = {"MIRROR": "default"}
+    DATABASES[f"replica{number}"] = replica
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "10"))
+DATABASE_REPLICA_HEALTH_INTERVAL = int(
+    os.getenv("DATABASE_REPLICA_HEALTH_INTERVAL", "5")
+)
+DATABASE_ROUTERS = ["django_sample_app.tasks.replicas.ReplicaRouter"]
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Defaults to per-process memory. Use FileBasedCache for a cache shared by
+# local workers, or a Redis/Memcached backend shared by every app node.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", ""),
+    },
+    # Used by the "cache" and "cached_db" session stores. The default is a
+    # per-process LocMemCache, an LRU bounded by MAX_ENTRIES; use a shared
+    # backend (Redis, Memcached) once several processes serve the same users.
+    "sessions": {
+        "BACKEND": os.getenv(
+            "DJANGO_SESSION_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("DJANGO_SESSION_CACHE_LOCATION", "sessions"),
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("DJANGO_SESSION_CACHE_MAX_ENTRIES", "10000"))
+        },
+    },
+}
 
-if env_bool("DJANGO_DB_SSL", default=False):
-    DATABASES["default"]["OPTIONS"] = {"sslmode": "require"}
+# Sessions and flash messages
+# "db" is Django's default table; "cached_db" writes through to it but reads
+# from the "sessions" cache; "cache" keeps sessions in that cache only;
+# "signed_cookies" keeps no server-side state at all.
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_STORE = os.getenv("DJANGO_SESSION_STORE", "db").strip().lower()
+if SESSION_STORE not in SESSION_ENGINES:
+    raise ValueError(f"Unknown DJANGO_SESSION_STORE: {SESSION_STORE!r}")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STORE]
+SESSION_CACHE_ALIAS = "sessions"
+
+# "fallback" (default) keeps flash messages in a signed cookie and only spills
+# to the session when they do not fit; "cookie" never touches the session and
+# "session" always does.
+MESSAGE_STORAGES = {
+    "fallback": "django.contrib.messages.storage.fallback.FallbackStorage",
+    "cookie": "django.contrib.messages.storage.cookie.CookieStorage",
+    "session": "django.contrib.messages.storage.session.SessionStorage",
+}
+MESSAGE_STORE = os.getenv("DJANGO_MESSAGE_STORE", "fallback").strip().lower()
+if MESSAGE_STORE not in MESSAGE_STORAGES:
+    raise ValueError(f"Unknown DJANGO_MESSAGE_STORE: {MESSAGE_STORE!r}")
+MESSAGE_STORAGE = MESSAGE_STORAGES[MESSAGE_STORE]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -163,7 +359,110 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Hashed file names (staticfiles.json) plus .gz/.br copies written by
+# collectstatic. Defaults to on without DEBUG; collectstatic must then have run
+# before {% static %} can resolve anything.
+STATICFILES_MANIFEST = env_bool("DJANGO_STATICFILES_MANIFEST", default=not DEBUG)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django_sample_app.tasks.assets.CompressedManifestStaticFilesStorage"
+            if STATICFILES_MANIFEST
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        ),
+    },
+}
+
+# Serve STATIC_ROOT from the app process (StaticAssetsMiddleware), with
+# immutable caching for hashed names and precompressed variants.
+TASKS_SERVE_STATIC = env_bool("DJANGO_TASKS_SERVE_STATIC", default=False)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Tasks app
+# "offset" uses Django's numbered paginator; "cursor" switches TaskListView to
+# keyset pagination on (created_at, id), which skips COUNT(*) and OFFSET.
+
+TASKS_PAGINATION = os.getenv("DJANGO_TASKS_PAGINATION", "offset").strip().lower()
+
+# "auto" picks SQLite FTS5 or PostgreSQL tsvector when their index exists and
+# falls back to icontains; "sqlite-fts5", "postgres-tsvector" or "icontains"
+# force a specific backend.
+TASKS_SEARCH_BACKEND = os.getenv("DJANGO_TASKS_SEARCH_BACKEND", "auto").strip()
+
+# Seconds a rendered task list page stays cached; 0 disables the page cache.
+TASKS_PAGE_CACHE_TIMEOUT = int(os.getenv("DJANGO_TASKS_PAGE_CACHE_TIMEOUT", "300"))
+TASKS_PAGE_CACHE_ALIAS = "default"
+
+# Route the list, row fragment and toggle URLs to the native async views.
+# Enabled automatically when the process was started through asgi.py.
+TASKS_ASYNC_VIEWS = env_bool(
+    "DJANGO_TASKS_ASYNC_VIEWS",
+    default=os.getenv("DJANGO_SERVER_INTERFACE") == "asgi",
+)
+
+# Push task changes to open list pages over Server-Sent Events (/events/).
+# Needs the ASGI app: each open page holds one connection. The backend carries
+# events between processes; LocalBackend only reaches the current process.
+# RedisBackend needs the "redis" extra (uv sync --extra redis).
+TASKS_EVENTS = env_bool("DJANGO_TASKS_EVENTS", default=TASKS_ASYNC_VIEWS)
+TASKS_EVENTS_BACKEND = os.getenv(
+    "DJANGO_TASKS_EVENTS_BACKEND", "django_sample_app.tasks.events.LocalBackend"
+)
+TASKS_EVENTS_REDIS_URL = os.getenv(
+    "DJANGO_TASKS_EVENTS_REDIS_URL", "redis://127.0.0.1:6379/0"
+)
+# Undelivered events kept per connection before it is told to reload instead.
+TASKS_EVENTS_MAX_PENDING = int(os.getenv("DJANGO_TASKS_EVENTS_MAX_PENDING", "32"))
+TASKS_EVENTS_HEARTBEAT = float(os.getenv("DJANGO_TASKS_EVENTS_HEARTBEAT", "15"))
+
+# Background jobs, run by "manage.py run_workers". Bulk actions on more than
+# TASKS_JOBS_INLINE_LIMIT tasks are queued instead of run in the request (0
+# keeps them inline). Export files are written to TASKS_JOBS_DIR. A failed
+# job is retried after TASKS_JOBS_RETRY_DELAY seconds, doubled per attempt; a
+# running job without progress for TASKS_JOBS_STALE_AFTER seconds is requeued.
+TASKS_JOBS_INLINE_LIMIT = int(os.getenv("DJANGO_TASKS_JOBS_INLINE_LIMIT", "1000"))
+TASKS_JOBS_DIR = Path(os.getenv("DJANGO_TASKS_JOBS_DIR", BASE_DIR / "var" / "jobs"))
+TASKS_JOBS_MAX_ATTEMPTS = int(os.getenv("DJANGO_TASKS_JOBS_MAX_ATTEMPTS", "3"))
+TASKS_JOBS_RETRY_DELAY = float(os.getenv("DJANGO_TASKS_JOBS_RETRY_DELAY", "10"))
+TASKS_JOBS_POLL_INTERVAL = float(os.getenv("DJANGO_TASKS_JOBS_POLL_INTERVAL", "1"))
+TASKS_JOBS_STALE_AFTER = int(os.getenv("DJANGO_TASKS_JOBS_STALE_AFTER", "300"))
+
+# Warm each server worker up before it accepts traffic (gunicorn.conf.py and
+# asgi.py): open database connections (fill the pool), load the URLconf and
+# templates and render the task list once. See tasks/warmup.py.
+TASKS_WARMUP = env_bool("DJANGO_TASKS_WARMUP", default=not DEBUG)
+
+# Fraction of requests (0.0-1.0) timed by RequestTimingMiddleware: a
+# Server-Timing header (db/tpl/total) and one JSON log line each. Sampled
+# requests slower than TASKS_TIMING_SLOW_MS are logged with their SQL.
+TASKS_TIMING_SAMPLE_RATE = float(os.getenv("DJANGO_TASKS_TIMING_SAMPLE_RATE", "0"))
+TASKS_TIMING_SLOW_MS = int(os.getenv("DJANGO_TASKS_TIMING_SLOW_MS", "500"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "django_sample_app.tasks.timing": {
+            "handlers": ["console"],
+            "level": os.getenv("DJANGO_TASKS_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "django_sample_app.tasks.warmup": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "django_sample_app.tasks.jobs": {
+            "handlers": ["console"],
+            "level": os.getenv("DJANGO_TASKS_JOBS_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
@@ -1,10 +1,89 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.template.response import TemplateResponse
 
+from . import bulk, counters
 from .models import Task
+from .pagination import WindowedPaginator
+
+
+class TaskChangeList(ChangeList):
+    """Changelist whose unfiltered totals come from the task counters."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        if not self.queryset.query.where:
+            # The paginator's count already came from the counters.
+            self.full_result_count = self.result_count
+        else:
+            counts = counters.get(self.root_queryset.db)
+            self.full_result_count = (
+                counts.total if counts else self.root_queryset.count()
+            )
+        self.show_full_result_count = True
+        self.show_admin_actions = bool(self.full_result_count)
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "is_done", "created_at")
+    list_display = ("id", "title", "is_done", "created_at", "updated_at")
     search_fields = ("title", "description")
     list_filter = ("is_done", "created_at")
+    actions = ["mark_done", "mark_open", "delete_in_chunks"]
+    paginator = WindowedPaginator
+    # TaskChangeList fills in the total without ChangeList's COUNT(*).
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return TaskChangeList
+
+    def get_paginator(self, request, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(request, queryset, per_page, **kwargs)
+        if not queryset.query.where:
+            counts = counters.get(queryset.db)
+            if counts is not None:
+                paginator.count = counts.total
+        return paginator
+
+    @admin.action(description="選択したタスクを完了にする", permissions=["change"])
+    def mark_done(self, request, queryset):
+        count = bulk.set_done(queryset, is_done=True)
+        self.message_user(request, f"{count}件のタスクを完了にしました。")
+
+    @admin.action(description="選択したタスクを未完了に戻す", permissions=["change"])
+    def mark_open(self, request, queryset):
+        count = bulk.set_done(queryset, is_done=False)
+        self.message_user(request, f"{count}件のタスクを未完了に戻しました。")
+
+    @admin.action(
+        description="選択したタスクを削除する（分割実行）",
+        permissions=["delete"],
+    )
+    def delete_in_chunks(self, request, queryset):
+        """Confirm, then delete chunk by chunk with :func:`.bulk.delete_tasks`.
+
+        Unlike ``delete_selected`` the confirmation page shows the count
+        instead of collecting and listing every object, and it carries the
+        original selection (or ``select_across``) forward.
+        """
+        if request.POST.get("post"):
+            count = bulk.delete_tasks(queryset)
+            self.message_user(
+                request, f"{count}件のタスクを削除しました。", messages.SUCCESS
+            )
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "タスクの削除（分割実行）",
+            "subtitle": None,
+            "opts": self.opts,
+            "count": queryset.count(),
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+            "media": self.media,
+        }
+        return TemplateResponse(
+            request, "admin/tasks/task/delete_in_chunks_confirmation.html", context
+        )
@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class TasksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "django_sample_app.tasks"
+
+    def ready(self):
+        from . import cache, counters, events, replicas, search
+
+        task = self.get_model("Task")
+        post_save.connect(cache.bump_version, sender=task)
+        post_delete.connect(cache.bump_version, sender=task)
+        post_save.connect(counters.task_saved, sender=task)
+        post_delete.connect(counters.task_deleted, sender=task)
+        post_save.connect(events.task_saved, sender=task)
+        post_delete.connect(events.task_deleted, sender=task)
+        connection_created.connect(search.register_sqlite_functions)
+        post_migrate.connect(search.install_after_migrate, sender=self)
+        setting_changed.connect(search.reset_search_backends)
+        setting_changed.connect(replicas.reset_health)
+        setting_changed.connect(events.reset_broker)
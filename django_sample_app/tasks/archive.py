@@ -0,0 +1,140 @@
+"""Archival tier for completed tasks.
+
+``manage.py archive_tasks --older-than 90d`` moves done tasks that have not
+changed for that long from ``tasks_task`` into ``ArchivedTask``, so the hot
+table (and every index behind the list) stays proportional to open work.
+
+Tasks move in batches of primary keys: each batch is one short transaction
+that re-checks the rows, copies them with ``INSERT ... SELECT`` and deletes
+them (which also updates the task counters). An interrupted run loses at
+most the batch in flight, and running the command again simply continues.
+
+Readers opt in with ``archived=1``: :func:`union_archived` combines the done
+tasks of both tables into one queryset for the list (``status=done``) and the
+export.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import FloatField, Q, QuerySet, Value
+from django.utils import timezone
+
+from . import cache as page_cache
+from . import events
+from .bulk import iter_pk_chunks
+from .models import ArchivedTask, Task
+
+BATCH_SIZE = 500
+# Copied in this order; ArchivedTask declares its fields the same way.
+COLUMNS = ("id", "title", "description", "is_done", "created_at", "updated_at")
+TRUE_VALUES = {"1", "true", "on"}
+AGE_UNITS = {"d": "days", "h": "hours", "w": "weeks"}
+
+
+def parse_age(value: str) -> timedelta:
+    """Parse ``90d``, ``12h``, ``2w`` or a plain number of days."""
+    match = re.fullmatch(r"(\d+)([dhw]?)", value.strip())
+    if not match:
+        raise ValueError(f"Invalid age: {value!r} (use e.g. 90d, 12h or 2w).")
+    amount, unit = match.groups()
+    return timedelta(**{AGE_UNITS[unit or "d"]: int(amount)})
+
+
+def wants_archived(params) -> bool:
+    """Whether a list or export request asked for archived tasks too."""
+    return params.get("status") == "done" and params.get("archived") in TRUE_VALUES
+
+
+def union_archived(queryset: QuerySet, query: str = "") -> QuerySet:
+    """Return done ``queryset`` plus the matching archived tasks, newest first.
+
+    Rows are ``Task`` instances whose ``archived`` attribute tells the tables
+    apart. The archive has no full-text index: ``query`` matches its titles
+    and descriptions with ``icontains`` and ranks them 0.
+    """
+    hot = queryset.filter(is_done=True).order_by()
+    cold = (
+        ArchivedTask.objects.using(queryset.db)
+        .only(*COLUMNS[1:])
+        .filter(is_done=True)
+        .order_by()
+    )
+    query = (query or "").strip()
+    if "search_rank" in hot.query.annotations:
+        cold = cold.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    hot = hot.annotate(archived=Value(False))
+    cold = cold.annotate(archived=Value(True))
+    return hot.union(cold, all=True).order_by("-created_at", "-id")
+
+
+def candidates(cutoff: datetime, using: str = DEFAULT_DB_ALIAS) -> QuerySet:
+    """Done tasks last updated before ``cutoff``."""
+    return Task.objects.using(using).filter(is_done=True, updated_at__lt=cutoff)
+
+
+def _copy_sql(connection, count: int) -> str:
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(column) for column in COLUMNS)
+    placeholders = ", ".join(["%s"] * count)
+    return (
+        f"INSERT INTO {qn(ArchivedTask._meta.db_table)} "
+        f"({columns}, {qn('archived_at')}) "
+        f"SELECT {columns}, %s FROM {qn(Task._meta.db_table)} "
+        f"WHERE {qn('id')} IN ({placeholders})"
+    )
+
+
+def archive_batch(pks: list, cutoff: datetime, using: str = DEFAULT_DB_ALIAS) -> int:
+    """Move the tasks ``pks`` that still qualify; return how many moved."""
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        # A task may have been reopened or edited since it was picked.
+        pks = list(
+            Task.objects.using(using)
+            .select_for_update()
+            .filter(pk__in=pks, is_done=True, updated_at__lt=cutoff)
+            .values_list("pk", flat=True)
+        )
+        if not pks:
+            return 0
+        archived_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(_copy_sql(connection, len(pks)), [archived_at, *pks])
+        Task.objects.using(using).filter(pk__in=pks).only("pk", "is_done").delete()
+    return len(pks)
+
+
+def archive_done_tasks(
+    cutoff: datetime,
+    *,
+    batch_size: int = BATCH_SIZE,
+    using: str = DEFAULT_DB_ALIAS,
+    pause: float = 0.0,
+    log: Callable[[str], None] | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Archive done tasks last updated before ``cutoff``; return the count.
+
+    ``pause`` seconds between batches leave room for other writers.
+    ``progress`` is called with the running total after each batch, by which
+    time the batch's cache invalidation and events have been sent.
+    """
+    moved = 0
+    for pks in iter_pk_chunks(candidates(cutoff, using), batch_size):
+        with page_cache.deferred_bump(), events.collect(using):
+            moved += archive_batch(pks, cutoff, using)
+        if log:
+            log(f"{moved} archived (up to id {pks[-1]})")
+        if progress:
+            progress(moved)
+        if pause:
+            time.sleep(pause)
+    return moved
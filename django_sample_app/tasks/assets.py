@@ -0,0 +1,228 @@
+"""Build-time compressed, fingerprinted static files and in-process serving.
+
+``CompressedManifestStaticFilesStorage`` is Django's manifest storage (file
+names carry a content hash, ``{% static %}`` resolves them through
+``staticfiles.json``) that also writes ``.gz`` and, when the optional
+``brotli`` package is installed, ``.br`` copies of text assets during
+``collectstatic``.
+
+``StaticAssetsMiddleware`` serves ``STATIC_ROOT`` from the app process when
+``TASKS_SERVE_STATIC`` is on, so a node needs no nginx in front of it. The
+directory is indexed once at startup; each request picks the smallest variant
+the client accepts and hashed names get a one-year ``immutable`` cache
+lifetime. Unknown paths fall through to the URLconf.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".svg", ".json", ".txt", ".html"}
+MIN_COMPRESS_SIZE = 256
+# Extension, Content-Encoding, in order of preference.
+ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=60"
+
+
+def compress_file(path: str | os.PathLike) -> list[Path]:
+    """Write ``.gz`` (and ``.br``) next to ``path`` when they save space."""
+    path = Path(path)
+    if path.suffix not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    data = path.read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    written = []
+    for suffix, compressed in variants.items():
+        # Keep a variant only when it is meaningfully smaller.
+        if len(compressed) < len(data) * 0.95:
+            target = path.with_name(path.name + suffix)
+            target.write_bytes(compressed)
+            written.append(target)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        collected = {}
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                collected[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name, hashed_name in collected.items():
+            compress_file(self.path(name))
+            compress_file(self.path(hashed_name))
+
+
+@dataclass
+class StaticAsset:
+    path: Path
+    content_type: str
+    size: int
+    mtime: float
+    immutable: bool = False
+    # Content-Encoding -> (path, size).
+    encoded: dict[str, tuple[Path, int]] = field(default_factory=dict)
+
+    def choose(self, accept_encoding: str) -> tuple[str | None, Path, int]:
+        accepted = parse_accept_encoding(accept_encoding)
+        for _, encoding in ENCODINGS:
+            if encoding in self.encoded and accepted.get(encoding, 0) > 0:
+                return encoding, *self.encoded[encoding]
+        return None, self.path, self.size
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    if "*" in accepted:
+        for _, encoding in ENCODINGS:
+            accepted.setdefault(encoding, accepted["*"])
+    return accepted
+
+
+def load_hashed_names(root: Path) -> set[str]:
+    manifest = root / ManifestStaticFilesStorage.manifest_name
+    try:
+        return set(json.loads(manifest.read_text(encoding="utf-8"))["paths"].values())
+    except (OSError, ValueError, KeyError):
+        return set()
+
+
+def scan(root: str | os.PathLike) -> dict[str, StaticAsset]:
+    """Index every file under ``root`` by its URL path relative to it."""
+    root = Path(root)
+    hashed = load_hashed_names(root)
+    encoded_suffixes = tuple(suffix for suffix, _ in ENCODINGS)
+    assets: dict[str, StaticAsset] = {}
+    variants = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = Path(directory, filename)
+            name = path.relative_to(root).as_posix()
+            if filename.endswith(encoded_suffixes):
+                variants.append((name, path))
+                continue
+            stat = path.stat()
+            content_type, _ = mimetypes.guess_type(filename)
+            if content_type and content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            assets[name] = StaticAsset(
+                path=path,
+                content_type=content_type or "application/octet-stream",
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+                immutable=name in hashed,
+            )
+    for name, path in variants:
+        for suffix, encoding in ENCODINGS:
+            asset = assets.get(name.removesuffix(suffix))
+            if name.endswith(suffix) and asset is not None:
+                asset.encoded[encoding] = (path, path.stat().st_size)
+    return assets
+
+
+class StaticAssetsMiddleware:
+    """Serve collected static files with caching and encoding negotiation."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if (
+            not getattr(settings, "TASKS_SERVE_STATIC", False)
+            or not settings.STATIC_ROOT
+        ):
+            raise MiddlewareNotUsed
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.assets = scan(settings.STATIC_ROOT)
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def find(self, request) -> StaticAsset | None:
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if not request.path.startswith(self.prefix):
+            return None
+        return self.assets.get(request.path.removeprefix(self.prefix))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        asset = self.find(request)
+        if asset is None:
+            return self.get_response(request)
+        response, body_path = self.respond(request, asset)
+        if body_path is not None:
+            response.content = body_path.read_bytes()
+        return response
+
+    async def __acall__(self, request):
+        asset = self.find(request)
+        if asset is None:
+            return await self.get_response(request)
+        response, body_path = self.respond(request, asset)
+        if body_path is not None:
+            response.content = await sync_to_async(body_path.read_bytes)()
+        return response
+
+    def respond(self, request, asset: StaticAsset):
+        """Return the response and the file to fill its body from, if any."""
+        encoding, path, size = asset.choose(request.headers.get("Accept-Encoding", ""))
+        etag = f"{int(asset.mtime):x}-{asset.size:x}"
+        etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+        body_path = None
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content_type=asset.content_type)
+            response["Content-Length"] = str(size)
+            if encoding:
+                response["Content-Encoding"] = encoding
+            if request.method == "GET":
+                body_path = path
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(asset.mtime)
+        response["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if asset.immutable else DEFAULT_CACHE_CONTROL
+        )
+        if asset.encoded:
+            response["Vary"] = "Accept-Encoding"
+        return response, body_path
@@ -0,0 +1,163 @@
+"""Native async versions of the read-heavy and toggle views for ASGI.
+
+Served by ``django_sample_app.asgi`` (see ``TASKS_ASYNC_VIEWS``) so uvicorn
+requests stay on the event loop instead of hopping to a worker thread through
+``sync_to_async``. Reads use the async ORM (``aaggregate``, ``aget``,
+``async for``), the page cache uses the async cache API and templates are
+rendered directly, so no read blocks on a thread hop other than those the
+database driver itself needs. The session and flash messages, which the
+list reads before answering 304 and again when rendering, are loaded in one
+``sync_to_async`` call, as is the toggle's transaction (flag and counters).
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db import router
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import require_GET, require_POST
+
+from . import cache as page_cache
+from . import conditional, counters, events
+from .models import Task
+from .pagination import CursorPaginator, InvalidCursor, WindowedPaginator
+from .search import get_search_backend
+from .views import TaskListView, flip_done, toggle_response
+
+
+class AsyncTaskListView(TaskListView):
+    """Async :class:`TaskListView`: list, filters, search and both paginators."""
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        # Backend selection may introspect the database once per alias.
+        await sync_to_async(get_search_backend)(router.db_for_read(Task))
+        self.object_list = self.get_queryset()
+        if self.uses_cursor_pagination():
+            self.cursor_page = await self.apaginate_by_cursor(self.object_list)
+            self.list_state = conditional.page_state(
+                self.cursor_page, await counters.aget(self.object_list.db)
+            )
+        else:
+            self.list_state = await conditional.alist_state(
+                self.object_list, request.GET
+            )
+        etag = conditional.list_etag(
+            request.GET, self.get_pagination_mode(), self.list_state
+        )
+        last_modified = self.list_state["last_modified"]
+        await conditional.aload_messages(request)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            response = await self.arender(request)
+        return conditional.set_validators(response, etag, last_modified)
+
+    async def arender(self, request):
+        context = self.get_filter_context()
+
+        if page_cache.is_enabled():
+            key = await page_cache.apage_key(request.GET, self.get_pagination_mode())
+            results_html = await page_cache.aget_page(key)
+            self.page_cache_status = "MISS" if results_html is None else "HIT"
+            if results_html is None:
+                results_html = await self.arender_results(context)
+                await page_cache.aset_page(key, results_html)
+        else:
+            results_html = await self.arender_results(context)
+
+        context.update({"view": self, "results_html": mark_safe(results_html)})
+        response = render(request, self.template_name, context)
+        if self.page_cache_status:
+            response["X-Tasks-Cache"] = self.page_cache_status
+        return response
+
+    async def apaginate(self, queryset):
+        paginator = WindowedPaginator(queryset, self.paginate_by)
+        paginator.count = self.list_state["count"]
+        page_number = self.request.GET.get(self.page_kwarg) or 1
+        try:
+            if page_number == "last":
+                page_number = paginator.num_pages
+            page = paginator.page(page_number)
+        except (InvalidPage, ValueError) as exc:
+            raise Http404("無効なページです。") from exc
+        page.object_list = [task async for task in page.object_list]
+        return paginator, page
+
+    async def apaginate_by_cursor(self, queryset):
+        paginator = CursorPaginator(queryset, self.paginate_by)
+        try:
+            return await paginator.apage(self.request.GET.get("cursor"))
+        except InvalidCursor as exc:
+            raise Http404("無効なカーソルです。") from exc
+
+    async def arender_results(self, filters):
+        context = {**filters, "view": self, "cursor_page": None}
+        if self.uses_cursor_pagination():
+            object_list = self.cursor_page.object_list
+            context.update(
+                cursor_page=self.cursor_page,
+                paginator=None,
+                page_obj=None,
+                is_paginated=False,
+            )
+        else:
+            paginator, page = await self.apaginate(self.object_list)
+            object_list = page.object_list
+            context.update(
+                paginator=paginator,
+                page_obj=page,
+                is_paginated=page.has_other_pages(),
+                page_links=paginator.window(page.number),
+            )
+        context.update(object_list=object_list, tasks=object_list)
+        return render_to_string(self.results_template_name, context, self.request)
+
+
+@require_GET
+async def task_item(request, pk):
+    try:
+        task = await Task.objects.aget(pk=pk)
+    except Task.DoesNotExist as exc:
+        raise Http404("タスクが見つかりません。") from exc
+    return render(request, "tasks/partials/task_item.html", {"task": task})
+
+
+@require_POST
+async def toggle_done(request, pk):
+    # The flip and the counter update share a transaction, which needs the
+    # sync ORM.
+    task = await sync_to_async(flip_done)(pk)
+    if task is None:
+        raise Http404("タスクが見つかりません。")
+    await page_cache.abump_version()
+    return toggle_response(request, task)
+
+
+@require_GET
+async def task_events(request):
+    """Stream task changes to an open list page as Server-Sent Events."""
+    if not settings.TASKS_EVENTS:
+        # 204 tells EventSource to stop reconnecting.
+        return HttpResponse(status=204)
+
+    async def stream():
+        broker = events.get_broker()
+        subscription = broker.subscribe()
+        try:
+            async for frame in events.stream(
+                subscription, settings.TASKS_EVENTS_HEARTBEAT
+            ):
+                yield frame
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep reverse proxies (nginx) from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,178 @@
+"""Query budgets for the task views, enforced by the test suite.
+
+:class:`query_budget` is a context manager and decorator that fails when the
+block runs more queries, or spends longer in the database, than allowed.
+Queries are captured with ``connection.execute_wrapper()`` (so it works with
+``DEBUG=False``) and a failure lists every statement with its duration::
+
+    with query_budget(2, ms=50):
+        client.get(reverse("tasks:list"))
+
+``URL_BUDGETS`` declares the budget of each ``tasks`` URL. The tests request
+every entry against datasets of ``DATASET_SIZES`` rows with
+:func:`assert_url_budget`, so an N+1 or an extra ``COUNT`` fails the build
+instead of only showing up in production. Counts are for a cold page cache.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import ContextDecorator
+from dataclasses import dataclass, field
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import reverse
+
+from . import cache as page_cache
+from .models import Task
+from .search import get_search_backend
+
+DATASET_SIZES = (0, 25, 250)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Fail if the block runs more than ``queries`` queries or ``ms`` of SQL."""
+
+    def __init__(self, queries, *, ms=None, using=DEFAULT_DB_ALIAS, label=None):
+        self.queries = queries
+        self.ms = ms
+        self.using = using
+        self.label = label
+
+    def __enter__(self):
+        self.captured = []
+        self.wrapper = connections[self.using].execute_wrapper(self.record)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wrapper.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.check()
+        return False
+
+    def record(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.captured.append((sql, params, time.perf_counter() - started))
+
+    @property
+    def total_ms(self) -> float:
+        return sum(duration for _, _, duration in self.captured) * 1000
+
+    def check(self) -> None:
+        problems = []
+        if len(self.captured) > self.queries:
+            problems.append(f"{len(self.captured)} queries (budget {self.queries})")
+        if self.ms is not None and self.total_ms > self.ms:
+            problems.append(f"{self.total_ms:.1f} ms of SQL (budget {self.ms} ms)")
+        if problems:
+            raise QueryBudgetExceeded(self.report(problems))
+
+    def report(self, problems) -> str:
+        lines = [f"{self.label or 'block'} exceeded its query budget: "]
+        lines[0] += ", ".join(problems)
+        for number, (sql, params, duration) in enumerate(self.captured, start=1):
+            lines.append(f"{number:>3}. [{duration * 1000:.2f} ms] {sql}")
+            if params:
+                lines.append(f"       params: {params!r}")
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class UrlBudget:
+    """Budget of one request; ``"{pk}"`` in args or params is the target task."""
+
+    url_name: str
+    queries: int
+    ms: float = 100
+    method: str = "GET"
+    args: tuple = ()
+    params: dict = field(default_factory=dict)
+    status: int = 200
+    name: str = ""
+
+    @property
+    def label(self) -> str:
+        return self.name or self.url_name
+
+    def request(self, client, task):
+        def fill(value):
+            return str(value).format(pk=task.pk)
+
+        url = reverse(f"tasks:{self.url_name}", args=[fill(arg) for arg in self.args])
+        data = {key: fill(value) for key, value in self.params.items()}
+        if self.method == "POST":
+            return client.post(url, data)
+        return client.get(url, data)
+
+
+URL_BUDGETS = (
+    # Counters (with Max(updated_at)) and the page rows.
+    UrlBudget("list", 2),
+    UrlBudget("list", 2, params={"status": "open"}, name="list_open"),
+    # A search still counts its matches: counters, aggregate, page rows.
+    UrlBudget("list", 3, params={"q": "タスク"}, name="list_search"),
+    UrlBudget("list", 2, params={"page": "last"}, name="list_page_last"),
+    UrlBudget("item", 1, args=("{pk}",)),
+    UrlBudget("export", 1),
+    UrlBudget("create", 0, name="create_form"),
+    # Duplicate check, savepoint, insert, counter, release.
+    UrlBudget(
+        "create", 5, method="POST", params={"title": "予算内の新規タスク"}, status=302
+    ),
+    UrlBudget("update", 1, args=("{pk}",), name="update_form"),
+    # Fetch, duplicate check, savepoint, locked status, update, release.
+    UrlBudget(
+        "update",
+        6,
+        method="POST",
+        args=("{pk}",),
+        params={"title": "予算内の更新", "description": "説明"},
+        status=302,
+    ),
+    # Savepoint, update, fetch, counters, release.
+    UrlBudget("toggle", 5, method="POST", args=("{pk}",), status=302),
+    # Savepoint, id batch, nested savepoint, update, counters, release, empty
+    # batch, release.
+    UrlBudget(
+        "bulk",
+        8,
+        method="POST",
+        params={"action": "done", "ids": "{pk}"},
+        status=302,
+    ),
+    UrlBudget("jobs", 1),
+    UrlBudget("delete", 1, args=("{pk}",), name="delete_form"),
+    # Fetch, delete, counter.
+    UrlBudget("delete", 3, method="POST", args=("{pk}",), status=302),
+)
+
+
+def seed_tasks(size: int) -> None:
+    """Create ``size`` tasks, a third of them done."""
+    Task.objects.bulk_create(
+        (Task(title=f"タスク {n}", is_done=n % 3 == 0) for n in range(size)),
+        batch_size=500,
+    )
+
+
+def assert_url_budget(client, budget: UrlBudget, task: Task):
+    """Request ``budget`` against ``task`` and check its queries and status."""
+    # The search backend is resolved once per process, not per request.
+    get_search_backend()
+    page_cache.get_cache().clear()
+    with query_budget(budget.queries, ms=budget.ms, label=budget.label):
+        response = budget.request(client, task)
+        if response.streaming:
+            b"".join(response.streaming_content)
+    assert (
+        response.status_code == budget.status
+    ), f"{budget.label}: expected {budget.status}, got {response.status_code}"
+    return response
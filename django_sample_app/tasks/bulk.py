@@ -0,0 +1,182 @@
+"""Set-based task operations shared by the bulk view, admin actions and imports.
+
+Each operation touches the database in chunks of primary keys (keyset-walked,
+so memory stays flat however large the selection is), keeps the task counters
+in step within each chunk's transaction and collapses the page cache
+invalidation into a single version bump.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.db.models.functions import Lower
+
+from . import cache as page_cache
+from . import counters, events
+from .forms import (
+    DESCRIPTION_SAME_AS_TITLE_MESSAGE,
+    TITLE_MIN_LENGTH,
+    TITLE_TOO_SHORT_MESSAGE,
+)
+from .models import DUPLICATE_TITLE_MESSAGE, Task, is_duplicate_title_error
+
+CHUNK_SIZE = 500
+TITLE_MAX_LENGTH = Task._meta.get_field("title").max_length
+TITLE_TOO_LONG_MESSAGE = f"タイトルは{TITLE_MAX_LENGTH}文字以内で入力してください。"
+ACTION_MESSAGES = {
+    "done": "{count}件のタスクを完了にしました。",
+    "open": "{count}件のタスクを未完了に戻しました。",
+    "delete": "{count}件のタスクを削除しました。",
+    "create": "{count}件のタスクを作成しました。",
+}
+
+
+def iter_pk_chunks(queryset: QuerySet, chunk_size: int = CHUNK_SIZE) -> Iterator[list]:
+    """Yield lists of at most ``chunk_size`` primary keys in ascending order.
+
+    Walks ``pk > last`` instead of holding a cursor open, so rows can be
+    updated or deleted between chunks.
+    """
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(page.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+def set_done(queryset: QuerySet, is_done: bool, chunk_size: int = CHUNK_SIZE) -> int:
+    """Mark every task in ``queryset`` done/open; return the number changed."""
+    updated = 0
+    with page_cache.deferred_bump(), events.collect(queryset.db):
+        for pks in iter_pk_chunks(queryset, chunk_size):
+            with transaction.atomic(using=queryset.db):
+                # Only rows that change, so the counters can move by the count.
+                moved = Task.objects.filter(pk__in=pks, is_done=not is_done).update(
+                    is_done=is_done
+                )
+                counters.move(is_done, moved, queryset.db)
+            updated += moved
+            events.publish(events.UPDATED, pks, queryset.db)
+        if updated:
+            page_cache.bump_version(queryset.db)
+    return updated
+
+
+def delete_tasks(queryset: QuerySet, chunk_size: int = CHUNK_SIZE) -> int:
+    """Delete every task in ``queryset`` chunk by chunk; return the count."""
+    deleted = 0
+    with page_cache.deferred_bump(), events.collect(queryset.db):
+        for pks in iter_pk_chunks(queryset, chunk_size):
+            with transaction.atomic(using=queryset.db):
+                # is_done lets the post_delete receivers update the counters.
+                count, _ = (
+                    Task.objects.filter(pk__in=pks).only("pk", "is_done").delete()
+                )
+                deleted += count
+    return deleted
+
+
+@dataclass
+class CleanedRows:
+    valid: list[Task] = field(default_factory=list)
+    rejected: list[tuple[int, str]] = field(default_factory=list)
+
+
+def clean_rows(rows: Iterable[tuple[int, dict]]) -> CleanedRows:
+    """Apply TaskForm's rules to ``(row number, {"title", "description", ...})``.
+
+    Titles are stripped and length-checked, descriptions may not repeat the
+    title, and case-insensitive duplicates are rejected both within the batch
+    and against the database with one ``Lower(title) IN (...)`` query, which
+    is served by the unique index. ``rejected`` holds ``(row number, reason)``.
+    """
+    result = CleanedRows()
+    candidates: list[tuple[int, Task]] = []
+    for number, row in rows:
+        title = (row.get("title") or "").strip()
+        description = (row.get("description") or "").strip()
+        if len(title) < TITLE_MIN_LENGTH:
+            result.rejected.append((number, TITLE_TOO_SHORT_MESSAGE))
+        elif len(title) > TITLE_MAX_LENGTH:
+            result.rejected.append((number, TITLE_TOO_LONG_MESSAGE))
+        elif description and title.lower() == description.lower():
+            result.rejected.append((number, DESCRIPTION_SAME_AS_TITLE_MESSAGE))
+        else:
+            task = Task(
+                title=title,
+                description=description,
+                is_done=bool(row.get("is_done", False)),
+            )
+            candidates.append((number, task))
+
+    keys = {task.title.lower() for _, task in candidates}
+    existing = set()
+    if keys:
+        existing.update(
+            Task.objects.annotate(title_key=Lower("title"))
+            .filter(title_key__in=keys)
+            .values_list("title_key", flat=True)
+        )
+    for number, task in candidates:
+        key = task.title.lower()
+        if key in existing:
+            result.rejected.append((number, DUPLICATE_TITLE_MESSAGE))
+        else:
+            existing.add(key)
+            result.valid.append(task)
+    result.rejected.sort()
+    return result
+
+
+def create_tasks(tasks: list[Task], batch_size: int = CHUNK_SIZE) -> list[Task]:
+    """Insert ``tasks`` with ``bulk_create`` and invalidate the page cache."""
+    created = Task.objects.bulk_create(tasks, batch_size=batch_size)
+    if created:
+        page_cache.bump_version()
+        events.publish(events.CREATED, [task.pk for task in created if task.pk])
+    return created
+
+
+def title_lines(titles: str) -> list[tuple[int, dict]]:
+    """Turn the bulk form's textarea into numbered rows, skipping blank lines."""
+    return [
+        (number, {"title": line})
+        for number, line in enumerate(titles.splitlines(), start=1)
+        if line.strip()
+    ]
+
+
+def apply_action(
+    action: str, ids: Iterable = (), titles: str = ""
+) -> tuple[int, list[tuple[int, str]]]:
+    """Run one of ``ACTION_MESSAGES`` in a single transaction.
+
+    Returns the number of tasks affected and the rejected ``(line, reason)``
+    pairs; a duplicate title that slips past validation rejects the batch.
+    """
+    rejected = []
+    try:
+        with transaction.atomic():
+            if action == "create":
+                cleaned = clean_rows(title_lines(titles))
+                rejected = cleaned.rejected
+                count = len(create_tasks(cleaned.valid))
+            else:
+                selected = Task.objects.filter(pk__in=list(ids))
+                if action == "delete":
+                    count = delete_tasks(selected)
+                else:
+                    count = set_done(selected, is_done=action == "done")
+    except IntegrityError as exc:
+        if not is_duplicate_title_error(exc):
+            raise
+        count, rejected = 0, [(0, DUPLICATE_TITLE_MESSAGE)]
+    return count, rejected
@@ -0,0 +1,192 @@
+"""Versioned cache for the rendered task list results.
+
+Every cached fragment key embeds a global "tasks version". Any write to
+``Task`` bumps that counter, which orphans all previously cached pages at
+once; stale entries are never deleted explicitly and simply expire. This keeps
+invalidation O(1) on any cache backend, local (``LocMemCache``, file based) or
+shared (Redis, Memcached). Keys also name the database the page was read
+from: a replica may lag behind the version, the primary may not.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .replicas import read_alias
+
+VERSION_KEY = "tasks:version"
+HITS_KEY = "tasks:page_cache:hits"
+MISSES_KEY = "tasks:page_cache:misses"
+PAGE_PARAMS = ("status", "q", "archived", "page", "cursor")
+STATE_PARAMS = ("status", "q", "archived")
+
+_deferred: ContextVar[set[str] | None] = ContextVar("tasks_deferred_bump", default=None)
+
+
+def get_cache():
+    return caches[getattr(settings, "TASKS_PAGE_CACHE_ALIAS", "default")]
+
+
+def get_timeout() -> int:
+    return getattr(settings, "TASKS_PAGE_CACHE_TIMEOUT", 300)
+
+
+def is_enabled() -> bool:
+    return get_timeout() > 0
+
+
+def get_version() -> int:
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost counter never reuses an old version.
+        cache.add(VERSION_KEY, time.time_ns() // 1_000_000, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version() -> int:
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns() // 1_000_000, timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def _incr_version() -> None:
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns() // 1_000_000, timeout=None)
+
+
+def bump_version(using: str | None = None, **kwargs) -> None:
+    """Invalidate every cached task page; usable as a signal receiver.
+
+    The version is bumped right away and, inside a transaction, once more on
+    commit: a page re-cached by a concurrent reader before the commit became
+    visible would otherwise be served until the next write.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    pending = _deferred.get()
+    if pending is not None:
+        pending.add(using)
+        return
+    _incr_version()
+    if connections[using].in_atomic_block:
+        transaction.on_commit(_incr_version, using=using)
+
+
+async def abump_version() -> None:
+    """Async :func:`bump_version` for autocommit writes from async views."""
+    cache = get_cache()
+    try:
+        await cache.aincr(VERSION_KEY)
+    except ValueError:
+        await cache.aadd(VERSION_KEY, time.time_ns() // 1_000_000, timeout=None)
+
+
+@contextmanager
+def deferred_bump():
+    """Collapse every bump inside the block into one, e.g. for bulk writes."""
+    if _deferred.get() is not None:
+        yield
+        return
+    token = _deferred.set(set())
+    try:
+        yield
+    finally:
+        pending = _deferred.get()
+        _deferred.reset(token)
+        for using in pending:
+            bump_version(using)
+
+
+def _page_digest(params, variant) -> str:
+    parts = [f"{name}={params.get(name, '')}" for name in PAGE_PARAMS]
+    parts.extend(variant)
+    return hashlib.sha256("&".join(parts).encode()).hexdigest()[:32]
+
+
+def page_key(params, *variant: str) -> str:
+    """Return the cache key for the list page described by ``params``."""
+    digest = _page_digest(params, variant)
+    return f"tasks:page:{get_version()}:{read_alias()}:{digest}"
+
+
+async def apage_key(params, *variant: str) -> str:
+    digest = _page_digest(params, variant)
+    return f"tasks:page:{await aget_version()}:{read_alias()}:{digest}"
+
+
+def state_key(params) -> str:
+    """Return the key for the list state (count, last modified) of a filter."""
+    filters = {name: params.get(name, "") for name in STATE_PARAMS}
+    digest = _page_digest(filters, ())
+    return f"tasks:state:{get_version()}:{read_alias()}:{digest}"
+
+
+async def astate_key(params) -> str:
+    filters = {name: params.get(name, "") for name in STATE_PARAMS}
+    digest = _page_digest(filters, ())
+    return f"tasks:state:{await aget_version()}:{read_alias()}:{digest}"
+
+
+def _count(key: str) -> None:
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(key: str) -> None:
+    cache = get_cache()
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_page(key: str) -> str | None:
+    html = get_cache().get(key)
+    _count(MISSES_KEY if html is None else HITS_KEY)
+    return html
+
+
+async def aget_page(key: str) -> str | None:
+    html = await get_cache().aget(key)
+    await _acount(MISSES_KEY if html is None else HITS_KEY)
+    return html
+
+
+def set_page(key: str, html: str) -> None:
+    get_cache().set(key, html, get_timeout())
+
+
+async def aset_page(key: str, html: str) -> None:
+    await get_cache().aset(key, html, get_timeout())
+
+
+def stats() -> dict[str, int]:
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY, VERSION_KEY])
+    return {
+        "hits": values.get(HITS_KEY, 0),
+        "misses": values.get(MISSES_KEY, 0),
+        "version": values.get(VERSION_KEY, 0),
+    }
+
+
+def reset_stats() -> None:
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
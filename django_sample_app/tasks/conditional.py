@@ -0,0 +1,185 @@
+"""ETag / Last-Modified validators for the task pages.
+
+A list page is identified by its query string, the pagination mode and the
+"list state" of its filtered set: ``Count`` and ``Max(updated_at)`` from one
+aggregate query. Inserts and updates move the maximum, deletes change the
+count, so an unchanged state means the rendered page is unchanged too and the
+view can answer ``304 Not Modified`` before any template is rendered. With the
+page cache enabled the state itself is cached under the tasks version, so
+revalidating an unchanged page needs no query at all. Without a search the
+state comes from the :mod:`.counters` table instead of an aggregate, so no
+page of the list ever counts rows. Cursor pagination stays count-free: its
+state is the fetched page's own ``(pk, updated_at)`` pairs.
+
+``Last-Modified`` is only as precise as HTTP dates (one second) and cannot see
+deletes; browsers send ``If-None-Match`` as well, which takes precedence.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import cache as page_cache
+from . import counters
+
+
+def _state(counts: counters.Counts | None, params) -> dict | None:
+    if counts is None:
+        return None
+    return {
+        "count": counts.for_status(params.get("status")),
+        # Of all tasks: a status filter gets a conservative validator for free.
+        "last_modified": counts.last_modified,
+        "counts": counts.as_dict(),
+    }
+
+
+def _parts(queryset: QuerySet) -> list[QuerySet]:
+    """Split a ``UNION`` (e.g. with archived tasks) into its querysets.
+
+    Django cannot aggregate a combined query reliably, so each part is
+    aggregated on its own and the results are merged.
+    """
+    if not queryset.query.combinator:
+        return [queryset]
+    return [
+        QuerySet(part.model, part.chain(), using=queryset.db).order_by()
+        for part in queryset.query.combined_queries
+    ]
+
+
+def _merge(states: list[dict]) -> dict:
+    stamps = [state["last_modified"] for state in states if state["last_modified"]]
+    return {
+        "count": sum(state["count"] for state in states),
+        "last_modified": max(stamps, default=None),
+    }
+
+
+def _uses_counters(queryset: QuerySet, params) -> bool:
+    # Without a search the counters already hold the count.
+    return not (params.get("q") or "").strip() and not queryset.query.combinator
+
+
+def _aggregate(queryset: QuerySet, params) -> dict:
+    counts = counters.get(queryset.db)
+    if _uses_counters(queryset, params):
+        state = _state(counts, params)
+        if state is not None:
+            return state
+    state = _merge(
+        [
+            part.aggregate(count=Count("pk"), last_modified=Max("updated_at"))
+            for part in _parts(queryset)
+        ]
+    )
+    return {**state, "counts": counts.as_dict() if counts else None}
+
+
+async def _aaggregate(queryset: QuerySet, params) -> dict:
+    counts = await counters.aget(queryset.db)
+    if _uses_counters(queryset, params):
+        state = _state(counts, params)
+        if state is not None:
+            return state
+    state = _merge(
+        [
+            await part.aaggregate(count=Count("pk"), last_modified=Max("updated_at"))
+            for part in _parts(queryset)
+        ]
+    )
+    return {**state, "counts": counts.as_dict() if counts else None}
+
+
+def list_state(queryset: QuerySet, params) -> dict:
+    """Return ``{"count", "last_modified", "counts"}`` for the task list.
+
+    ``counts`` holds the per-status totals shown next to the filters.
+    """
+    if not page_cache.is_enabled():
+        return _aggregate(queryset, params)
+    cache = page_cache.get_cache()
+    key = page_cache.state_key(params)
+    state = cache.get(key)
+    if state is None:
+        state = _aggregate(queryset, params)
+        cache.set(key, state, page_cache.get_timeout())
+    return state
+
+
+async def alist_state(queryset: QuerySet, params) -> dict:
+    if not page_cache.is_enabled():
+        return await _aaggregate(queryset, params)
+    cache = page_cache.get_cache()
+    key = await page_cache.astate_key(params)
+    state = await cache.aget(key)
+    if state is None:
+        state = await _aaggregate(queryset, params)
+        await cache.aset(key, state, page_cache.get_timeout())
+    return state
+
+
+def page_state(cursor_page, counts: counters.Counts | None = None) -> dict:
+    """Return the state of one cursor page, which is fetched without a count."""
+    stamps = [(task.pk, task.updated_at.isoformat()) for task in cursor_page]
+    return {
+        "rows": stamps,
+        "next": cursor_page.next_cursor,
+        "previous": cursor_page.previous_cursor,
+        "last_modified": max((task.updated_at for task in cursor_page), default=None),
+        "counts": counts.as_dict() if counts else None,
+    }
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha256("\0".join(map(str, parts)).encode()).hexdigest()[:32]
+    # Weak: the HTML also carries per-user bits such as the CSRF token.
+    return f'W/"{digest}"'
+
+
+def list_etag(params, mode: str, state: dict) -> str:
+    return _etag("list", mode, sorted(params.lists()), sorted(state.items()))
+
+
+def task_etag(task) -> str:
+    return _etag("task", task.pk, task.updated_at.isoformat())
+
+
+def not_modified(request, etag: str, last_modified) -> HttpResponse | None:
+    """Return a 304 response if the client's copy is current, else ``None``.
+
+    Pending flash messages are shown by the next full render, so a request
+    carrying any is always answered in full.
+    """
+    if len(get_messages(request)):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(
+        request, etag=etag, last_modified=timestamp, response=None
+    )
+
+
+async def aload_messages(request) -> None:
+    """Load the session and the pending messages in a thread.
+
+    Either may query the database. Async views call this first, so that
+    :func:`not_modified` and the messages context processor only read what
+    is already loaded.
+    """
+    await sync_to_async(len)(get_messages(request))
+
+
+def set_validators(response, etag: str, last_modified):
+    """Attach the validators and ask browsers to revalidate on every use."""
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,217 @@
+"""Denormalised task counts, so list and admin pages never ``COUNT(*)``.
+
+``TaskCounter`` holds one row per status (``open``, ``done``; the total is
+their sum). Every write path adjusts it in the transaction of the change:
+
+- ``Model.save()`` / ``Model.delete()`` through the ``post_save`` /
+  ``post_delete`` receivers (forms, the admin, ``QuerySet.delete()``);
+  ``Task.save()`` locks the row and re-reads its stored status first, so a
+  form saved after a concurrent toggle does not move the task twice;
+- ``TaskQuerySet.bulk_create()`` and ``TaskQuerySet.delete()`` themselves;
+- explicit calls where a set-based ``UPDATE`` or ``COPY`` bypasses both:
+  the toggle views, :func:`bulk.set_done` and the ``COPY`` import path.
+
+Changes inside :func:`deferred` are summed and written once, so a chunk of a
+bulk delete costs a single counter ``UPDATE``. Code that calls
+``Task.objects.update(is_done=...)`` directly must call :func:`move` too;
+``manage.py reconcile_task_counters`` repairs any drift.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models import Case, Count, F, Q, Subquery, When
+
+from .models import Task, TaskCounter
+
+OPEN = "open"
+DONE = "done"
+STATUSES = (OPEN, DONE)
+# Marks a change whose status is unknown; the counters are recounted instead.
+RECOUNT = "recount"
+
+_pending: ContextVar[dict[str, Counter] | None] = ContextVar(
+    "tasks_pending_counts", default=None
+)
+
+
+def status_of(is_done: bool) -> str:
+    return DONE if is_done else OPEN
+
+
+@dataclass(frozen=True)
+class Counts:
+    open: int
+    done: int
+    # Max(updated_at) of all tasks, read in the same query.
+    last_modified: datetime | None = None
+
+    @property
+    def total(self) -> int:
+        return self.open + self.done
+
+    def for_status(self, status: str | None) -> int:
+        """Return the count behind the list's ``status`` filter."""
+        return {OPEN: self.open, DONE: self.done}.get(status, self.total)
+
+    def as_dict(self) -> dict[str, int]:
+        return {"all": self.total, OPEN: self.open, DONE: self.done}
+
+
+def _snapshot_query(using: str):
+    latest = Task.objects.order_by("-updated_at").values("updated_at")[:1]
+    return (
+        TaskCounter.objects.using(using)
+        .annotate(last_modified=Subquery(latest))
+        .values_list("status", "count", "last_modified")
+    )
+
+
+def _counts(rows) -> Counts | None:
+    counts = {status: count for status, count, _ in rows}
+    if set(STATUSES) - counts.keys():
+        # Not initialised (or flushed); callers fall back to counting.
+        return None
+    last_modified = rows[0][2] if rows else None
+    return Counts(counts[OPEN], counts[DONE], last_modified)
+
+
+def get(using: str | None = None) -> Counts | None:
+    """Return the current counts with one query, or ``None`` if unavailable."""
+    return _counts(list(_snapshot_query(using or router.db_for_read(Task))))
+
+
+async def aget(using: str | None = None) -> Counts | None:
+    query = _snapshot_query(using or router.db_for_read(Task))
+    return _counts([row async for row in query])
+
+
+def reconcile(using: str = DEFAULT_DB_ALIAS) -> dict[str, tuple[int | None, int]]:
+    """Recount the tasks and store the result; return ``{status: (old, new)}``.
+
+    The counter rows are locked first (on backends that support it), so a
+    concurrent writer's delta lands after the recount rather than inside it.
+    """
+    with transaction.atomic(using=using):
+        stored = dict(
+            TaskCounter.objects.using(using)
+            .select_for_update()
+            .values_list("status", "count")
+        )
+        actual = Task.objects.using(using).aggregate(
+            **{
+                OPEN: Count("pk", filter=Q(is_done=False)),
+                DONE: Count("pk", filter=Q(is_done=True)),
+            }
+        )
+        for status in STATUSES:
+            if stored.get(status) != actual[status]:
+                TaskCounter.objects.using(using).update_or_create(
+                    status=status, defaults={"count": actual[status]}
+                )
+    return {status: (stored.get(status), actual[status]) for status in STATUSES}
+
+
+def _apply(deltas: Counter, using: str) -> None:
+    if deltas[RECOUNT]:
+        reconcile(using)
+        return
+    changed = {status: deltas[status] for status in STATUSES if deltas[status]}
+    if not changed:
+        return
+    # One statement for both rows, e.g. when tasks move between statuses.
+    updated = (
+        TaskCounter.objects.using(using)
+        .filter(status__in=changed)
+        .update(
+            count=F("count")
+            + Case(
+                *(When(status=status, then=delta) for status, delta in changed.items())
+            )
+        )
+    )
+    if updated != len(changed):
+        # A missing row; the change itself is already in the table.
+        reconcile(using)
+
+
+def _add(deltas: Counter, using: str) -> None:
+    pending = _pending.get()
+    if pending is not None:
+        pending.setdefault(using, Counter()).update(deltas)
+    else:
+        _apply(deltas, using)
+
+
+def add(is_done: bool, delta: int, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Count ``delta`` tasks more (or fewer) with status ``is_done``."""
+    if delta:
+        _add(Counter({status_of(is_done): delta}), using)
+
+
+def added(tasks, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Count newly inserted ``tasks``."""
+    _add(Counter(status_of(task.is_done) for task in tasks), using)
+
+
+def move(is_done: bool, count: int, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Record that ``count`` tasks switched to status ``is_done``."""
+    if count:
+        _add(
+            Counter({status_of(is_done): count, status_of(not is_done): -count}), using
+        )
+
+
+def recount(using: str = DEFAULT_DB_ALIAS) -> None:
+    """Record a change of unknown effect; the counters are recomputed."""
+    _add(Counter({RECOUNT: 1}), using)
+
+
+@contextmanager
+def deferred():
+    """Sum every change inside the block and write it once at the end.
+
+    Enter it inside the transaction of the changes, so the counters commit
+    (or roll back) with them. Nothing is written if the block raises.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    token = _pending.set({})
+    try:
+        yield
+        pending = _pending.get()
+    finally:
+        _pending.reset(token)
+    for using, deltas in pending.items():
+        _apply(deltas, using)
+
+
+def task_saved(sender, instance, created, using, update_fields, **kwargs) -> None:
+    """``post_save`` receiver."""
+    # The stored status, read by Task.save() (or Task.from_db()).
+    previous = getattr(instance, "_counted_is_done", None)
+    if created:
+        add(instance.is_done, 1, using)
+    elif update_fields is not None and "is_done" not in update_fields:
+        return
+    elif previous is None:
+        # Saved without having been loaded first; the old status is unknown.
+        recount(using)
+    elif previous != instance.is_done:
+        move(instance.is_done, 1, using)
+    instance._counted_is_done = instance.is_done
+
+
+def task_deleted(sender, instance, using, **kwargs) -> None:
+    """``post_delete`` receiver."""
+    if "is_done" in instance.get_deferred_fields():
+        recount(using)
+    else:
+        add(instance.is_done, -1, using)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from django.db import transaction
+from django.db.models import Count, Min, Value
+from django.db.models.functions import Lower
+
+
+def duplicate_title_groups(model):
+    """Return ``(title_key, keep_pk)`` rows for titles used more than once."""
+    return (
+        model._default_manager.annotate(title_key=Lower("title"))
+        .values("title_key")
+        .annotate(rows=Count("id"), keep_pk=Min("id"))
+        .filter(rows__gt=1)
+        .order_by("title_key")
+        .values_list("title_key", "keep_pk")
+    )
+
+
+def _free_title(model, title: str) -> str:
+    max_length = model._meta.get_field("title").max_length
+    suffix = 2
+    while True:
+        marker = f" ({suffix})"
+        candidate = title[: max_length - len(marker)] + marker
+        exists = (
+            model._default_manager.annotate(title_key=Lower("title"))
+            .filter(title_key=Lower(Value(candidate)))
+            .exists()
+        )
+        if not exists:
+            return candidate
+        suffix += 1
+
+
+def rename_duplicate_titles(
+    model,
+    *,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    log: Callable[[str], None] | None = None,
+) -> int:
+    """Rename all but the oldest task in each case-insensitive title group.
+
+    Groups are processed ``batch_size`` at a time, each batch in its own
+    transaction, so large tables are repaired without one long lock. Renamed
+    tasks get a ``" (2)"``, ``" (3)"``... suffix. Returns the number of tasks
+    renamed (or that would be renamed with ``dry_run``).
+    """
+    manager = model._default_manager
+    renamed = 0
+    if dry_run:
+        for title_key, keep_pk in duplicate_title_groups(model).iterator():
+            renamed += (
+                manager.annotate(title_key=Lower("title"))
+                .filter(title_key=title_key)
+                .exclude(pk=keep_pk)
+                .count()
+            )
+        return renamed
+
+    while True:
+        groups = list(duplicate_title_groups(model)[:batch_size])
+        if not groups:
+            return renamed
+        with transaction.atomic(using=manager.db):
+            for title_key, keep_pk in groups:
+                duplicates = (
+                    manager.annotate(title_key=Lower("title"))
+                    .filter(title_key=title_key)
+                    .exclude(pk=keep_pk)
+                    .order_by("pk")
+                    .values_list("pk", "title")
+                )
+                for pk, title in list(duplicates):
+                    new_title = _free_title(model, title)
+                    manager.filter(pk=pk).update(title=new_title)
+                    renamed += 1
+                    if log:
+                        log(f"#{pk}: {title!r} -> {new_title!r}")
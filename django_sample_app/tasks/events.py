@@ -0,0 +1,240 @@
+"""Live task-change events for open list pages, streamed over Server-Sent Events.
+
+Write paths call :func:`publish` (model signals cover form and admin saves and
+deletes; the toggle and bulk paths publish explicitly). Events are sent once
+the surrounding transaction commits, as compact JSON such as
+``{"type": "toggled", "ids": [42]}``; the page fetches the rows it shows.
+
+The :class:`Broker` fans each event out to the subscribers of this process.
+Events reach other processes through ``TASKS_EVENTS_BACKEND``:
+:class:`LocalBackend` is the single-process stand-in, :class:`RedisBackend`
+uses Redis pub/sub (requires the ``redis`` extra).
+
+Each subscriber holds at most ``TASKS_EVENTS_MAX_PENDING`` undelivered
+messages, all references to one shared string. A client that falls further
+behind gets a single ``reset`` instead, which makes it reload the list, so an
+idle or slow connection costs a small, fixed amount of memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.module_loading import import_string
+
+CREATED = "created"
+UPDATED = "updated"
+TOGGLED = "toggled"
+DELETED = "deleted"
+RESET = "reset"
+# Changes touching more rows are announced as a reset.
+MAX_IDS = 100
+
+_collected: ContextVar[list[dict] | None] = ContextVar(
+    "tasks_collected_events", default=None
+)
+_broker: Broker | None = None
+_broker_lock = threading.Lock()
+
+
+def encode(event: dict) -> str:
+    return json.dumps(event, separators=(",", ":"))
+
+
+class LocalBackend:
+    """Deliver events to the subscribers of this process only."""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, message: str) -> None:
+        self.deliver(message)
+
+    def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Share events between processes through a Redis pub/sub channel."""
+
+    channel = "tasks:events"
+
+    def __init__(self, deliver):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.TASKS_EVENTS_REDIS_URL)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(
+            **{self.channel: lambda message: deliver(message["data"].decode())}
+        )
+        self.thread = self.pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, message: str) -> None:
+        self.client.publish(self.channel, message)
+
+    def close(self) -> None:
+        self.thread.stop()
+        self.pubsub.close()
+        self.client.close()
+
+
+class Subscription:
+    """Undelivered messages of one stream, filled from any thread."""
+
+    __slots__ = ("loop", "pending", "max_pending", "overflowed", "ready")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.loop = loop
+        self.pending: deque[str] = deque()
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.ready = asyncio.Event()
+
+    def push(self, message: str) -> None:
+        if len(self.pending) >= self.max_pending:
+            self.pending.clear()
+            self.overflowed = True
+        else:
+            self.pending.append(message)
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    def drain(self) -> list[str]:
+        if self.overflowed:
+            self.overflowed = False
+            self.pending.clear()
+            return [encode({"type": RESET})]
+        messages = []
+        while self.pending:
+            messages.append(self.pending.popleft())
+        return messages
+
+
+class Broker:
+    """In-process pub/sub between the write paths and the open streams."""
+
+    def __init__(self, backend_class, max_pending: int):
+        self.max_pending = max_pending
+        self.subscribers: set[Subscription] = set()
+        self.lock = threading.Lock()
+        self.backend = backend_class(self.deliver)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, event: dict) -> None:
+        self.backend.publish(encode(event))
+
+    def deliver(self, message: str) -> None:
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.push(message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down.
+                self.unsubscribe(subscription)
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def get_broker() -> Broker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = Broker(
+                import_string(settings.TASKS_EVENTS_BACKEND),
+                settings.TASKS_EVENTS_MAX_PENDING,
+            )
+        return _broker
+
+
+def reset_broker(**kwargs) -> None:
+    global _broker
+    with _broker_lock:
+        if _broker is not None:
+            _broker.close()
+        _broker = None
+
+
+def _send(event: dict, using: str) -> None:
+    if getattr(settings, "TASKS_EVENTS", False):
+        transaction.on_commit(partial(get_broker().publish, event), using=using)
+
+
+def publish(kind: str, ids: Iterable[int], using: str | None = None) -> None:
+    """Announce that the tasks ``ids`` changed, once the transaction commits."""
+    ids = list(ids)
+    if kind == RESET or len(ids) > MAX_IDS:
+        event = {"type": RESET}
+    elif ids:
+        event = {"type": kind, "ids": ids}
+    else:
+        return
+    collected = _collected.get()
+    if collected is not None:
+        collected.append(event)
+    else:
+        _send(event, using or DEFAULT_DB_ALIAS)
+
+
+@contextmanager
+def collect(using: str = DEFAULT_DB_ALIAS):
+    """Merge every event published inside the block, e.g. for bulk writes."""
+    if _collected.get() is not None:
+        yield
+        return
+    token = _collected.set([])
+    try:
+        yield
+        events = _collected.get()
+    finally:
+        _collected.reset(token)
+    merged: dict[str, list[int]] = {}
+    for event in events:
+        merged.setdefault(event["type"], []).extend(event.get("ids", []))
+    if RESET in merged or sum(map(len, merged.values())) > MAX_IDS:
+        _send({"type": RESET}, using)
+        return
+    for kind, ids in merged.items():
+        _send({"type": kind, "ids": list(dict.fromkeys(ids))}, using)
+
+
+def task_saved(sender, instance, created, using, **kwargs) -> None:
+    """``post_save`` receiver."""
+    publish(CREATED if created else UPDATED, [instance.pk], using)
+
+
+def task_deleted(sender, instance, using, **kwargs) -> None:
+    """``post_delete`` receiver."""
+    publish(DELETED, [instance.pk], using)
+
+
+async def stream(subscription: Subscription, heartbeat: float) -> AsyncIterator[str]:
+    """Yield SSE frames for ``subscription``; a comment keeps idle ones open."""
+    yield "retry: 3000\n\n"
+    while True:
+        try:
+            await asyncio.wait_for(subscription.ready.wait(), heartbeat)
+        except TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        subscription.ready.clear()
+        for message in subscription.drain():
+            yield f"data: {message}\n\n"
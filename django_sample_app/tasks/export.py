@@ -0,0 +1,100 @@
+"""Constant-memory NDJSON/CSV serialisation of task querysets.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL), encoded line by line and flushed in blocks of roughly
+``BLOCK_SIZE`` bytes, optionally through a streaming gzip compressor. Nothing
+but the current block is ever held in memory.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+
+from django.db.models import QuerySet
+
+FIELDS = ("id", "title", "description", "is_done", "created_at")
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for ``csv.writer``."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_rows(queryset: QuerySet, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    return queryset.values_list(*FIELDS).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    for pk, title, description, is_done, created_at in rows:
+        record = {
+            "id": pk,
+            "title": title,
+            "description": description,
+            "is_done": is_done,
+            "created_at": created_at.isoformat(),
+        }
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for pk, title, description, is_done, created_at in rows:
+        yield writer.writerow(
+            [pk, title, description, int(is_done), created_at.isoformat()]
+        )
+
+
+def iter_blocks(lines: Iterable[str], block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Join encoded ``lines`` into blocks of about ``block_size`` bytes."""
+    block: list[bytes] = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        block.append(data)
+        size += len(data)
+        if size >= block_size:
+            yield b"".join(block)
+            block, size = [], 0
+    if block:
+        yield b"".join(block)
+
+
+def iter_gzip(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode(
+    rows: Iterable[tuple], fmt: str, *, compress: bool = False
+) -> Iterator[bytes]:
+    """Return an iterator of bytes serialising ``rows`` (see ``FIELDS``)."""
+    lines = iter_ndjson(rows) if fmt == "ndjson" else iter_csv(rows)
+    blocks = iter_blocks(lines)
+    return iter_gzip(blocks) if compress else blocks
+
+
+def stream(
+    queryset: QuerySet,
+    fmt: str,
+    *,
+    compress: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Return an iterator of bytes serialising ``queryset`` as ``fmt``."""
+    return encode(iter_rows(queryset, chunk_size), fmt, compress=compress)
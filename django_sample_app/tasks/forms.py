@@ -4,6 +4,10 @@ from django import forms
 
 from .models import Task
 
+TITLE_MIN_LENGTH = 3
+TITLE_TOO_SHORT_MESSAGE = "タイトルは3文字以上で入力してください。"
+DESCRIPTION_SAME_AS_TITLE_MESSAGE = "タイトルと説明を同じ内容にはできません。"
+
 
 class TaskForm(forms.ModelForm):
     """Task creation/update form with custom validation rules."""
@@ -59,15 +63,10 @@ class TaskForm(forms.ModelForm):
 
     def clean_title(self) -> str:
         title = (self.cleaned_data.get("title") or "").strip()
-        if len(title) < 3:
-            raise forms.ValidationError("タイトルは3文字以上で入力してください。")
-
-        qs = Task.objects.filter(title__iexact=title)
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise forms.ValidationError("同じタイトルのタスクが既に存在します。")
-
+        if len(title) < TITLE_MIN_LENGTH:
+            raise forms.ValidationError(TITLE_TOO_SHORT_MESSAGE)
+        # Uniqueness is checked by Task's Lower("title") constraint, which
+        # ModelForm validation runs as a single lookup on the unique index.
         return title
 
     def clean_description(self) -> str:
@@ -79,5 +78,5 @@ class TaskForm(forms.ModelForm):
         title = cleaned.get("title") or ""
         description = cleaned.get("description") or ""
         if description and title.lower() == description.lower():
-            self.add_error("description", "タイトルと説明を同じ内容にはできません。")
+            self.add_error("description", DESCRIPTION_SAME_AS_TITLE_MESSAGE)
         return cleaned
@@ -0,0 +1,138 @@
+"""Streaming readers and batch writers for ``manage.py import_tasks``.
+
+Readers yield ``(line number, row)`` pairs one at a time so input files of any
+size are never loaded whole; rows that cannot be parsed come back as
+``(line number, ParseError)`` and are reported as rejects like invalid rows.
+The command and the ``import`` background job feed them to
+:func:`import_batch` batch by batch.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import sys
+from collections.abc import Iterator
+from typing import IO
+
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from . import bulk, counters, events
+from . import cache as page_cache
+from .models import Task
+
+PARSE_ERROR_MESSAGE = "行を解析できません。"
+TRUE_VALUES = {"1", "true", "t", "yes", "on"}
+
+
+class ParseError(ValueError):
+    pass
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in TRUE_VALUES
+
+
+def _row(data: dict) -> dict:
+    return {
+        "title": data.get("title") or "",
+        "description": data.get("description") or "",
+        "is_done": parse_bool(data.get("is_done")),
+    }
+
+
+def read_ndjson(fh: IO[str]) -> Iterator[tuple[int, dict | ParseError]]:
+    for number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError(data)
+        except ValueError:
+            yield number, ParseError(PARSE_ERROR_MESSAGE)
+            continue
+        yield number, _row(data)
+
+
+def read_csv(fh: IO[str]) -> Iterator[tuple[int, dict | ParseError]]:
+    reader = csv.DictReader(fh)
+    for data in reader:
+        yield reader.line_num, _row(data)
+
+
+READERS = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+def open_input(path: str) -> IO[str]:
+    """Open ``path`` (``-`` for stdin, ``.gz`` decompressed) as text."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig")
+    opener = gzip.open if path.endswith(".gz") else open
+    return opener(path, "rt", encoding="utf-8-sig", newline="")
+
+
+def guess_format(path: str) -> str | None:
+    name = path.removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def supports_copy(using: str) -> bool:
+    if connections[using].vendor != "postgresql":
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    return is_psycopg3
+
+
+def copy_tasks(tasks: list[Task], using: str) -> int:
+    """Insert ``tasks`` with PostgreSQL ``COPY ... FROM STDIN`` (psycopg 3)."""
+    table = Task._meta.db_table
+    now = timezone.now()
+    with connections[using].cursor() as cursor:
+        columns = "title, description, is_done, created_at, updated_at"
+        with cursor.copy(f'COPY "{table}" ({columns}) FROM STDIN') as copy:
+            for task in tasks:
+                copy.write_row((task.title, task.description, task.is_done, now, now))
+    return len(tasks)
+
+
+def insert_tasks(tasks: list[Task], using: str, use_copy: bool, batch_size: int) -> int:
+    if not use_copy:
+        return len(bulk.create_tasks(tasks, batch_size=batch_size))
+    count = copy_tasks(tasks, using)
+    counters.added(tasks, using)
+    page_cache.bump_version(using)
+    events.publish(events.RESET, [], using)
+    return count
+
+
+def import_batch(
+    batch: list[tuple[int, dict | ParseError]], using: str, use_copy: bool
+) -> tuple[int, list[tuple[int, str]]]:
+    """Validate and insert one batch; return the count and sorted rejects."""
+    rows = [(n, row) for n, row in batch if not isinstance(row, Exception)]
+    rejected = [(n, str(row)) for n, row in batch if isinstance(row, Exception)]
+    for attempt in range(2):
+        cleaned = bulk.clean_rows(rows)
+        try:
+            with transaction.atomic(using=using):
+                inserted = insert_tasks(
+                    cleaned.valid, using, use_copy, len(cleaned.valid) or 1
+                )
+            break
+        except IntegrityError:
+            # A concurrent writer took one of the titles after validation;
+            # re-validate once against the now-committed rows.
+            if attempt:
+                raise
+    return inserted, sorted(rejected + cleaned.rejected)
@@ -0,0 +1,431 @@
+"""Database-backed background jobs for the heavy task operations.
+
+Exports, imports, archive runs and large bulk actions are stored as
+:class:`~.models.Job` rows and run by ``manage.py run_workers`` instead of
+inside a web request or a foreground command. A worker claims the oldest
+runnable job with a compare-and-set ``UPDATE ... WHERE status = 'queued'``,
+so two workers never run the same job even on SQLite, which has no row
+locks. Where the backend supports ``SELECT ... FOR UPDATE SKIP LOCKED``
+(PostgreSQL) the candidate is picked that way first, so concurrent workers
+skip each other's rows instead of racing for them.
+
+Handlers get the job and a :class:`Progress` reporter, which doubles as the
+heartbeat: a running job silent for ``TASKS_JOBS_STALE_AFTER`` seconds is
+taken to have lost its worker and is queued again. Every later write by the
+original worker is conditional on it still owning the job (``worker`` and
+``status = 'running'`` unchanged); once it does not, the handler is stopped
+with :class:`LostJob` and its outcome dropped, so a requeued job is never
+finished by two workers. A handler that raises is retried with exponential
+backoff until ``max_attempts``, so handlers must be safe to run more than
+once.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterable, Iterator
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from . import archive, bulk, events, export, imports
+from . import cache as page_cache
+from .models import Job, Task
+
+logger = logging.getLogger(__name__)
+
+# Queued rows a claim tries when other workers win the race for the first.
+CLAIM_CANDIDATES = 5
+MAX_ERROR_LENGTH = 4000
+# Rejected import rows kept in the job's result.
+MAX_REJECTS = 100
+
+HANDLERS: dict[str, Callable[[Job, Progress], dict | None]] = {}
+
+
+def handler(kind: str):
+    """Register the decorated function as the handler of ``kind`` jobs."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(
+    kind: str,
+    params: dict | None = None,
+    *,
+    max_attempts: int | None = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    return Job.objects.using(using).create(
+        kind=kind,
+        params=params or {},
+        max_attempts=max_attempts or settings.TASKS_JOBS_MAX_ATTEMPTS,
+    )
+
+
+def should_enqueue(size: int) -> bool:
+    """Whether an operation on ``size`` tasks runs as a job instead of inline."""
+    limit = settings.TASKS_JOBS_INLINE_LIMIT
+    return bool(limit) and size > limit
+
+
+def claim(worker: str, using: str = DEFAULT_DB_ALIAS) -> Job | None:
+    """Mark the oldest runnable job as run by ``worker`` and return it."""
+    now = timezone.now()
+    runnable = (
+        Job.objects.using(using)
+        .filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by("run_after", "id")
+    )
+    limit = CLAIM_CANDIDATES
+    with transaction.atomic(using=using):
+        if connections[using].features.has_select_for_update_skip_locked:
+            # Rows another worker is claiming are skipped, not waited for.
+            runnable = runnable.select_for_update(skip_locked=True)
+            limit = 1
+        for pk in runnable.values_list("pk", flat=True)[:limit]:
+            claimed = (
+                Job.objects.using(using)
+                .filter(pk=pk, status=Job.QUEUED)
+                .update(
+                    status=Job.RUNNING,
+                    worker=worker,
+                    attempts=F("attempts") + 1,
+                    started_at=now,
+                    heartbeat_at=now,
+                )
+            )
+            if claimed:
+                return Job.objects.using(using).get(pk=pk)
+    return None
+
+
+def requeue_stale(using: str = DEFAULT_DB_ALIAS) -> int:
+    """Queue again (or fail) running jobs that stopped reporting progress."""
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.TASKS_JOBS_STALE_AFTER)
+    stale = Job.objects.using(using).filter(status=Job.RUNNING, heartbeat_at__lt=cutoff)
+    error = "ワーカーからの応答が途絶えました。"
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, error=error, finished_at=now
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status=Job.QUEUED, error=error, run_after=now
+    )
+    return failed + requeued
+
+
+class LostJob(Exception):
+    """The job was requeued or claimed by another worker while running."""
+
+
+def save_owned(job: Job, *fields: str) -> None:
+    """Write ``fields`` of ``job`` only while its worker still owns it."""
+    owned = (
+        Job.objects.using(job._state.db)
+        .filter(pk=job.pk, worker=job.worker, status=Job.RUNNING)
+        .update(**{name: getattr(job, name) for name in fields})
+    )
+    if not owned:
+        raise LostJob(f"Job {job.pk} is no longer run by {job.worker}.")
+
+
+class Progress:
+    """Record how far a job is; written at most every ``interval`` seconds."""
+
+    interval = 1.0
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.saved_at = time.monotonic()
+
+    def __call__(
+        self, done: int, total: int | None = None, message: str | None = None
+    ) -> None:
+        job = self.job
+        job.progress = done
+        if total is not None:
+            job.total = total
+        if message is not None:
+            job.message = message[: Job._meta.get_field("message").max_length]
+        finished = job.total is not None and done >= job.total
+        if finished or time.monotonic() - self.saved_at >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        self.saved_at = time.monotonic()
+        self.job.heartbeat_at = timezone.now()
+        save_owned(self.job, "progress", "total", "message", "heartbeat_at")
+
+
+def run(job: Job) -> Job:
+    """Run a claimed job and record its outcome."""
+    try:
+        result = HANDLERS[job.kind](job, Progress(job))
+    except LostJob:
+        logger.warning("Job %s was taken from %s; stopped", job, job.worker)
+        return job
+    except Exception:
+        job.error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+        if job.attempts < job.max_attempts:
+            delay = settings.TASKS_JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        logger.warning("Job %s failed (attempt %s)", job, job.attempts, exc_info=True)
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+        if job.total is not None:
+            job.progress = job.total
+    job.heartbeat_at = timezone.now()
+    try:
+        save_owned(
+            job,
+            "status",
+            "result",
+            "error",
+            "progress",
+            "run_after",
+            "finished_at",
+            "heartbeat_at",
+        )
+    except LostJob:
+        logger.warning("Job %s was taken from %s; outcome dropped", job, job.worker)
+    return job
+
+
+def work(
+    name: str,
+    *,
+    using: str = DEFAULT_DB_ALIAS,
+    poll: float | None = None,
+    burst: bool = False,
+    stop: threading.Event | None = None,
+) -> int:
+    """Claim and run jobs until ``stop`` is set; return how many ran.
+
+    With ``burst`` the loop also ends as soon as no job is runnable.
+    """
+    poll = settings.TASKS_JOBS_POLL_INTERVAL if poll is None else poll
+    stop = stop or threading.Event()
+    ran = 0
+    while not stop.is_set():
+        if not connections[using].in_atomic_block:
+            # A request boundary, as far as connection reuse is concerned.
+            close_old_connections()
+        try:
+            job = claim(name, using)
+            if job is None:
+                requeue_stale(using)
+        except DatabaseError:
+            logger.exception("Cannot claim a job")
+            connections[using].close()
+            job = None
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll)
+            continue
+        logger.info("Job %s started by %s", job, name)
+        run(job)
+        ran += 1
+    return ran
+
+
+def serve(threads: int = 1, *, stop: threading.Event | None = None, **kwargs) -> int:
+    """Run ``threads`` :func:`work` loops in this process; return the job count."""
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    if threads == 1:
+        return work(name, stop=stop, **kwargs)
+    counts = []
+
+    def target(number):
+        try:
+            counts.append(work(f"{name}:{number}", stop=stop, **kwargs))
+        finally:
+            connections.close_all()
+
+    pool = [
+        threading.Thread(target=target, args=(n,), name=f"tasks-worker-{n}")
+        for n in range(1, threads + 1)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(counts)
+
+
+def output_path(job: Job, filename: str) -> Path:
+    """Where a job writes its ``filename`` under ``TASKS_JOBS_DIR``."""
+    return Path(settings.TASKS_JOBS_DIR) / f"job-{job.pk}-{filename}"
+
+
+def _tracked(rows: Iterable, progress: Progress) -> Iterator:
+    for number, row in enumerate(rows, start=1):
+        yield row
+        progress(number)
+
+
+@handler("export")
+def export_job(job: Job, progress: Progress) -> dict:
+    """Write the filtered task list to a file, like the export view."""
+    params = job.params
+    fmt = params.get("format") or "ndjson"
+    if fmt not in export.FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    compress = params.get("gzip") in archive.TRUE_VALUES
+    queryset = Task.objects.using(job._state.db).filter_list(
+        params.get("status"), params.get("q")
+    )
+    if archive.wants_archived(params):
+        queryset = archive.union_archived(queryset, params.get("q"))
+    progress(0, queryset.count())
+
+    filename = f"tasks.{fmt}" + (".gz" if compress else "")
+    path = output_path(job, filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".part")
+    rows = _tracked(export.iter_rows(queryset), progress)
+    with open(partial, "wb") as fh:
+        for block in export.encode(rows, fmt, compress=compress):
+            fh.write(block)
+    os.replace(partial, path)
+    return {
+        "file": path.name,
+        "filename": filename,
+        "content_type": "application/gzip" if compress else export.FORMATS[fmt],
+        "rows": job.progress,
+    }
+
+
+@handler("import")
+def import_job(job: Job, progress: Progress) -> dict:
+    """Import ``params["path"]``, a file the worker can read.
+
+    A retry re-reads the whole file; rows inserted by the failed attempt are
+    then rejected as duplicate titles.
+    """
+    params = job.params
+    using = job._state.db
+    path = params["path"]
+    fmt = params.get("format") or imports.guess_format(path)
+    if fmt not in imports.READERS:
+        raise ValueError(f"Cannot guess the input format of {path}.")
+    batch_size = params.get("batch_size") or 1000
+    use_copy = params.get("copy", True) and imports.supports_copy(using)
+    processed = inserted = rejected = 0
+    rejects = []
+    with (
+        imports.open_input(path) as fh,
+        page_cache.deferred_bump(),
+        events.collect(using),
+    ):
+        rows = imports.READERS[fmt](fh)
+        while batch := list(itertools.islice(rows, batch_size)):
+            count, batch_rejects = imports.import_batch(batch, using, use_copy)
+            processed += len(batch)
+            inserted += count
+            rejected += len(batch_rejects)
+            rejects.extend(batch_rejects[: MAX_REJECTS - len(rejects)])
+            progress(processed, message=f"{inserted} inserted, {rejected} rejected")
+    return {
+        "processed": processed,
+        "inserted": inserted,
+        "rejected": rejected,
+        "rejects": [{"line": line, "error": error} for line, error in rejects],
+    }
+
+
+@handler("archive")
+def archive_job(job: Job, progress: Progress) -> dict:
+    """Run ``archive_tasks``; the cutoff is taken when the job starts."""
+    params = job.params
+    using = job._state.db
+    cutoff = timezone.now() - archive.parse_age(params["older_than"])
+    progress(0, archive.candidates(cutoff, using).count())
+    moved = archive.archive_done_tasks(
+        cutoff,
+        batch_size=params.get("batch_size") or archive.BATCH_SIZE,
+        using=using,
+        pause=params.get("pause") or 0.0,
+        progress=progress,
+    )
+    return {"archived": moved}
+
+
+@handler("bulk")
+def bulk_job(job: Job, progress: Progress) -> dict:
+    """Apply a bulk action that was too large to run inside the request.
+
+    Unlike :func:`.bulk.apply_action` the work is committed chunk by chunk,
+    with the progress (and heartbeat) written after each one; a retry skips
+    what is already done, or rejects the titles already created.
+    """
+    params = job.params
+    using = job._state.db
+    action = params["action"]
+    if action not in bulk.ACTION_MESSAGES:
+        raise ValueError(f"Unknown bulk action: {action!r}")
+    batch_size = params.get("batch_size") or bulk.CHUNK_SIZE
+    message = bulk.ACTION_MESSAGES[action]
+    count = done = 0
+    rejected = []
+    if action == "create":
+        lines = bulk.title_lines(params.get("titles") or "")
+        total = len(lines)
+        progress(0, total)
+        for chunk in itertools.batched(lines, batch_size):
+            inserted, chunk_rejects = imports.import_batch(list(chunk), using, False)
+            count += inserted
+            rejected.extend(chunk_rejects)
+            done += len(chunk)
+            progress(done, message=message.format(count=count))
+    else:
+        ids = params.get("ids") or []
+        total = len(ids)
+        progress(0, total)
+        selected = Task.objects.using(using).filter(pk__in=ids)
+        for pks in bulk.iter_pk_chunks(selected, batch_size):
+            chunk = Task.objects.using(using).filter(pk__in=pks)
+            if action == "delete":
+                count += bulk.delete_tasks(chunk)
+            else:
+                count += bulk.set_done(chunk, is_done=action == "done")
+            done += len(pks)
+            progress(done, message=message.format(count=count))
+    progress(total, message=message.format(count=count))
+    return {
+        "action": action,
+        "count": count,
+        "rejected": len(rejected),
+        "rejects": [{"line": line, "error": error} for line, error in rejected],
+    }
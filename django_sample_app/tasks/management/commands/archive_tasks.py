@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from django_sample_app.tasks import archive, jobs
+
+
+class Command(BaseCommand):
+    help = "Move done tasks that have not changed for a while into the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            required=True,
+            help="Minimum age since the last update, e.g. 90d, 12h or 2w.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=archive.BATCH_SIZE,
+            help="Tasks moved per transaction (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the tasks that would be archived.",
+        )
+        parser.add_argument(
+            "--enqueue",
+            action="store_true",
+            help="Queue the run for manage.py run_workers instead.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to archive in (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = timezone.now() - archive.parse_age(options["older_than"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        if options["pause"] < 0:
+            raise CommandError("--pause must not be negative.")
+        using = options["database"]
+
+        if options["enqueue"]:
+            job = jobs.enqueue(
+                "archive",
+                {
+                    "older_than": options["older_than"],
+                    "batch_size": options["batch_size"],
+                    "pause": options["pause"],
+                },
+                using=using,
+            )
+            self.stdout.write(f"Queued job {job.pk}.")
+            return
+
+        if options["dry_run"]:
+            count = archive.candidates(cutoff, using).count()
+            self.stdout.write(f"{count} task(s) would be archived.")
+            return
+
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        started = time.perf_counter()
+        moved = archive.archive_done_tasks(
+            cutoff,
+            batch_size=options["batch_size"],
+            using=using,
+            pause=options["pause"],
+            log=log,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"{moved} task(s) archived in {elapsed:.1f}s.")
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from django_sample_app.tasks.dedupe import rename_duplicate_titles
+from django_sample_app.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Rename tasks whose titles collide case-insensitively so the "
+        "Lower(title) unique index can be built."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Duplicate title groups repaired per transaction (default: 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many tasks would be renamed.",
+        )
+
+    def handle(self, *args, batch_size, dry_run, verbosity, **options):
+        log = self.stdout.write if verbosity > 1 else None
+        renamed = rename_duplicate_titles(
+            Task, batch_size=batch_size, dry_run=dry_run, log=log
+        )
+        verb = "would be renamed" if dry_run else "renamed"
+        self.stdout.write(self.style.SUCCESS(f"{renamed} task(s) {verb}."))
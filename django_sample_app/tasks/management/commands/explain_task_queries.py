@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+from django.utils import timezone
+
+from django_sample_app.tasks.models import Task
+from django_sample_app.tasks.pagination import Cursor, CursorPaginator
+from django_sample_app.tasks.views import TaskListView
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN output for the canonical task list, search and admin "
+        "filter queries on the active database backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--query",
+            default="資料",
+            help="Search term used for the q= queries (default: 資料).",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run EXPLAIN ANALYZE where the backend supports it.",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Database alias to explain against (default: default).",
+        )
+
+    def list_queryset(self, params):
+        view = TaskListView()
+        view.setup(RequestFactory().get("/", params))
+        return view.get_queryset()
+
+    def canonical_queries(self, query, using):
+        """Yield ``(label, queryset)`` pairs mirroring real request traffic."""
+        page_size = TaskListView.paginate_by
+        for label, params in [
+            ("list", {}),
+            ("list status=open", {"status": "open"}),
+            ("list status=done", {"status": "done"}),
+            ("search q", {"q": query}),
+            ("search q status=open", {"q": query, "status": "open"}),
+        ]:
+            queryset = self.list_queryset(params).using(using)
+            yield f"{label} (page 1)", queryset[:page_size]
+            yield f"{label} (deep page)", queryset[page_size * 1000 :][:page_size]
+
+        now = timezone.now()
+        for label, params in [
+            ("cursor seek", {}),
+            ("cursor seek status=open", {"status": "open"}),
+        ]:
+            paginator = CursorPaginator(
+                self.list_queryset(params).using(using), page_size
+            )
+            yield label, paginator.get_queryset(Cursor(now, 2**31))
+
+        # TaskAdmin changelist: is_done and created_at ("past 7 days") filters.
+        admin = Task.objects.using(using).filter(
+            is_done=True, created_at__gte=now - timedelta(days=7), created_at__lt=now
+        )
+        yield "admin is_done+created_at", admin[:100]
+
+    def handle(self, *args, query, analyze, database, **options):
+        connection = connections[database]
+        explain_options = {}
+        if analyze and connection.vendor in {"postgresql", "mysql"}:
+            explain_options["analyze"] = True
+
+        self.stdout.write(f"Backend: {connection.vendor} ({database})")
+        for label, queryset in self.canonical_queries(query, database):
+            self.stdout.write("")
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {label}"))
+            if options["verbosity"] > 1:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
@@ -0,0 +1,71 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_sample_app.tasks import archive, export
+from django_sample_app.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Stream tasks as NDJSON or CSV with constant memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(export.FORMATS),
+            default="ndjson",
+            help="Output format (default: ndjson).",
+        )
+        parser.add_argument(
+            "--status",
+            choices=["all", "open", "done"],
+            default="all",
+            help="Same as the list page's status filter.",
+        )
+        parser.add_argument("--q", default="", help="Same as the list page's search.")
+        parser.add_argument(
+            "--archived",
+            action="store_true",
+            help="With --status done, include archived tasks.",
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Compress the output with gzip."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=export.CHUNK_SIZE,
+            help="Rows fetched per database round trip (default: %(default)s).",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="File to write to (default: stdout).",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer.")
+        queryset = Task.objects.filter_list(options["status"], options["q"])
+        if options["archived"]:
+            if options["status"] != "done":
+                raise CommandError("--archived requires --status done.")
+            queryset = archive.union_archived(queryset, options["q"])
+        blocks = export.stream(
+            queryset,
+            options["format"],
+            compress=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as fh:
+                for block in blocks:
+                    fh.write(block)
+        elif options["gzip"]:
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+        else:
+            # Blocks always end on a line boundary, so they decode cleanly.
+            for block in blocks:
+                self.stdout.write(block.decode(), ending="")
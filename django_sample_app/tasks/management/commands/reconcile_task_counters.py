@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from django_sample_app.tasks import cache as page_cache
+from django_sample_app.tasks import counters
+
+
+class Command(BaseCommand):
+    help = "Recount tasks per status and repair the denormalised task counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to reconcile (default: %(default)s).",
+        )
+
+    def handle(self, *args, database, **options):
+        drifted = 0
+        for status, (stored, actual) in counters.reconcile(database).items():
+            if stored == actual:
+                self.stdout.write(f"{status}: {actual}")
+            else:
+                drifted += 1
+                self.stdout.write(f"{status}: {stored} -> {actual}")
+        if drifted:
+            page_cache.bump_version(database)
+            self.stdout.write(self.style.WARNING(f"{drifted} counter(s) repaired."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Counters are up to date."))
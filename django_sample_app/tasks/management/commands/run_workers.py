@@ -0,0 +1,104 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def stop_on_signals(stop, on_stop=None):
+    def handle(signum, frame):
+        stop.set()
+        if on_stop:
+            on_stop()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def serve_process(threads, options):
+    """Entry point of a spawned worker process."""
+    import django
+
+    django.setup()
+    from django_sample_app.tasks import jobs
+
+    stop = threading.Event()
+    stop_on_signals(stop)
+    jobs.serve(threads, stop=stop, **options)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (exports, imports, archive runs, bulk actions)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Worker processes (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="Worker threads per process (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            help="Seconds to wait when the queue is empty "
+            "(default: TASKS_JOBS_POLL_INTERVAL).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is runnable instead of waiting for more.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias holding the queue (default: %(default)s).",
+        )
+
+    def handle(self, *args, processes, threads, **options):
+        from django_sample_app.tasks import jobs
+
+        if processes < 1 or threads < 1:
+            raise CommandError("--processes and --threads must be positive.")
+        work_options = {
+            "using": options["database"],
+            "poll": options["poll"],
+            "burst": options["burst"],
+        }
+        self.stdout.write(
+            f"Starting {processes} process(es) x {threads} thread(s)"
+            + (" in burst mode." if options["burst"] else "; Ctrl-C to stop.")
+        )
+        if processes == 1:
+            stop = threading.Event()
+            if threading.current_thread() is threading.main_thread():
+                stop_on_signals(stop)
+            ran = jobs.serve(threads, stop=stop, **work_options)
+            self.stdout.write(self.style.SUCCESS(f"{ran} job(s) run."))
+            return
+
+        # Children open their own connections; spawn does not inherit ours.
+        connections.close_all()
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=serve_process, args=(threads, work_options))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def stop_children():
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        stop_on_signals(threading.Event(), stop_children)
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
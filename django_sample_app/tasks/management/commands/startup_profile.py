@@ -0,0 +1,109 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from django_sample_app.tasks import startup, startup_probe
+
+
+class Command(BaseCommand):
+    help = (
+        "Start Django in fresh processes and report where the time goes: "
+        "settings, app registry, handler and URLconf, per app and per module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--entry",
+            choices=startup_probe.ENTRIES,
+            default="wsgi",
+            help="Start like wsgi.py, asgi.py or a manage.py command (setup).",
+        )
+        parser.add_argument(
+            "--app-profile",
+            nargs="+",
+            choices=sorted(settings.APP_PROFILES),
+            help="DJANGO_APP_PROFILE values to compare (default: the current one).",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Processes started per profile; medians are reported.",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=15, help="Modules to list (default: 15)."
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("self", "cumulative"),
+            default="self",
+            help="Order modules by their own import time or including children.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON.")
+
+    def handle(self, *args, entry, app_profile, runs, limit, sort, **options):
+        if runs < 1:
+            raise CommandError("--runs must be at least 1.")
+        reports = {}
+        for profile in app_profile or [settings.APP_PROFILE]:
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+                "DJANGO_APP_PROFILE": profile,
+            }
+            try:
+                results = [
+                    startup.run_probe(entry, env, cwd=settings.BASE_DIR)
+                    for _ in range(runs)
+                ]
+            except RuntimeError as exc:
+                raise CommandError(str(exc)) from exc
+            reports[profile] = startup.summarise(results)
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"entry": entry, "profiles": reports}))
+            return
+        for profile, report in reports.items():
+            self.write_report(profile, entry, report, limit, sort)
+        if len(reports) > 1:
+            self.stdout.write(
+                " / ".join(
+                    f"{profile} {report['total']:.1f} ms"
+                    for profile, report in reports.items()
+                )
+            )
+
+    def write_report(self, profile, entry, report, limit, sort):
+        write = self.stdout.write
+        write(
+            f"== {profile} profile, {entry}: {report['total']:.1f} ms "
+            f"(median of {report['runs']} run(s))"
+        )
+        write(f"{'phase':<12}{'ms':>9}{'modules':>9}{'imports ms':>12}")
+        for name, phase in report["phases"].items():
+            write(
+                f"{name:<12}{phase['ms']:>9.1f}{phase['modules']:>9}"
+                f"{phase['import_ms']:>12.1f}"
+            )
+        write("")
+        write(f"{'app':<16}{'create':>9}{'models':>9}{'ready':>9}")
+        for label, steps in report["apps"].items():
+            write(
+                f"{label:<16}{steps['create']:>9.1f}{steps['models']:>9.1f}"
+                f"{steps['ready']:>9.1f}"
+            )
+        write("")
+        write(f"{'package':<32}{'modules':>9}{'ms':>9}")
+        for name, package in list(report["packages"].items())[:limit]:
+            write(f"{name:<32}{package['modules']:>9}{package['ms']:>9.1f}")
+        write("")
+        write(f"{'module':<48}{'phase':<10}{'self':>8}{'cumul.':>9}")
+        modules = sorted(report["modules"].items(), key=lambda item: -item[1][sort])
+        for name, module in modules[:limit]:
+            write(
+                f"{name:<48}{module['phase']:<10}{module['self']:>8.1f}"
+                f"{module['cumulative']:>9.1f}"
+            )
+        write("")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from django_sample_app.tasks import cache as page_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the task list page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the hit/miss counters after printing them.",
+        )
+
+    def handle(self, *args, reset, **options):
+        stats = page_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups if lookups else 0.0
+        self.stdout.write(f"version: {stats['version']}")
+        self.stdout.write(f"hits:    {stats['hits']}")
+        self.stdout.write(f"misses:  {stats['misses']}")
+        self.stdout.write(f"ratio:   {ratio:.1%}")
+        if reset:
+            page_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
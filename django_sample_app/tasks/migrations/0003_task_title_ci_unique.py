@@ -0,0 +1,29 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from django_sample_app.tasks.dedupe import rename_duplicate_titles
+
+
+def repair_duplicate_titles(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    rename_duplicate_titles(Task)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0002_task_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_duplicate_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("title"),
+                name="tasks_task_title_ci_unique",
+                violation_error_code="duplicate_title",
+                violation_error_message="同じタイトルのタスクが既に存在します。",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+def count_tasks(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    TaskCounter = apps.get_model("tasks", "TaskCounter")
+    using = schema_editor.connection.alias
+    counts = Task.objects.using(using).aggregate(
+        open=models.Count("pk", filter=models.Q(is_done=False)),
+        done=models.Count("pk", filter=models.Q(is_done=True)),
+    )
+    TaskCounter.objects.using(using).bulk_create(
+        TaskCounter(status=status, count=count) for status, count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0005_task_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskCounter",
+            fields=[
+                (
+                    "status",
+                    models.CharField(max_length=8, primary_key=True, serialize=False),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,59 @@
-from django.db import models
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+TITLE_UNIQUE_CONSTRAINT = "tasks_task_title_ci_unique"
+DUPLICATE_TITLE_CODE = "duplicate_title"
+DUPLICATE_TITLE_MESSAGE = "同じタイトルのタスクが既に存在します。"
+
+
+class TaskQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Like ``QuerySet.update()``, but also stamps ``updated_at``."""
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Like ``QuerySet.bulk_create()``, but also counts the new tasks."""
+        from . import counters
+
+        using = self.db
+        with transaction.atomic(using=using, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+                # Which rows were actually inserted is unknown.
+                counters.recount(using)
+            else:
+                counters.added(created, using)
+        return created
+
+    def delete(self):
+        """Like ``QuerySet.delete()``, with one counter update for all rows."""
+        from . import counters
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            with counters.deferred():
+                return super().delete()
+
+    def filter_list(self, status=None, query=""):
+        """Apply the task list's ``status`` (open/done/all) and ``q`` filters."""
+        queryset = self
+        if status == "open":
+            queryset = queryset.filter(is_done=False)
+        elif status == "done":
+            queryset = queryset.filter(is_done=True)
+        query = (query or "").strip()
+        if query:
+            queryset = queryset.search(query)
+        return queryset
+
+    def search(self, query):
+        """Filter by ``query`` and annotate ``search_rank`` (higher is better)."""
+        from .search import get_search_backend
+
+        using = self._db or router.db_for_read(self.model)
+        return get_search_backend(using).search(self, query)
 
 
 # Create your models here.
@@ -7,9 +62,178 @@ class Task(models.Model):
     description = models.TextField(blank=True)
     is_done = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also stamped by TaskQuerySet.update(), so every write path moves it and
+    # the list's ETag/Last-Modified can be derived from Max(updated_at).
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TaskQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # Unfiltered list, admin date filters and the cursor seek.
+            models.Index(fields=["-created_at", "-id"], name="tasks_task_created_idx"),
+            # status=open/done and the admin is_done filter, already sorted.
+            models.Index(
+                fields=["is_done", "-created_at", "-id"],
+                name="tasks_task_done_created_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                Lower("title"),
+                name=TITLE_UNIQUE_CONSTRAINT,
+                violation_error_code=DUPLICATE_TITLE_CODE,
+                violation_error_message=DUPLICATE_TITLE_MESSAGE,
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        """Like ``Model.save()``, but counts a status change from the stored row.
+
+        The status loaded with the instance may be stale (a toggle since the
+        form was opened), so the row is locked and its status re-read in the
+        transaction of the save.
+        """
+        update_fields = kwargs.get("update_fields")
+        if self.pk is None or (
+            update_fields is not None and "is_done" not in update_fields
+        ):
+            return super().save(*args, **kwargs)
+        using = kwargs.get("using") or router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            # None when the row is gone; the save then inserts it.
+            self._counted_is_done = (
+                Task.objects.using(using)
+                .select_for_update()
+                .filter(pk=self.pk)
+                .order_by()
+                .values_list("is_done", flat=True)
+                .first()
+            )
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored status, so counters can tell whether a save() moved it.
+        instance._counted_is_done = instance.__dict__.get("is_done")
+        return instance
+
+    def validate_constraints(self, exclude=None):
+        """Report the case-insensitive title constraint against ``title``."""
+        try:
+            super().validate_constraints(exclude=exclude)
+        except ValidationError as exc:
+            non_field = exc.error_dict.pop(NON_FIELD_ERRORS, [])
+            for error in non_field:
+                key = (
+                    "title" if error.code == DUPLICATE_TITLE_CODE else NON_FIELD_ERRORS
+                )
+                exc.error_dict.setdefault(key, []).append(error)
+            raise
+
+
+def is_duplicate_title_error(exc: Exception) -> bool:
+    """Return whether an ``IntegrityError`` came from the title constraint."""
+    return TITLE_UNIQUE_CONSTRAINT in str(exc)
+
+
+class TaskCounter(models.Model):
+    """Number of tasks per status, maintained by :mod:`.counters`."""
+
+    status = models.CharField(max_length=8, primary_key=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+
+class ArchivedTask(models.Model):
+    """A done task moved out of ``tasks_task`` by ``manage.py archive_tasks``.
+
+    Keeps the task's id and columns (in the same order, so the list and the
+    export can ``UNION`` both tables) plus when it was archived.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    is_done = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="tasks_archived_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_workers``.
+
+    ``kind`` names a handler registered in :mod:`.jobs`; ``params`` and
+    ``result`` are its JSON input and output.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "待機中"),
+        (RUNNING, "実行中"),
+        (SUCCEEDED, "完了"),
+        (FAILED, "失敗"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveBigIntegerField(default=0)
+    total = models.PositiveBigIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # Workers claim the oldest runnable job; only queued rows matter.
+            models.Index(
+                fields=["run_after", "id"],
+                condition=models.Q(status="queued"),
+                name="tasks_job_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == self.SUCCEEDED else 0
+        return min(100, self.progress * 100 // self.total)
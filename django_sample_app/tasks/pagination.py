@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+@dataclass(frozen=True)
+class PageLink:
+    """One entry of a pagination window; ``number`` is ``None`` for a gap."""
+
+    number: int | None
+    current: bool = False
+
+    @property
+    def is_gap(self) -> bool:
+        return self.number is None
+
+
+def page_window(
+    number: int, num_pages: int, *, on_each_side: int = 2, on_ends: int = 1
+) -> list[PageLink]:
+    """Return the links to show around page ``number`` of ``num_pages``.
+
+    The first and last ``on_ends`` pages and ``on_each_side`` pages around the
+    current one are listed; longer runs in between collapse into a gap. The
+    cost depends on the window size only, never on ``num_pages``.
+    """
+    pages = {
+        page
+        for start, stop in (
+            (1, on_ends),
+            (number - on_each_side, number + on_each_side),
+            (num_pages - on_ends + 1, num_pages),
+        )
+        for page in range(max(start, 1), min(stop, num_pages) + 1)
+    }
+    links: list[PageLink] = []
+    previous = 0
+    for page in sorted(pages):
+        if page - previous == 2:
+            # A gap of one page is shorter as the page itself.
+            links.append(PageLink(page - 1))
+        elif page - previous > 2:
+            links.append(PageLink(None))
+        links.append(PageLink(page, current=page == number))
+        previous = page
+    return links
+
+
+class WindowedPaginator(Paginator):
+    """Paginator whose elided page range comes from :func:`page_window`.
+
+    Used by the task list and ``TaskAdmin``, whose changelist template reads
+    :meth:`get_elided_page_range`.
+    """
+
+    on_each_side = 2
+    on_ends = 1
+
+    def window(self, number: int) -> list[PageLink]:
+        return page_window(
+            number,
+            self.num_pages,
+            on_each_side=self.on_each_side,
+            on_ends=self.on_ends,
+        )
+
+    def get_elided_page_range(self, number=1, *, on_each_side=None, on_ends=None):
+        number = self.validate_number(number)
+        for link in page_window(
+            number,
+            self.num_pages,
+            on_each_side=self.on_each_side if on_each_side is None else on_each_side,
+            on_ends=self.on_ends if on_ends is None else on_ends,
+        ):
+            yield self.ELLIPSIS if link.is_gap else link.number
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position in the ``(-created_at, -id)`` ordering plus a direction."""
+
+    created_at: datetime
+    pk: int
+    direction: str = NEXT
+
+    def encode(self) -> str:
+        payload = json.dumps(
+            [self.direction, self.created_at.isoformat(), self.pk],
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> Cursor:
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            return cls(datetime.fromisoformat(created_at), int(pk), direction)
+        except (TypeError, ValueError) as exc:
+            raise InvalidCursor(token) from exc
+
+
+@dataclass
+class CursorPage:
+    """One page of results from :class:`CursorPaginator`."""
+
+    object_list: list[Any]
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """Keyset paginator seeking on ``(created_at, id)`` newest first.
+
+    Unlike :class:`django.core.paginator.Paginator` it never issues
+    ``COUNT(*)`` or ``OFFSET``; each page is a single indexed range scan
+    that fetches ``per_page + 1`` rows to detect whether more exist.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int) -> None:
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_queryset(self, cursor: Cursor | None) -> QuerySet:
+        """Return the seek query for the page after/before ``cursor``.
+
+        The redundant ``created_at <=``/``>=`` bound keeps the predicate
+        sargable, so the planner seeks into the ``(created_at, id)`` index
+        instead of scanning it.
+        """
+        queryset = self.queryset
+        if cursor is None or cursor.direction == NEXT:
+            queryset = queryset.order_by("-created_at", "-id")
+            if cursor is not None:
+                queryset = queryset.filter(
+                    Q(created_at__lt=cursor.created_at) | Q(id__lt=cursor.pk),
+                    created_at__lte=cursor.created_at,
+                )
+        else:
+            queryset = queryset.order_by("created_at", "id").filter(
+                Q(created_at__gt=cursor.created_at) | Q(id__gt=cursor.pk),
+                created_at__gte=cursor.created_at,
+            )
+        return queryset[: self.per_page + 1]
+
+    def page(self, token: str | None = None) -> CursorPage:
+        cursor = Cursor.decode(token) if token else None
+        return self._build_page(cursor, list(self.get_queryset(cursor)))
+
+    async def apage(self, token: str | None = None) -> CursorPage:
+        cursor = Cursor.decode(token) if token else None
+        rows = [row async for row in self.get_queryset(cursor)]
+        return self._build_page(cursor, rows)
+
+    def _build_page(self, cursor: Cursor | None, rows: list) -> CursorPage:
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if cursor is not None and cursor.direction == PREVIOUS:
+            rows.reverse()
+            has_newer, has_older = has_more, True
+        else:
+            has_newer, has_older = cursor is not None, has_more
+
+        page = CursorPage(rows)
+        if rows and has_older:
+            page.next_cursor = Cursor(rows[-1].created_at, rows[-1].pk, NEXT).encode()
+        if rows and has_newer:
+            page.previous_cursor = Cursor(
+                rows[0].created_at, rows[0].pk, PREVIOUS
+            ).encode()
+        return page
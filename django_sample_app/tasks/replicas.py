@@ -0,0 +1,225 @@
+"""Read-replica routing for the task list, search and export views.
+
+Reads only go to a replica inside views wrapped with :func:`use_replicas`;
+everything else (forms, admin, writes) uses ``default``. Each such request
+picks one replica, round-robin among those whose last health probe
+succeeded, and sends all of its reads there, so counts, validators and rows
+come from the same copy. Any write during a request sets a short-lived cookie
+that pins the client to the primary, so the list shown after a create/update
+redirect already contains the change even if the replicas lag behind. The
+list caches key their entries on :func:`read_alias` as well, so a pinned
+client is never served a page that a replica rendered.
+
+Health probes run in a background thread per process (started with the
+middleware), never on the request path: routing only reads their last
+results, which is safe in async views. A replica is unused until its first
+probe succeeds.
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "tasks_primary_pin"
+
+
+@dataclass
+class RequestState:
+    pinned: bool = False
+    wrote: bool = False
+
+
+# Mutable state so writes made in sync_to_async threads (which run in a copy
+# of the context) are still seen by the middleware.
+_request: ContextVar[RequestState | None] = ContextVar("tasks_replica_request")
+# The replica chosen for the current replica_reads() block (None: primary).
+_read_alias: ContextVar[str | None] = ContextVar("tasks_replica_alias", default=None)
+_counter = itertools.count()
+_healthy: dict[str, bool] = {}
+_monitor: threading.Thread | None = None
+_monitor_lock = threading.Lock()
+
+
+def get_replicas() -> list[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def probe(alias: str) -> bool:
+    """Check that ``alias`` accepts connections, from the calling thread."""
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        return connection.is_usable()
+    except DatabaseError:
+        return False
+
+
+def refresh_health() -> dict[str, bool]:
+    """Probe every replica and remember the results for the router."""
+    results = {alias: probe(alias) for alias in get_replicas()}
+    _healthy.update(results)
+    return results
+
+
+def _monitor_loop(stop: threading.Event) -> None:
+    while True:
+        try:
+            refresh_health()
+        except Exception:
+            logger.exception("Replica health check failed")
+        finally:
+            # This thread's connections; probes must not keep them open.
+            connections.close_all()
+        interval = getattr(settings, "DATABASE_REPLICA_HEALTH_INTERVAL", 5)
+        if stop.wait(interval):
+            return
+
+
+def start_monitor(stop: threading.Event | None = None) -> threading.Thread:
+    """Start this process's health-check thread, once."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None or not _monitor.is_alive():
+            _monitor = threading.Thread(
+                target=_monitor_loop,
+                args=(stop or threading.Event(),),
+                name="tasks-replica-health",
+                daemon=True,
+            )
+            _monitor.start()
+        return _monitor
+
+
+def is_healthy(alias: str) -> bool:
+    """The last probe result; ``False`` until ``alias`` has been probed."""
+    return _healthy.get(alias, False)
+
+
+def reset_health(**kwargs) -> None:
+    _healthy.clear()
+
+
+def choose_replica() -> str | None:
+    """Return the next healthy replica alias, or ``None`` to use the primary."""
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    start = next(_counter)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+def is_pinned() -> bool:
+    state = _request.get(None)
+    return state is not None and state.pinned
+
+
+def read_alias() -> str:
+    """The database the current request reads from."""
+    return _read_alias.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def replica_reads():
+    """Send reads inside the block to one replica (unless pinned)."""
+    token = _read_alias.set(None if is_pinned() else choose_replica())
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replicas(view):
+    """Decorate a (sync or async) view whose reads may be served by replicas."""
+    if iscoroutinefunction(view):
+
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+
+    else:
+
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return view(*args, **kwargs)
+
+    return functools.wraps(view)(wrapper)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        state = _request.get(None)
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Pin a client to the primary for a few seconds after it writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        start_monitor()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.process_response(state, response)
+
+    async def __acall__(self, request):
+        state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.process_response(state, response)
+
+    def process_response(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 10),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,273 @@
+"""Pluggable full-text search for :class:`~django_sample_app.tasks.models.Task`.
+
+Titles are mostly Japanese, which has no word separators, so both database
+backends index character bigrams rather than words: ``"資料作成"`` is stored as
+``"資料 料作 作成"`` and a query is matched as a phrase of its own bigrams.
+
+* SQLite: an FTS5 virtual table ``tasks_task_fts`` kept in sync by triggers
+  and ranked with ``bm25()``.
+* PostgreSQL: a GIN index over ``tasks_search_vector(title, description)``
+  ranked with ``ts_rank()``.
+* Anything else (or when the index is missing): ``icontains`` on both columns.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+SQLITE_FTS_TABLE = "tasks_task_fts"
+SQLITE_TRIGGERS = ("tasks_task_fts_ai", "tasks_task_fts_ad", "tasks_task_fts_au")
+
+
+def bigrams(text: str | None) -> str:
+    """Return ``text`` lower-cased and split into space separated bigrams."""
+    tokens: list[str] = []
+    for word in (text or "").lower().split():
+        if len(word) < 2:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return " ".join(tokens)
+
+
+def register_sqlite_functions(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver exposing :func:`bigrams` to SQLite."""
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "tasks_bigrams", 1, bigrams, deterministic=True
+        )
+
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE}
+    USING fts5(title, description, tokenize = 'unicode61')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ai AFTER INSERT ON tasks_task
+    BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, tasks_bigrams(new.title), tasks_bigrams(new.description));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ad AFTER DELETE ON tasks_task
+    BEGIN
+        DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_au
+    AFTER UPDATE OF title, description ON tasks_task
+    BEGIN
+        UPDATE {SQLITE_FTS_TABLE}
+        SET title = tasks_bigrams(new.title),
+            description = tasks_bigrams(new.description)
+        WHERE rowid = new.id;
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    f"DELETE FROM {SQLITE_FTS_TABLE}",
+    f"""
+    INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description)
+    SELECT id, tasks_bigrams(title), tasks_bigrams(description) FROM tasks_task
+    """,
+]
+
+SQLITE_UNINSTALL = [
+    *(f"DROP TRIGGER IF EXISTS {name}" for name in SQLITE_TRIGGERS),
+    f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}",
+]
+
+POSTGRES_INSTALL = [
+    r"""
+    CREATE OR REPLACE FUNCTION tasks_bigrams(txt text) RETURNS text AS $$
+        SELECT coalesce(string_agg(
+            CASE WHEN length(w) < 2 THEN w ELSE (
+                SELECT string_agg(substr(w, i, 2), ' ' ORDER BY i)
+                FROM generate_series(1, length(w) - 1) AS i
+            ) END, ' '), '')
+        FROM regexp_split_to_table(lower(coalesce(txt, '')), '\s+') AS w
+        WHERE w <> ''
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION tasks_search_vector(title text, description text)
+    RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('simple', tasks_bigrams(title)), 'A')
+            || setweight(to_tsvector('simple', tasks_bigrams(description)), 'B')
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS tasks_task_search_idx
+    ON tasks_task USING gin (tasks_search_vector(title, description))
+    """,
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS tasks_task_search_idx",
+    "DROP FUNCTION IF EXISTS tasks_search_vector(text, text)",
+    "DROP FUNCTION IF EXISTS tasks_bigrams(text)",
+]
+
+
+def _sqlite_has_fts5(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any("FTS5" in row[0] for row in cursor.fetchall())
+
+
+def _sqlite_missing_triggers(connection) -> set[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            ["tasks_task"],
+        )
+        return set(SQLITE_TRIGGERS) - {row[0] for row in cursor.fetchall()}
+
+
+def install(connection) -> None:
+    """Create (or repair) the search index objects for ``connection``.
+
+    Idempotent. On SQLite, table rebuilds done by later schema migrations drop
+    the triggers, so this also runs after every ``migrate`` and re-populates
+    the FTS table whenever a trigger had to be recreated.
+    """
+    if connection.vendor == "sqlite":
+        if not _sqlite_has_fts5(connection):
+            return
+        needs_rebuild = bool(_sqlite_missing_triggers(connection))
+        statements = SQLITE_INSTALL + (SQLITE_REBUILD if needs_rebuild else [])
+    elif connection.vendor == "postgresql":
+        statements = POSTGRES_INSTALL
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    reset_search_backends()
+
+
+def uninstall(connection) -> None:
+    statements = {"sqlite": SQLITE_UNINSTALL, "postgresql": POSTGRES_UNINSTALL}
+    with connection.cursor() as cursor:
+        for sql in statements.get(connection.vendor, []):
+            cursor.execute(sql)
+    reset_search_backends()
+
+
+def install_after_migrate(sender, using, **kwargs) -> None:
+    """``post_migrate`` receiver keeping the search index objects in place."""
+    connection = connections[using]
+    if "tasks_task" in connection.introspection.table_names():
+        install(connection)
+
+
+class IContainsSearchBackend:
+    """Fallback: case-insensitive substring match, no index, constant rank."""
+
+    name = "icontains"
+
+    def is_available(self, connection) -> bool:
+        return True
+
+    def search(self, queryset: QuerySet, query: str) -> QuerySet:
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    name = "sqlite-fts5"
+
+    def is_available(self, connection) -> bool:
+        return (
+            connection.vendor == "sqlite"
+            and SQLITE_FTS_TABLE in connection.introspection.table_names()
+        )
+
+    def search(self, queryset: QuerySet, query: str) -> QuerySet:
+        terms = bigrams(query)
+        if not any(ch.isalnum() for ch in terms) or len(query) < 2:
+            return super().search(queryset, query)
+        phrase = '"{}"'.format(terms.replace('"', '""'))
+        table = queryset.model._meta.db_table
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {SQLITE_FTS_TABLE} "
+                f"WHERE {SQLITE_FTS_TABLE} MATCH %s",
+                [phrase],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({SQLITE_FTS_TABLE}, 10.0, 1.0) "
+                f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s "
+                f'AND rowid = "{table}"."id"',
+                [phrase],
+                output_field=FloatField(),
+            )
+        )
+
+
+class PostgresSearchBackend(IContainsSearchBackend):
+    name = "postgres-tsvector"
+
+    def is_available(self, connection) -> bool:
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('tasks_task_search_idx')")
+            return cursor.fetchone()[0] is not None
+
+    def search(self, queryset: QuerySet, query: str) -> QuerySet:
+        if len(query) < 2:
+            return super().search(queryset, query)
+        tsquery = "phraseto_tsquery('simple', tasks_bigrams(%s))"
+        vector = "tasks_search_vector(title, description)"
+        return queryset.filter(
+            RawSQL(f"{vector} @@ {tsquery}", [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({vector}, {tsquery})", [query], output_field=FloatField()
+            )
+        )
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (
+        SQLiteFTSSearchBackend(),
+        PostgresSearchBackend(),
+        IContainsSearchBackend(),
+    )
+}
+
+
+def _select_backend(using: str):
+    connection = connections[using]
+    preferred = getattr(settings, "TASKS_SEARCH_BACKEND", "auto")
+    if preferred in BACKENDS:
+        return BACKENDS[preferred]
+    for backend in BACKENDS.values():
+        if backend.is_available(connection):
+            return backend
+    return BACKENDS["icontains"]
+
+
+_backends: dict[str, IContainsSearchBackend] = {}
+
+
+def get_search_backend(using: str = "default") -> IContainsSearchBackend:
+    """Return the search backend for the ``using`` database, cached per alias."""
+    if using not in _backends:
+        _backends[using] = _select_backend(using)
+    return _backends[using]
+
+
+def reset_search_backends(**kwargs) -> None:
+    _backends.clear()
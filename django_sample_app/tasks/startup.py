@@ -0,0 +1,122 @@
+"""Measure what a new process spends before it can serve its first request.
+
+``manage.py startup_profile`` runs :mod:`.startup_probe` in fresh
+interpreters started with ``python -X importtime`` (the command's own
+process has long imported everything) and reports, as medians over the runs:
+
+- phases: ``settings`` (the settings module and what it imports), ``apps``
+  (``django.setup()``, which fills the app registry), ``handler`` (the WSGI
+  or ASGI handler and its middleware) and ``urls`` (the URLconf, otherwise
+  loaded by the first request);
+- per app: creating its ``AppConfig``, importing its models, ``ready()``;
+- per module: the ``-X importtime`` figures, tagged with their phase, and
+  the same summed by top-level package.
+
+``-X importtime`` only sees ``import`` statements: modules that Django loads
+with ``importlib.import_module`` (the settings, app configs and models, the
+URLconf) are not listed, but their cost is in the phase and app timings.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+from . import startup_probe
+from .startup_probe import APP_STEPS, MARKER
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+# Imports before the first marker: the interpreter itself and the probe.
+INTERPRETER = "interpreter"
+
+
+@dataclass
+class Run:
+    phases: dict[str, float]
+    apps: dict[str, dict[str, float]]
+    # name -> (phase, self ms, cumulative ms)
+    modules: dict[str, tuple[str, float, float]]
+
+
+def parse_importtime(lines) -> dict[str, tuple[str, float, float]]:
+    """Read ``-X importtime`` output, split by the probe's phase markers."""
+    modules = {}
+    phase = INTERPRETER
+    for line in lines:
+        if line.startswith(MARKER):
+            phase = line[len(MARKER) :].strip()
+            continue
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, _, name = match.groups()
+            modules[name] = (phase, int(own) / 1000, int(cumulative) / 1000)
+    return modules
+
+
+def run_probe(entry: str, env: dict[str, str] | None = None, cwd=None) -> Run:
+    """Start one ``python -X importtime`` process like ``entry``."""
+    command = [sys.executable, "-X", "importtime", "-m", startup_probe.__name__, entry]
+    result = subprocess.run(
+        command, cwd=cwd, env=env, capture_output=True, text=True, check=False
+    )
+    if result.returncode:
+        last = (result.stderr.strip().splitlines() or ["no output"])[-1]
+        raise RuntimeError(f"Startup probe failed: {last}")
+    timings = json.loads(result.stdout)
+    return Run(
+        timings["phases"], timings["apps"], parse_importtime(result.stderr.splitlines())
+    )
+
+
+def summarise(runs: list[Run]) -> dict:
+    """Median of each figure over ``runs``."""
+    phases = {
+        name: statistics.median(run.phases[name] for run in runs)
+        for name in runs[0].phases
+    }
+    apps = {
+        label: {
+            step: statistics.median(run.apps[label].get(step, 0.0) for run in runs)
+            for step in ("create", *APP_STEPS.values())
+        }
+        for label in runs[0].apps
+    }
+    samples = defaultdict(list)
+    for run in runs:
+        for name, (phase, own, cumulative) in run.modules.items():
+            if phase in phases:
+                samples[name].append((phase, own, cumulative))
+    modules = {
+        name: {
+            "phase": values[0][0],
+            "self": statistics.median(value[1] for value in values),
+            "cumulative": statistics.median(value[2] for value in values),
+        }
+        for name, values in samples.items()
+    }
+    imports = defaultdict(lambda: {"modules": 0, "ms": 0.0})
+    packages = defaultdict(lambda: {"modules": 0, "ms": 0.0})
+    for name, module in modules.items():
+        for totals in (imports[module["phase"]], packages[name.partition(".")[0]]):
+            totals["modules"] += 1
+            totals["ms"] += module["self"]
+    return {
+        "runs": len(runs),
+        "total": sum(phases.values()),
+        "phases": {
+            name: {
+                "ms": ms,
+                "modules": imports[name]["modules"],
+                "import_ms": imports[name]["ms"],
+            }
+            for name, ms in phases.items()
+        },
+        "apps": apps,
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1]["ms"])),
+        "modules": modules,
+    }
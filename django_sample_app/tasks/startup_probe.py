@@ -0,0 +1,103 @@
+"""Start Django in phases; run by ``manage.py startup_profile``.
+
+Runs in a fresh ``python -X importtime`` interpreter. It writes a marker line
+to stderr before each phase, so the parent can tell which phase imported
+each module, and prints the phase and per-app timings as JSON on stdout.
+Only modules the interpreter has already loaded are imported here, so none
+of the startup cost is hidden before the first marker.
+"""
+
+import os
+import sys
+import time
+
+ENTRIES = ("setup", "wsgi", "asgi")
+MARKER = "startup_profile phase:"
+# Written after the last phase; imports from then on are the probe's own.
+END = "end"
+APP_STEPS = {"import_models": "models", "ready": "ready"}
+
+
+def mark(phase: str) -> float:
+    sys.stderr.write(f"{MARKER} {phase}\n")
+    sys.stderr.flush()
+    return time.perf_counter()
+
+
+def elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def timed(method, timings: dict[str, float], name: str):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings[name] = elapsed_ms(started)
+
+    return wrapper
+
+
+def time_app_configs(timings: dict[str, dict[str, float]]) -> None:
+    """Record creating, importing the models of and readying each app."""
+    from django.apps.config import AppConfig
+
+    create = AppConfig.create.__func__
+
+    def timed_create(cls, entry):
+        started = time.perf_counter()
+        config = create(cls, entry)
+        app = timings.setdefault(config.label, {"create": elapsed_ms(started)})
+        for method, name in APP_STEPS.items():
+            # The registry calls these on the instance after creating it.
+            setattr(config, method, timed(getattr(config, method), app, name))
+        return config
+
+    AppConfig.create = classmethod(timed_create)
+
+
+def probe(entry: str = "wsgi") -> None:
+    """Start Django the way ``entry`` does, phase by phase."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_sample_app.settings")
+    if entry == "asgi":
+        os.environ.setdefault("DJANGO_SERVER_INTERFACE", "asgi")
+    phases = {}
+    apps = {}
+
+    started = mark("settings")
+    from django.conf import settings
+
+    settings.INSTALLED_APPS
+    phases["settings"] = elapsed_ms(started)
+
+    started = mark("apps")
+    import django
+
+    time_app_configs(apps)
+    django.setup(set_prefix=entry == "setup")
+    phases["apps"] = elapsed_ms(started)
+
+    if entry != "setup":
+        started = mark("handler")
+        if entry == "wsgi":
+            from django.core.handlers.wsgi import WSGIHandler as Handler
+        else:
+            from django.core.handlers.asgi import ASGIHandler as Handler
+        Handler()
+        phases["handler"] = elapsed_ms(started)
+
+        started = mark("urls")
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+        phases["urls"] = elapsed_ms(started)
+
+    mark(END)
+    import json
+
+    json.dump({"phases": phases, "apps": apps}, sys.stdout)
+
+
+if __name__ == "__main__":
+    probe(*sys.argv[1:])
@@ -1,7 +1,63 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.session import SessionStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, router, transaction
+from django.http import Http404, HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    Client,
+    RequestFactory,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Task
+from . import (
+    archive,
+    assets,
+    async_views,
+    bulk,
+    conditional,
+    counters,
+    events,
+    export,
+    jobs,
+    replicas,
+    startup,
+    timing,
+    warmup,
+)
+from . import cache as page_cache
+from .budgets import (
+    DATASET_SIZES,
+    URL_BUDGETS,
+    QueryBudgetExceeded,
+    assert_url_budget,
+    query_budget,
+    seed_tasks,
+)
+from .models import ArchivedTask, Job, Task, TaskCounter
+from .pagination import WindowedPaginator, page_window
+from .search import bigrams, get_search_backend
 
 
 class TaskTests(TestCase):
@@ -21,9 +77,34 @@ class TaskTests(TestCase):
         res = self.client.get(reverse("tasks:list"))
         self.assertContains(res, "Write docs")
 
+    def test_url_query_budgets(self):
+        for size in DATASET_SIZES:
+            Task.objects.all().delete()
+            seed_tasks(size)
+            for budget in URL_BUDGETS:
+                with self.subTest(size=size, url=budget.label):
+                    task = Task.objects.create(title=f"Budget target {budget.label}")
+                    assert_url_budget(self.client, budget, task)
+
+    def test_query_budget_failure_lists_sql(self):
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            with query_budget(1, label="two counts"):
+                Task.objects.count()
+                Task.objects.filter(is_done=True).count()
+        message = str(ctx.exception)
+        self.assertIn("two counts exceeded its query budget: 2 queries", message)
+        self.assertEqual(message.count("SELECT COUNT(*)"), 2)
+
+    def test_query_budget_as_decorator(self):
+        @query_budget(0)
+        def render_form():
+            return self.client.get(reverse("tasks:create"))
+
+        self.assertEqual(render_form().status_code, 200)
+
     def test_toggle_done(self):
         t = Task.objects.create(title="Do it")
-        res = self.client.get(reverse("tasks:toggle", args=[t.pk]))
+        res = self.client.post(reverse("tasks:toggle", args=[t.pk]))
         self.assertRedirects(res, reverse("tasks:list"))
         t.refresh_from_db()
         self.assertTrue(t.is_done)
@@ -144,3 +225,1850 @@ class TaskTests(TestCase):
             form.errors["description"], ["タイトルと説明を同じ内容にはできません。"]
         )
         self.assertEqual(Task.objects.count(), 0)
+
+
+@override_settings(TASKS_PAGINATION="cursor")
+class TaskCursorPaginationTests(TestCase):
+    def setUp(self):
+        base = timezone.now()
+        for idx in range(12):
+            task = Task.objects.create(title=f"Task {idx}", is_done=idx % 2 == 0)
+            Task.objects.filter(pk=task.pk).update(
+                created_at=base + timedelta(minutes=idx)
+            )
+
+    def test_first_page_has_no_count_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("tasks:list"))
+        self.assertFalse(
+            any("COUNT(" in q["sql"].upper() for q in ctx.captured_queries)
+        )
+        self.assertIsNone(res.context["page_obj"])
+        page = res.context["cursor_page"]
+        self.assertEqual([t.title for t in page][0], "Task 11")
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+    def test_next_and_previous_cursors_round_trip(self):
+        first = self.client.get(reverse("tasks:list")).context["cursor_page"]
+        res = self.client.get(reverse("tasks:list"), {"cursor": first.next_cursor})
+        second = res.context["cursor_page"]
+        self.assertEqual([t.title for t in second], ["Task 1", "Task 0"])
+        self.assertFalse(second.has_next)
+        self.assertTrue(second.has_previous)
+
+        res = self.client.get(reverse("tasks:list"), {"cursor": second.previous_cursor})
+        back = res.context["cursor_page"]
+        self.assertEqual([t.pk for t in back], [t.pk for t in first])
+        self.assertFalse(back.has_previous)
+
+    def test_cursor_respects_filters_and_links(self):
+        for idx in range(12, 24):
+            Task.objects.create(title=f"Open {idx}")
+        res = self.client.get(reverse("tasks:list"), {"status": "open", "q": "Open"})
+        page = res.context["cursor_page"]
+        self.assertTrue(all(not t.is_done for t in page))
+        self.assertContains(res, f"?status=open&amp;q=Open&cursor={page.next_cursor}")
+
+        res = self.client.get(
+            reverse("tasks:list"),
+            {"status": "open", "q": "Open", "cursor": page.next_cursor},
+        )
+        titles = [t.title for t in res.context["cursor_page"]]
+        self.assertEqual(titles, ["Open 13", "Open 12"])
+
+    def test_invalid_cursor_returns_404(self):
+        res = self.client.get(reverse("tasks:list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, 404)
+
+
+class TaskPageWindowTests(TestCase):
+    def numbers(self, links):
+        return [link.number or "…" for link in links]
+
+    def test_window_around_middle_page(self):
+        links = page_window(50, 100)
+        self.assertEqual(self.numbers(links), [1, "…", 48, 49, 50, 51, 52, "…", 100])
+        self.assertEqual([link.number for link in links if link.current], [50])
+
+    def test_window_at_the_ends(self):
+        self.assertEqual(self.numbers(page_window(1, 100)), [1, 2, 3, "…", 100])
+        self.assertEqual(self.numbers(page_window(100, 100)), [1, "…", 98, 99, 100])
+        self.assertEqual(self.numbers(page_window(2, 3)), [1, 2, 3])
+
+    def test_single_page_gap_shows_the_page(self):
+        self.assertEqual(self.numbers(page_window(4, 10)), [1, 2, 3, 4, 5, 6, "…", 10])
+
+    def test_window_size_does_not_depend_on_page_count(self):
+        self.assertEqual(len(page_window(500_000, 1_000_000)), 9)
+
+    def test_elided_page_range_for_admin(self):
+        paginator = WindowedPaginator(range(1000), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, paginator.ELLIPSIS, 48, 49, 50, 51, 52, paginator.ELLIPSIS, 100],
+        )
+
+    def test_list_renders_window_links(self):
+        for idx in range(120):
+            Task.objects.create(title=f"Task {idx}")
+        res = self.client.get(reverse("tasks:list"), {"page": 6})
+        self.assertEqual(res.content.decode().count('<span class="page-link">…'), 2)
+        self.assertContains(res, 'href="?page=12"')
+        self.assertContains(res, 'href="?page=8"')
+        self.assertNotContains(res, 'href="?page=9"')
+
+    def test_list_with_a_million_pages(self):
+        state = {"count": 10_000_000, "last_modified": None}
+        with mock.patch.object(conditional, "list_state", return_value=state):
+            res = self.client.get(reverse("tasks:list"), {"page": 500_000})
+        self.assertEqual(len(res.context["page_links"]), 9)
+        self.assertContains(res, 'href="?page=1000000"')
+
+    def test_admin_changelist_uses_window(self):
+        admin_user = User.objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.force_login(admin_user)
+        Task.objects.bulk_create(Task(title=f"Task {idx}") for idx in range(1000))
+        res = self.client.get(reverse("admin:tasks_task_changelist"), {"p": 6})
+        self.assertIsInstance(res.context["cl"].paginator, WindowedPaginator)
+        self.assertContains(res, '?p=10"')
+        self.assertNotContains(res, '?p=2"')
+
+    def test_templates_use_cached_loader(self):
+        from django.template import engines
+
+        loaders = engines["django"].engine.template_loaders
+        self.assertEqual([loader.__class__.__name__ for loader in loaders], ["Loader"])
+        self.assertEqual(loaders[0].__module__, "django.template.loaders.cached")
+
+
+class TaskSearchTests(TestCase):
+    def test_bigrams_splits_words_into_character_pairs(self):
+        self.assertEqual(bigrams("資料作成 API a"), "資料 料作 作成 ap pi a")
+
+    def test_sqlite_uses_fts_backend(self):
+        self.assertEqual(get_search_backend().name, "sqlite-fts5")
+
+    def test_japanese_two_character_query(self):
+        Task.objects.create(title="会議資料を作成する")
+        Task.objects.create(title="資格試験の勉強")
+        Task.objects.create(title="買い物")
+        titles = set(Task.objects.search("資料").values_list("title", flat=True))
+        self.assertEqual(titles, {"会議資料を作成する"})
+
+    def test_index_follows_updates_and_deletes(self):
+        task = Task.objects.create(title="Draft report")
+        Task.objects.filter(pk=task.pk).update(title="Final summary")
+        self.assertFalse(Task.objects.search("report").exists())
+        self.assertTrue(Task.objects.search("summary").exists())
+        task.delete()
+        self.assertFalse(Task.objects.search("summary").exists())
+
+    def test_title_matches_rank_above_description_matches(self):
+        Task.objects.create(title="Plan sprint", description="Write docs later")
+        Task.objects.create(title="Write docs")
+        res = self.client.get(reverse("tasks:list"), {"q": "docs"})
+        self.assertEqual(
+            [t.title for t in res.context["tasks"]], ["Write docs", "Plan sprint"]
+        )
+
+    @override_settings(TASKS_SEARCH_BACKEND="icontains")
+    def test_icontains_fallback(self):
+        Task.objects.create(title="Write documentation")
+        Task.objects.create(title="Random task")
+        self.assertEqual(get_search_backend().name, "icontains")
+        titles = list(Task.objects.search("doc").values_list("title", flat=True))
+        self.assertEqual(titles, ["Write documentation"])
+
+
+class TaskTitleUniquenessTests(TestCase):
+    def test_database_rejects_case_insensitive_duplicate(self):
+        Task.objects.create(title="Write docs")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Task.objects.create(title="WRITE DOCS")
+
+    def test_update_keeps_own_title_with_new_case(self):
+        task = Task.objects.create(title="Write docs")
+        res = self.client.post(
+            reverse("tasks:update", args=[task.pk]), {"title": "Write Docs"}
+        )
+        self.assertRedirects(res, reverse("tasks:list"))
+        task.refresh_from_db()
+        self.assertEqual(task.title, "Write Docs")
+
+    def test_integrity_error_maps_to_form_error(self):
+        Task.objects.create(title="Duplicate")
+        # Simulate a concurrent writer winning the race after validation.
+        with mock.patch.object(Task, "validate_constraints"):
+            res = self.client.post(reverse("tasks:create"), {"title": "duplicate"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.context["form"].errors["title"],
+            ["同じタイトルのタスクが既に存在します。"],
+        )
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_dedupe_command_renames_duplicates_in_batches(self):
+        # Simulate legacy data loaded before the unique index existed; the DDL
+        # is rolled back with the test transaction.
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX tasks_task_title_ci_unique")
+        keep = Task.objects.create(title="Report")
+        Task.objects.create(title="report")
+        Task.objects.create(title="REPORT")
+        Task.objects.create(title="Other")
+        Task.objects.create(title="other")
+
+        out = StringIO()
+        call_command("dedupe_task_titles", "--dry-run", stdout=out)
+        self.assertIn("3 task(s) would be renamed.", out.getvalue())
+
+        call_command("dedupe_task_titles", "--batch-size=1", stdout=StringIO())
+        titles = set(Task.objects.values_list("title", flat=True))
+        self.assertEqual(
+            titles, {"Report", "report (2)", "REPORT (3)", "Other", "other (2)"}
+        )
+        keep.refresh_from_db()
+        self.assertEqual(keep.title, "Report")
+
+
+class TaskQueryPlanTests(TestCase):
+    def test_explain_command_reports_list_indexes(self):
+        out = StringIO()
+        call_command("explain_task_queries", stdout=out)
+        output = out.getvalue()
+        self.assertIn("== list status=open (page 1)", output)
+        self.assertIn("== admin is_done+created_at", output)
+        self.assertIn("tasks_task_created_idx", output)
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite profile")
+class SQLiteProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_uses_profile(self):
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("temp_store"), 2)  # MEMORY
+        self.assertEqual(self.pragma("cache_size"), -20000)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+    def test_options_skip_empty_and_reject_unsafe_values(self):
+        from django_sample_app import settings as project_settings
+
+        pragmas = {"journal_mode": "", "synchronous": "OFF"}
+        with mock.patch.object(project_settings, "SQLITE_PRAGMAS", pragmas):
+            options = project_settings.sqlite_options()
+        self.assertEqual(options["init_command"], "PRAGMA synchronous=OFF;")
+
+        pragmas = {"synchronous": "OFF; DROP TABLE tasks_task"}
+        with mock.patch.object(project_settings, "SQLITE_PRAGMAS", pragmas):
+            with self.assertRaises(ValueError):
+                project_settings.sqlite_options()
+
+
+class DatabasePoolSettingsTests(TestCase):
+    def test_postgres_options_combine_ssl_and_pool(self):
+        from django_sample_app import settings as project_settings
+
+        database = {"ENGINE": "django.db.backends.postgresql", "CONN_MAX_AGE": 600}
+        with (
+            mock.patch.object(project_settings, "DATABASE_POOL", True),
+            mock.patch.dict("os.environ", {"DJANGO_DB_SSL": "True"}),
+        ):
+            project_settings.configure_database(database)
+        self.assertEqual(database["OPTIONS"]["sslmode"], "require")
+        self.assertEqual(
+            database["OPTIONS"]["pool"], project_settings.DATABASE_POOL_OPTIONS
+        )
+        # Django's pool refuses persistent connections.
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+
+    def test_pool_is_postgres_only(self):
+        from django_sample_app import settings as project_settings
+
+        with mock.patch.object(project_settings, "DATABASE_POOL", True):
+            sqlite = project_settings.configure_database(
+                {"ENGINE": "django.db.backends.sqlite3", "CONN_MAX_AGE": 600}
+            )
+            other = project_settings.configure_database(
+                {"ENGINE": "django.db.backends.mysql", "CONN_MAX_AGE": 600}
+            )
+        self.assertIn("init_command", sqlite["OPTIONS"])
+        self.assertEqual(sqlite["CONN_MAX_AGE"], 600)
+        self.assertNotIn("OPTIONS", other)
+
+
+class WorkerWarmupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Task.objects.create(title="Canary")
+
+    def test_warm_up_runs_every_step(self):
+        with self.assertNoLogs("django_sample_app.tasks.warmup", "WARNING"):
+            timings = warmup.warm_up()
+        self.assertEqual(list(timings), list(warmup.STEPS))
+
+    def test_failing_step_is_skipped(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        steps = {**warmup.STEPS, "urls": broken}
+        with (
+            mock.patch.object(warmup, "STEPS", steps),
+            self.assertLogs("django_sample_app.tasks.warmup", "WARNING") as logs,
+        ):
+            timings = warmup.warm_up()
+        self.assertIn("Warm-up step urls failed", logs.output[0])
+        self.assertIn("canary", timings)
+
+    def test_on_startup_follows_setting_and_leaves_the_event_loop(self):
+        threads = []
+        with mock.patch.object(
+            warmup,
+            "warm_up",
+            side_effect=lambda: threads.append(threading.current_thread()),
+        ):
+            with override_settings(TASKS_WARMUP=False):
+                warmup.on_startup()
+            self.assertEqual(threads, [])
+            with override_settings(TASKS_WARMUP=True):
+                warmup.on_startup()
+                self.assertIs(threads[-1], threading.current_thread())
+
+                async def load_app():
+                    warmup.on_startup()
+
+                asyncio.run(load_app())
+        self.assertEqual(len(threads), 2)
+        self.assertIsNot(threads[-1], threading.current_thread())
+
+
+class AppProfileTests(TestCase):
+    def lean_settings(self):
+        from django_sample_app import settings as project_settings
+
+        dropped = project_settings.APP_PROFILES["lean"]
+        return override_settings(
+            MIDDLEWARE=project_settings.without_apps(
+                project_settings.MIDDLEWARE, dropped
+            )
+        )
+
+    def test_lean_profile_drops_admin_auth_and_messages(self):
+        from django_sample_app import settings as project_settings
+
+        dropped = project_settings.APP_PROFILES["lean"]
+        middleware = project_settings.without_apps(project_settings.MIDDLEWARE, dropped)
+        self.assertNotIn(
+            "django.contrib.auth.middleware.AuthenticationMiddleware", middleware
+        )
+        self.assertNotIn(
+            "django.contrib.messages.middleware.MessageMiddleware", middleware
+        )
+        self.assertIn(
+            "django.contrib.sessions.middleware.SessionMiddleware", middleware
+        )
+        self.assertEqual(
+            project_settings.without_apps(
+                ["django.contrib.admin", "django.contrib.admindocs"],
+                ["django.contrib.admin"],
+            ),
+            ["django.contrib.admindocs"],
+        )
+
+    def test_views_work_without_the_messages_middleware(self):
+        with self.lean_settings():
+            res = self.client.post(reverse("tasks:create"), {"title": "Lean"})
+            self.assertRedirects(res, reverse("tasks:list"))
+            task = Task.objects.get(title="Lean")
+            res = self.client.post(reverse("tasks:toggle", args=[task.pk]))
+            self.assertEqual(res.status_code, 302)
+            res = self.client.get(reverse("tasks:list"))
+            self.assertContains(res, "Lean")
+
+
+class StartupProfileTests(TestCase):
+    def test_parse_importtime_splits_phases(self):
+        lines = [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 | encodings",
+            "startup_profile phase: settings",
+            "import time:      1500 |       1500 |   dotenv.main",
+            "import time:       500 |       2000 | dotenv",
+            "startup_profile phase: apps",
+            "import time:      2500 |       2500 | django_sample_app.tasks.models",
+        ]
+        self.assertEqual(
+            startup.parse_importtime(lines),
+            {
+                "encodings": ("interpreter", 0.12, 0.12),
+                "dotenv.main": ("settings", 1.5, 1.5),
+                "dotenv": ("settings", 0.5, 2.0),
+                "django_sample_app.tasks.models": ("apps", 2.5, 2.5),
+            },
+        )
+
+    def test_command_profiles_each_app_profile(self):
+        out = StringIO()
+        call_command(
+            "startup_profile",
+            "--runs=1",
+            "--json",
+            "--app-profile",
+            "full",
+            "lean",
+            stdout=out,
+        )
+        profiles = json.loads(out.getvalue())["profiles"]
+        full, lean = profiles["full"], profiles["lean"]
+        self.assertEqual(list(full["phases"]), ["settings", "apps", "handler", "urls"])
+        # Imported by TasksConfig.ready().
+        self.assertEqual(
+            full["modules"]["django_sample_app.tasks.cache"]["phase"], "apps"
+        )
+        self.assertIn("admin", full["apps"])
+        self.assertIn("django.contrib.admin.sites", full["modules"])
+        self.assertNotIn("admin", lean["apps"])
+        self.assertEqual(set(lean["apps"]), {"sessions", "staticfiles", "tasks"})
+        self.assertNotIn("django.contrib.admin.sites", lean["modules"])
+
+    def test_text_report(self):
+        out = StringIO()
+        call_command(
+            "startup_profile", "--runs=1", "--entry=setup", "--limit=3", stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn("profile, setup:", output)
+        self.assertIn("tasks", output)
+        self.assertNotIn("handler", output)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], TASKS_PAGE_CACHE_TIMEOUT=0)
+class TaskReplicaRoutingTests(TestCase):
+    """A separate test database stands in for a (lagging) replica."""
+
+    databases = {"default", "replica1"}
+
+    def setUp(self):
+        # Probed here instead of by the middleware's background thread.
+        self.start_monitor = replicas.start_monitor
+        patcher = mock.patch.object(replicas, "start_monitor")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        replicas.reset_health()
+        replicas.refresh_health()
+        Task.objects.create(title="Primary only")
+        Task.objects.using("replica1").create(title="Replica only")
+
+    def test_list_and_search_read_from_replica(self):
+        res = self.client.get(reverse("tasks:list"))
+        self.assertContains(res, "Replica only")
+        self.assertNotContains(res, "Primary only")
+        res = self.client.get(reverse("tasks:list"), {"q": "Replica"})
+        self.assertContains(res, "Replica only")
+
+    def test_export_reads_from_replica(self):
+        res = self.client.get(reverse("tasks:export"))
+        body = b"".join(res.streaming_content).decode()
+        self.assertIn("Replica only", body)
+        self.assertNotIn("Primary only", body)
+
+    def test_other_views_use_primary(self):
+        task = Task.objects.get(title="Primary only")
+        res = self.client.get(reverse("tasks:update", args=[task.pk]))
+        self.assertContains(res, "Primary only")
+
+    def test_write_pins_client_to_primary(self):
+        res = self.client.post(reverse("tasks:create"), {"title": "Brand new"})
+        self.assertIn(replicas.PIN_COOKIE, res.cookies)
+        res = self.client.get(reverse("tasks:list"))
+        self.assertContains(res, "Brand new")
+        self.assertNotContains(res, "Replica only")
+        self.assertNotIn(replicas.PIN_COOKIE, res.cookies)
+
+    def test_pinned_client_is_not_served_a_replica_page(self):
+        settings = self.settings(TASKS_PAGE_CACHE_TIMEOUT=300)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Changing settings forgets the probe results.
+        replicas.refresh_health()
+        cache.clear()
+        other = Client()
+        res = self.client.post(reverse("tasks:create"), {"title": "Brand new"})
+        self.assertIn(replicas.PIN_COOKIE, res.cookies)
+        # Another client caches the list rendered from the lagging replica.
+        self.assertNotContains(other.get(reverse("tasks:list")), "Brand new")
+        res = self.client.get(reverse("tasks:list"))
+        self.assertContains(res, "Brand new")
+        self.assertEqual(res["ETag"], self.client.get(reverse("tasks:list"))["ETag"])
+        self.assertNotContains(other.get(reverse("tasks:list")), "Brand new")
+
+    async def test_async_list_reads_from_replica_without_probing(self):
+        view = replicas.use_replicas(async_views.AsyncTaskListView.as_view())
+        request = AsyncRequestFactory().get(reverse("tasks:list"))
+        # Every health result is stale; the request must still not probe.
+        with self.settings(DATABASE_REPLICA_HEALTH_INTERVAL=0):
+            await sync_to_async(replicas.refresh_health)()
+            with mock.patch.object(replicas, "probe", side_effect=AssertionError):
+                res = await view(request)
+        self.assertContains(res, "Replica only")
+        self.assertNotContains(res, "Primary only")
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        with mock.patch.object(
+            connections["replica1"], "is_usable", return_value=False
+        ):
+            self.assertEqual(replicas.refresh_health(), {"replica1": False})
+        res = self.client.get(reverse("tasks:list"))
+        self.assertContains(res, "Primary only")
+
+    def test_unprobed_replica_is_not_used(self):
+        replicas.reset_health()
+        res = self.client.get(reverse("tasks:list"))
+        self.assertContains(res, "Primary only")
+
+    def test_monitor_probes_in_the_background(self):
+        replicas.reset_health()
+        stop = threading.Event()
+        thread = self.start_monitor(stop)
+        try:
+            for _ in range(100):
+                if replicas.is_healthy("replica1"):
+                    break
+                stop.wait(0.05)
+            self.assertTrue(replicas.is_healthy("replica1"))
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+    @override_settings(DATABASE_REPLICAS=["a", "b"])
+    def test_round_robin_skips_unhealthy_replicas(self):
+        with mock.patch.object(replicas, "is_healthy", return_value=True):
+            self.assertEqual({replicas.choose_replica() for _ in range(4)}, {"a", "b"})
+        with mock.patch.object(replicas, "is_healthy", side_effect=lambda a: a == "b"):
+            self.assertEqual({replicas.choose_replica() for _ in range(4)}, {"b"})
+        with mock.patch.object(replicas, "is_healthy", return_value=False):
+            self.assertIsNone(replicas.choose_replica())
+
+    @override_settings(DATABASE_REPLICAS=["a", "b"])
+    def test_one_replica_per_request(self):
+        chosen = set()
+        with mock.patch.object(replicas, "is_healthy", return_value=True):
+            for _ in range(2):
+                with replicas.replica_reads():
+                    aliases = {router.db_for_read(Task) for _ in range(5)}
+                self.assertEqual(len(aliases), 1)
+                chosen |= aliases
+        self.assertEqual(chosen, {"a", "b"})
+        self.assertEqual(router.db_for_read(Task), "default")
+
+
+@override_settings(TASKS_TIMING_SAMPLE_RATE=1.0, TASKS_PAGE_CACHE_TIMEOUT=0)
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        Task.objects.create(title="Timed task")
+
+    def timings(self, response):
+        entries = {}
+        for entry in response["Server-Timing"].split(", "):
+            name, *params = entry.split(";")
+            entries[name] = dict(param.split("=", 1) for param in params)
+        return entries
+
+    def test_sampled_request_reports_db_template_and_total(self):
+        with self.assertLogs("django_sample_app.tasks.timing", "INFO") as logs:
+            res = self.client.get(reverse("tasks:list"))
+        timings = self.timings(res)
+        self.assertEqual(set(timings), {"db", "tpl", "total"})
+        self.assertNotEqual(timings["db"]["desc"], '"0 queries"')
+        self.assertGreater(float(timings["tpl"]["dur"]), 0)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "request")
+        self.assertEqual(record["path"], "/")
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(set(record["databases"]), {"default"})
+        self.assertNotIn("sql", record)
+
+    async def test_async_requests_are_timed(self):
+        with self.assertLogs("django_sample_app.tasks.timing", "INFO"):
+            res = await self.async_client.get(reverse("tasks:list"))
+        self.assertNotEqual(self.timings(res)["db"]["desc"], '"0 queries"')
+
+    def test_slow_requests_log_their_sql(self):
+        recorder = timing.Recorder(queries=[("default", "SELECT 1", 0.7)])
+        request = RequestFactory().get("/")
+        with self.assertLogs("django_sample_app.tasks.timing", "WARNING") as logs:
+            timing.log_request(request, HttpResponse(), recorder, total=0.8)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["event"], "slow_request")
+        self.assertEqual(
+            record["sql"], [{"db": "default", "ms": 700.0, "sql": "SELECT 1"}]
+        )
+
+    @override_settings(TASKS_TIMING_SAMPLE_RATE=0)
+    def test_sampling_off_removes_the_middleware(self):
+        res = self.client.get(reverse("tasks:list"))
+        self.assertFalse(res.has_header("Server-Timing"))
+
+
+class TaskPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Task.objects.create(title="Cached task")
+
+    def test_second_request_is_served_from_cache_without_queries(self):
+        first = self.client.get(reverse("tasks:list"), {"status": "open"})
+        self.assertEqual(first["X-Tasks-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("tasks:list"), {"status": "open"})
+        self.assertEqual(second["X-Tasks-Cache"], "HIT")
+        self.assertContains(second, "Cached task")
+
+    def test_filters_get_separate_entries(self):
+        self.client.get(reverse("tasks:list"))
+        res = self.client.get(reverse("tasks:list"), {"status": "done"})
+        self.assertEqual(res["X-Tasks-Cache"], "MISS")
+        self.assertNotContains(res, "Cached task")
+
+    def test_writes_invalidate_cached_pages(self):
+        self.client.get(reverse("tasks:list"))
+        self.client.post(reverse("tasks:create"), {"title": "Fresh task"})
+        res = self.client.get(reverse("tasks:list"))
+        self.assertEqual(res["X-Tasks-Cache"], "MISS")
+        self.assertContains(res, "Fresh task")
+
+    def test_stats_command_reports_hits_and_misses(self):
+        self.client.get(reverse("tasks:list"))
+        self.client.get(reverse("tasks:list"))
+        out = StringIO()
+        call_command("task_cache_stats", "--reset", stdout=out)
+        self.assertIn("hits:    1", out.getvalue())
+        self.assertIn("misses:  1", out.getvalue())
+        self.assertEqual(page_cache.stats()["hits"], 0)
+
+    @override_settings(TASKS_PAGE_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.client.get(reverse("tasks:list"))
+        res = self.client.get(reverse("tasks:list"))
+        self.assertFalse(res.has_header("X-Tasks-Cache"))
+
+
+class TaskToggleTests(TestCase):
+    def setUp(self):
+        self.task = Task.objects.create(title="Flip me", description="keep")
+
+    def test_toggle_requires_post(self):
+        res = self.client.get(reverse("tasks:toggle", args=[self.task.pk]))
+        self.assertEqual(res.status_code, 405)
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.is_done)
+
+    def test_toggle_is_a_single_update_statement(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(
+                reverse("tasks:toggle", args=[self.task.pk]),
+                headers={"accept": "application/json"},
+            )
+        updates = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "tasks_task" ')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("NOT", updates[0])
+        self.assertNotIn("description", updates[0])
+
+    def test_toggle_json_response(self):
+        res = self.client.post(
+            reverse("tasks:toggle", args=[self.task.pk]),
+            headers={"accept": "application/json"},
+        )
+        self.assertEqual(
+            res.json(), {"id": self.task.pk, "title": "Flip me", "is_done": True}
+        )
+
+    def test_toggle_fetch_returns_list_item_fragment(self):
+        res = self.client.post(
+            reverse("tasks:toggle", args=[self.task.pk]),
+            headers={"x-requested-with": "fetch"},
+        )
+        html = res.content.decode()
+        self.assertTrue(html.startswith("<li"))
+        self.assertIn('data-is-done="true"', html)
+        self.assertNotIn("<html", html)
+
+    def test_toggle_twice_restores_state(self):
+        url = reverse("tasks:toggle", args=[self.task.pk])
+        self.client.post(url)
+        self.client.post(url)
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.is_done)
+
+    def test_toggle_missing_task_returns_404(self):
+        res = self.client.post(reverse("tasks:toggle", args=[self.task.pk + 1]))
+        self.assertEqual(res.status_code, 404)
+
+    def test_item_fragment(self):
+        res = self.client.get(reverse("tasks:item", args=[self.task.pk]))
+        self.assertTrue(res.content.decode().startswith("<li"))
+        res = self.client.get(reverse("tasks:item", args=[self.task.pk + 1]))
+        self.assertEqual(res.status_code, 404)
+
+
+class TaskBulkActionTests(TestCase):
+    def setUp(self):
+        self.tasks = [Task.objects.create(title=f"Bulk {idx}") for idx in range(5)]
+
+    def post_bulk(self, data, **kwargs):
+        return self.client.post(reverse("tasks:bulk"), data, **kwargs)
+
+    def test_mark_done_and_open(self):
+        ids = [t.pk for t in self.tasks[:3]]
+        res = self.post_bulk({"action": "done", "ids": ids})
+        self.assertRedirects(res, reverse("tasks:list"))
+        self.assertEqual(Task.objects.filter(is_done=True).count(), 3)
+
+        self.post_bulk({"action": "open", "ids": ids[:2]})
+        self.assertEqual(
+            list(Task.objects.filter(is_done=True).values_list("pk", flat=True)),
+            [ids[2]],
+        )
+
+    def test_update_query_count_does_not_grow_with_selection(self):
+        ids = [t.pk for t in self.tasks]
+        with CaptureQueriesContext(connection) as ctx:
+            self.post_bulk({"action": "done", "ids": ids})
+        updates = [
+            q
+            for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "tasks_task" ')
+        ]
+        self.assertEqual(len(updates), 1)
+
+    def test_delete_in_chunks(self):
+        ids = [t.pk for t in self.tasks[:4]]
+        selected = Task.objects.filter(pk__in=ids)
+        self.assertEqual(bulk.delete_tasks(selected, chunk_size=3), 4)
+        self.assertEqual(list(Task.objects.all()), [self.tasks[4]])
+
+    def test_create_from_pasted_list(self):
+        res = self.post_bulk(
+            {"action": "create", "titles": "First new\n\nok\nbulk 0\nSecond new\n"},
+            headers={"accept": "application/json"},
+        )
+        self.assertEqual(
+            res.json(),
+            {
+                "action": "create",
+                "count": 2,
+                "rejected": [
+                    {"line": 3, "error": "タイトルは3文字以上で入力してください。"},
+                    {"line": 4, "error": "同じタイトルのタスクが既に存在します。"},
+                ],
+            },
+        )
+        self.assertTrue(Task.objects.filter(title="Second new").exists())
+
+    def test_rejects_unknown_action_and_get(self):
+        self.assertEqual(self.post_bulk({"action": "explode"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("tasks:bulk")).status_code, 405)
+
+    def test_rejects_non_integer_ids(self):
+        task = Task.objects.create(title="Bulk kept")
+        for ids in (["abc"], [str(task.pk), "1.5"], [""]):
+            with self.subTest(ids=ids):
+                res = self.post_bulk({"action": "delete", "ids": ids})
+                self.assertEqual(res.status_code, 400)
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+
+    def test_redirects_back_to_filtered_list(self):
+        next_url = reverse("tasks:list") + "?status=open"
+        res = self.post_bulk({"action": "done", "ids": [], "next": next_url})
+        self.assertRedirects(res, next_url)
+        res = self.post_bulk({"action": "done", "next": "https://evil.example/"})
+        self.assertRedirects(res, reverse("tasks:list"))
+
+    def test_admin_actions(self):
+        admin_user = User.objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.force_login(admin_user)
+        url = reverse("admin:tasks_task_changelist")
+        ids = [t.pk for t in self.tasks]
+        self.client.post(url, {"action": "mark_done", "_selected_action": ids})
+        self.assertEqual(Task.objects.filter(is_done=True).count(), 5)
+        data = {"action": "delete_in_chunks", "_selected_action": ids[:2]}
+        res = self.client.post(url, data)
+        self.assertContains(res, "選択した2件のタスクを削除します。")
+        self.assertContains(res, 'name="action" value="delete_in_chunks"')
+        self.assertEqual(Task.objects.count(), 5)
+        res = self.client.post(url, {**data, "post": "yes"})
+        self.assertRedirects(res, url)
+        self.assertEqual(Task.objects.count(), 3)
+        # Select all: the confirmation keeps select_across.
+        data = {**data, "select_across": "1"}
+        res = self.client.post(url, data)
+        self.assertContains(res, "選択した3件のタスクを削除します。")
+        self.assertContains(res, 'name="select_across" value="1"')
+        self.client.post(url, {**data, "post": "yes"})
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskExportTests(TestCase):
+    def setUp(self):
+        Task.objects.create(title="会議資料を作成", description='引用 "quote", comma')
+        Task.objects.create(title="Closed task", is_done=True)
+
+    def test_ndjson_export_streams_filtered_rows(self):
+        res = self.client.get(reverse("tasks:export"), {"status": "open"})
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r["title"] for r in records], ["会議資料を作成"])
+        self.assertEqual(records[0]["description"], '引用 "quote", comma')
+
+    def test_csv_export_with_search_and_gzip(self):
+        res = self.client.get(
+            reverse("tasks:export"), {"format": "csv", "q": "資料", "gzip": "1"}
+        )
+        self.assertEqual(res["Content-Type"], "application/gzip")
+        self.assertIn('filename="tasks.csv.gz"', res["Content-Disposition"])
+        body = gzip.decompress(b"".join(res.streaming_content)).decode()
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(
+            rows[0], ["id", "title", "description", "is_done", "created_at"]
+        )
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2], '引用 "quote", comma')
+
+    def test_rejects_unknown_format(self):
+        res = self.client.get(reverse("tasks:export"), {"format": "xml"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command("export_tasks", "--status=done", "--chunk-size=1", stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["title"] for r in records], ["Closed task"])
+
+    def test_blocks_group_lines(self):
+        blocks = list(export.iter_blocks(["a\n"] * 10, block_size=4))
+        self.assertEqual(blocks, [b"a\na\n"] * 5)
+
+
+class TaskImportTests(TestCase):
+    def write_input(self, name, content):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = Path(tmpdir.name) / name
+        if name.endswith(".gz"):
+            path.write_bytes(gzip.compress(content.encode()))
+        else:
+            path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def test_ndjson_import_applies_form_rules_per_batch(self):
+        Task.objects.create(title="Existing task")
+        path = self.write_input(
+            "tasks.ndjson",
+            "\n".join(
+                [
+                    json.dumps({"title": "  資料作成  ", "is_done": True}),
+                    json.dumps({"title": "ok"}),
+                    json.dumps({"title": "existing TASK"}),
+                    "{not json",
+                    json.dumps({"title": "Same text", "description": "same TEXT"}),
+                    json.dumps({"title": "資料作成"}),
+                    json.dumps({"title": "Another task"}),
+                ]
+            ),
+        )
+        rejects = path + ".rejects"
+        out = StringIO()
+        call_command(
+            "import_tasks", path, "--batch-size=3", f"--rejects={rejects}", stdout=out
+        )
+        self.assertIn("2 inserted, 5 rejected, 7 processed", out.getvalue())
+        self.assertIn("bulk_create", out.getvalue())
+        self.assertTrue(Task.objects.get(title="資料作成").is_done)
+        self.assertTrue(Task.objects.filter(title="Another task").exists())
+        with open(rejects, encoding="utf-8") as fh:
+            errors = [json.loads(line) for line in fh]
+        self.assertEqual(
+            errors,
+            [
+                {"line": 2, "error": "タイトルは3文字以上で入力してください。"},
+                {"line": 3, "error": "同じタイトルのタスクが既に存在します。"},
+                {"line": 4, "error": "行を解析できません。"},
+                {"line": 5, "error": "タイトルと説明を同じ内容にはできません。"},
+                {"line": 6, "error": "同じタイトルのタスクが既に存在します。"},
+            ],
+        )
+
+    def test_gzipped_csv_round_trips_export(self):
+        Task.objects.create(title="Exported", description="with, comma", is_done=True)
+        exported = b"".join(
+            export.stream(Task.objects.all(), "csv", compress=False)
+        ).decode()
+        Task.objects.all().delete()
+        path = self.write_input("tasks.csv.gz", exported)
+        call_command("import_tasks", path, stdout=StringIO())
+        task = Task.objects.get()
+        self.assertEqual(
+            (task.title, task.description, task.is_done),
+            ("Exported", "with, comma", True),
+        )
+
+    def test_unknown_extension_requires_format(self):
+        path = self.write_input("tasks.txt", "")
+        with self.assertRaises(CommandError):
+            call_command("import_tasks", path, stdout=StringIO())
+
+
+class TaskConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.task = Task.objects.create(title="Stable task")
+        Task.objects.create(title="Other task", is_done=True)
+
+    def revalidate(self, url, first, **params):
+        return self.client.get(url, params, headers={"if-none-match": first["ETag"]})
+
+    def test_list_sends_validators(self):
+        res = self.client.get(reverse("tasks:list"))
+        self.assertTrue(res["ETag"].startswith('W/"'))
+        self.assertTrue(res.has_header("Last-Modified"))
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_unchanged_list_is_not_modified_without_rendering(self):
+        url = reverse("tasks:list")
+        first = self.client.get(url, {"status": "open"})
+        with self.assertNumQueries(0):
+            res = self.revalidate(url, first, status="open")
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res.templates, [])
+        self.assertEqual(res["ETag"], first["ETag"])
+
+    @override_settings(TASKS_PAGE_CACHE_TIMEOUT=0)
+    def test_state_is_one_aggregate_query_without_cache(self):
+        url = reverse("tasks:list")
+        first = self.client.get(url)
+        with self.assertNumQueries(1):
+            res = self.revalidate(url, first)
+        self.assertEqual(res.status_code, 304)
+
+    def test_filters_and_pages_get_their_own_etag(self):
+        url = reverse("tasks:list")
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first, status="done").status_code, 200)
+        self.assertEqual(self.revalidate(url, first, page="1").status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        url = reverse("tasks:list")
+        first = self.client.get(url)
+        self.client.post(reverse("tasks:toggle", args=[self.task.pk]))
+        second = self.client.get(url)
+        res = self.revalidate(url, first)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], first["ETag"])
+
+        Task.objects.filter(title="Other task").delete()
+        self.assertEqual(self.revalidate(url, second).status_code, 200)
+
+    def test_pending_messages_force_a_full_response(self):
+        url = reverse("tasks:list")
+        first = self.client.get(url)
+        # Selecting nothing queues a message without writing anything.
+        self.client.post(reverse("tasks:bulk"), {"action": "done"})
+        res = self.revalidate(url, first)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["ETag"], first["ETag"])
+        self.assertContains(res, "0件のタスクを完了にしました。")
+
+    @override_settings(TASKS_PAGINATION="cursor")
+    def test_cursor_list_revalidates_without_counting(self):
+        url = reverse("tasks:list")
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.revalidate(url, first)
+        self.assertEqual(res.status_code, 304)
+        self.assertFalse(
+            any("COUNT(" in q["sql"].upper() for q in ctx.captured_queries)
+        )
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_edit_views_use_the_task_validators(self):
+        for name in ("tasks:update", "tasks:delete"):
+            url = reverse(name, args=[self.task.pk])
+            first = self.client.get(url)
+            res = self.revalidate(url, first)
+            self.assertEqual(res.status_code, 304)
+            self.assertEqual(res.templates, [])
+
+        url = reverse("tasks:update", args=[self.task.pk])
+        first = self.client.get(url)
+        bulk.set_done(Task.objects.filter(pk=self.task.pk), is_done=True)
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_queryset_update_stamps_updated_at(self):
+        before = self.task.updated_at
+        Task.objects.filter(pk=self.task.pk).update(description="changed")
+        self.task.refresh_from_db()
+        self.assertGreater(self.task.updated_at, before)
+
+
+class AsyncTaskViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        for idx in range(12):
+            Task.objects.create(title=f"Task {idx}", is_done=idx == 0)
+
+    async def get_list(self, **params):
+        request = self.factory.get(reverse("tasks:list"), params)
+        return await async_views.AsyncTaskListView.as_view()(request)
+
+    async def test_list_paginates_like_sync_view(self):
+        res = await self.get_list()
+        html = res.content.decode()
+        self.assertIn("Task 11</strong>", html)
+        self.assertNotIn("Task 1</strong>", html)
+        self.assertEqual(res["X-Tasks-Cache"], "MISS")
+
+        res = await self.get_list(page="2")
+        self.assertIn("Task 0</strong>", res.content.decode())
+        res = await self.get_list()
+        self.assertEqual(res["X-Tasks-Cache"], "HIT")
+
+    async def test_list_filters_and_search(self):
+        res = await self.get_list(status="done")
+        self.assertIn("Task 0</strong>", res.content.decode())
+        self.assertNotIn("Task 1</strong>", res.content.decode())
+        res = await self.get_list(q="Task 7")
+        self.assertIn("Task 7</strong>", res.content.decode())
+        self.assertNotIn("Task 8</strong>", res.content.decode())
+
+    async def test_invalid_page_is_404(self):
+        with self.assertRaises(Http404):
+            await self.get_list(page="99")
+
+    @override_settings(TASKS_PAGINATION="cursor")
+    async def test_cursor_mode(self):
+        res = await self.get_list()
+        self.assertIn("cursor=", res.content.decode())
+        self.assertIn("古いタスク", res.content.decode())
+
+    async def test_list_not_modified(self):
+        first = await self.get_list(status="open")
+        request = self.factory.get(
+            reverse("tasks:list"),
+            {"status": "open"},
+            headers={"if-none-match": first["ETag"]},
+        )
+        res = await async_views.AsyncTaskListView.as_view()(request)
+        self.assertEqual(res.status_code, 304)
+
+    async def test_list_loads_session_messages_off_the_event_loop(self):
+        def flash():
+            request = RequestFactory().get("/")
+            request.session = SessionStore()
+            storage = SessionStorage(request)
+            storage.add(messages.SUCCESS, "タスクを更新しました。")
+            storage.update(HttpResponse())
+            request.session.save()
+            return request.session.session_key
+
+        session_key = await sync_to_async(flash)()
+        # As after an update POST with DJANGO_MESSAGE_STORE=session; the
+        # session is not loaded yet and loading it queries the database.
+        request = self.factory.get(reverse("tasks:list"))
+        request.session = SessionStore(session_key)
+        request._messages = SessionStorage(request)
+        res = await async_views.AsyncTaskListView.as_view()(request)
+        self.assertContains(res, "タスクを更新しました。")
+
+    async def test_toggle_and_fragment(self):
+        task = await Task.objects.aget(title="Task 3")
+        request = self.factory.post(
+            reverse("tasks:toggle", args=[task.pk]),
+            headers={"accept": "application/json"},
+        )
+        res = await async_views.toggle_done(request, pk=task.pk)
+        self.assertEqual(json.loads(res.content)["is_done"], True)
+
+        request = self.factory.get(reverse("tasks:item", args=[task.pk]))
+        res = await async_views.task_item(request, pk=task.pk)
+        self.assertIn('data-is-done="true"', res.content.decode())
+
+
+class StaticAssetTests(TestCase):
+    storages = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {
+            "BACKEND": (
+                "django_sample_app.tasks.assets.CompressedManifestStaticFilesStorage"
+            )
+        },
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        cls.enterClassContext(
+            override_settings(
+                STATIC_ROOT=cls.static_root,
+                STORAGES=cls.storages,
+                TASKS_SERVE_STATIC=True,
+            )
+        )
+        call_command(
+            "collectstatic", interactive=False, verbosity=0, ignore_patterns=["admin"]
+        )
+        manifest = json.loads((cls.static_root / "staticfiles.json").read_text())
+        cls.hashed_css = manifest["paths"]["css/main.css"]
+        cls.original_css = (Path("static") / "css" / "main.css").read_bytes()
+
+    def get_css(self, name=None, **headers):
+        return self.client.get(f"/static/{name or self.hashed_css}", headers=headers)
+
+    def test_collectstatic_writes_compressed_variants(self):
+        hashed = self.static_root / self.hashed_css
+        self.assertRegex(self.hashed_css, r"^css/main\.[0-9a-f]{12}\.css$")
+        gz = hashed.with_name(hashed.name + ".gz")
+        self.assertEqual(gzip.decompress(gz.read_bytes()), self.original_css)
+
+    def test_pages_link_vendored_bootstrap(self):
+        res = self.client.get(reverse("tasks:list"))
+        self.assertNotContains(res, "cdn.jsdelivr.net")
+        self.assertRegex(
+            res.content.decode(),
+            r"/static/vendor/bootstrap/css/bootstrap\.min\.[0-9a-f]{12}\.css",
+        )
+
+    def test_hashed_asset_is_immutable_and_gzipped(self):
+        res = self.get_css(accept_encoding="gzip, deflate")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res["Vary"], "Accept-Encoding")
+        self.assertEqual(res["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertTrue(res["Content-Type"].startswith("text/css"))
+        self.assertEqual(gzip.decompress(res.content), self.original_css)
+
+    @skipUnless(assets.brotli is not None, "brotli is not installed (brotli extra)")
+    def test_brotli_preferred_when_accepted(self):
+        br = self.static_root / f"{self.hashed_css}.br"
+        self.assertEqual(assets.brotli.decompress(br.read_bytes()), self.original_css)
+        res = self.get_css(accept_encoding="gzip, br")
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertEqual(res["Vary"], "Accept-Encoding")
+        self.assertEqual(res["Content-Length"], str(br.stat().st_size))
+        self.assertTrue(res["ETag"].endswith('-br"'))
+        self.assertEqual(res.content, br.read_bytes())
+        self.assertEqual(assets.brotli.decompress(res.content), self.original_css)
+
+    def test_identity_when_encodings_refused(self):
+        res = self.get_css(accept_encoding="gzip;q=0, br;q=0")
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(res.content, self.original_css)
+        self.assertEqual(res["Content-Length"], str(len(self.original_css)))
+
+    def test_unhashed_name_is_revalidated(self):
+        res = self.get_css("css/main.css")
+        self.assertEqual(res["Cache-Control"], "public, max-age=60")
+
+    def test_if_none_match_and_head(self):
+        first = self.get_css(accept_encoding="gzip")
+        res = self.get_css(accept_encoding="gzip", if_none_match=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], first["ETag"])
+
+        res = self.client.head(f"/static/{self.hashed_css}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["Content-Length"], str(len(self.original_css)))
+
+    def test_unknown_path_falls_through(self):
+        self.assertEqual(self.get_css("css/missing.css").status_code, 404)
+
+    def test_accept_encoding_parsing(self):
+        self.assertEqual(
+            assets.parse_accept_encoding("gzip;q=0.5, *;q=0"),
+            {"gzip": 0.5, "*": 0.0, "br": 0.0},
+        )
+
+    async def test_async_middleware(self):
+        async def get_response(request):
+            return HttpResponse(status=404)
+
+        middleware = assets.StaticAssetsMiddleware(get_response)
+        request = AsyncRequestFactory().get(
+            f"/static/{self.hashed_css}", headers={"accept-encoding": "gzip"}
+        )
+        res = await middleware(request)
+        self.assertEqual(gzip.decompress(res.content), self.original_css)
+        res = await middleware(AsyncRequestFactory().get("/static/css/missing.css"))
+        self.assertEqual(res.status_code, 404)
+
+
+class SessionStorageTests(TestCase):
+    engines = {
+        "db": "django.contrib.sessions.backends.db",
+        "cached_db": "django.contrib.sessions.backends.cached_db",
+        "cache": "django.contrib.sessions.backends.cache",
+        "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+    }
+
+    def setUp(self):
+        Task.objects.create(title="Read me")
+        self.user = User.objects.create_superuser("admin", "a@example.com", "pw")
+
+    def session_queries(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("tasks:list"), params)
+        self.assertEqual(res.status_code, 200)
+        return [q["sql"] for q in ctx.captured_queries if "django_session" in q["sql"]]
+
+    def test_plain_list_get_skips_session_table(self):
+        for store, engine in self.engines.items():
+            with self.subTest(store=store), override_settings(SESSION_ENGINE=engine):
+                self.client = self.client_class()
+                self.assertEqual(self.session_queries(), [])
+                # Even a client holding a session (e.g. from the admin).
+                self.client.force_login(self.user)
+                self.assertEqual(self.session_queries(status="open"), [])
+
+    def test_list_after_flash_message_skips_session_table(self):
+        for store, engine in self.engines.items():
+            with self.subTest(store=store), override_settings(SESSION_ENGINE=engine):
+                self.client = self.client_class()
+                self.client.post(reverse("tasks:create"), {"title": f"New {store}"})
+                res = self.client.get(reverse("tasks:list"))
+                self.assertContains(res, "タスクを作成しました。")
+                self.assertEqual(self.session_queries(), [])
+
+    @override_settings(
+        MESSAGE_STORAGE="django.contrib.messages.storage.session.SessionStorage"
+    )
+    def test_cached_session_messages_skip_session_table(self):
+        for store in ("cached_db", "cache", "signed_cookies"):
+            engine = self.engines[store]
+            with self.subTest(store=store), override_settings(SESSION_ENGINE=engine):
+                self.client = self.client_class()
+                self.client.post(reverse("tasks:create"), {"title": f"New {store}"})
+                res = self.client.get(reverse("tasks:list"))
+                self.assertContains(res, "タスクを作成しました。")
+                self.assertEqual(self.session_queries(), [])
+
+    @override_settings(
+        MESSAGE_STORAGE="django.contrib.messages.storage.session.SessionStorage"
+    )
+    def test_db_session_messages_read_the_table(self):
+        self.client.post(reverse("tasks:create"), {"title": "New db"})
+        self.client.get(reverse("tasks:list"))
+        self.assertNotEqual(self.session_queries(), [])
+
+
+@override_settings(TASKS_EVENTS=True)
+class TaskEventTests(TestCase):
+    def setUp(self):
+        events.reset_broker()
+        self.task = Task.objects.create(title="Watch me")
+
+    def published(self, func, *args, **kwargs):
+        with mock.patch.object(events.Broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                func(*args, **kwargs)
+        return [call.args[0] for call in publish.call_args_list]
+
+    def test_views_publish_after_commit(self):
+        sent = self.published(
+            self.client.post, reverse("tasks:toggle", args=[self.task.pk])
+        )
+        self.assertEqual(
+            sent,
+            [{"type": "toggled", "ids": [self.task.pk]}],
+        )
+        sent = self.published(
+            self.client.post, reverse("tasks:create"), {"title": "New"}
+        )
+        new = Task.objects.get(title="New")
+        self.assertEqual(sent, [{"type": "created", "ids": [new.pk]}])
+        sent = self.published(self.client.post, reverse("tasks:delete", args=[new.pk]))
+        self.assertEqual(sent, [{"type": "deleted", "ids": [new.pk]}])
+
+    def test_nothing_is_sent_on_rollback(self):
+        with mock.patch.object(events.Broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    sid = transaction.savepoint()
+                    Task.objects.create(title="Rolled back")
+                    transaction.savepoint_rollback(sid)
+                    transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        publish.assert_not_called()
+
+    @override_settings(TASKS_EVENTS=False)
+    def test_disabled_sends_nothing(self):
+        sent = self.published(self.task.save)
+        self.assertEqual(sent, [])
+
+    def test_bulk_writes_are_merged(self):
+        tasks = [Task.objects.create(title=f"Bulk {n}") for n in range(3)]
+        pks = [task.pk for task in tasks]
+        sent = self.published(bulk.set_done, Task.objects.filter(pk__in=pks), True)
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sent[0]["type"], "updated")
+        self.assertCountEqual(sent[0]["ids"], pks)
+        sent = self.published(bulk.delete_tasks, Task.objects.filter(pk__in=pks))
+        self.assertEqual(len(sent), 1)
+        self.assertCountEqual(sent[0]["ids"], pks)
+
+    def test_large_changes_become_reset(self):
+        sent = self.published(
+            bulk.create_tasks,
+            [Task(title=f"Many {n}") for n in range(events.MAX_IDS + 1)],
+        )
+        self.assertEqual(sent, [{"type": "reset"}])
+
+    async def test_slow_subscriber_gets_one_reset(self):
+        broker = events.Broker(events.LocalBackend, max_pending=3)
+        subscription = broker.subscribe()
+        for n in range(3):
+            broker.deliver(f"message {n}")
+        self.assertEqual(subscription.drain(), ["message 0", "message 1", "message 2"])
+        for n in range(10):
+            broker.deliver(f"message {n}")
+        self.assertLessEqual(len(subscription.pending), 3)
+        self.assertEqual(subscription.drain(), ['{"type":"reset"}'])
+        self.assertEqual(subscription.drain(), [])
+        broker.unsubscribe(subscription)
+        broker.deliver("ignored")
+        self.assertEqual(subscription.drain(), [])
+
+    async def test_stream_frames(self):
+        broker = events.Broker(events.LocalBackend, max_pending=8)
+        subscription = broker.subscribe()
+        frames = events.stream(subscription, heartbeat=0.01)
+        self.assertEqual(await anext(frames), "retry: 3000\n\n")
+        self.assertEqual(await anext(frames), ": keep-alive\n\n")
+        broker.publish({"type": "deleted", "ids": [1]})
+        self.assertEqual(await anext(frames), 'data: {"type":"deleted","ids":[1]}\n\n')
+        await frames.aclose()
+
+    async def test_events_view_streams(self):
+        request = AsyncRequestFactory().get(reverse("tasks:events"))
+        res = await async_views.task_events(request)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        self.assertEqual(res["Cache-Control"], "no-cache")
+        received = []
+
+        async def consume():
+            async for chunk in res:
+                received.append(chunk)
+
+        # The server cancels the response task when the client disconnects.
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(events.get_broker().subscribers), 1)
+        events.get_broker().publish({"type": "reset"})
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await consumer
+        self.assertEqual(received, [b"retry: 3000\n\n", b'data: {"type":"reset"}\n\n'])
+        self.assertEqual(events.get_broker().subscribers, set())
+
+    @override_settings(TASKS_EVENTS=False)
+    async def test_events_view_disabled(self):
+        request = AsyncRequestFactory().get(reverse("tasks:events"))
+        res = await async_views.task_events(request)
+        self.assertEqual(res.status_code, 204)
+
+    def test_list_links_the_stream(self):
+        res = self.client.get(reverse("tasks:list"))
+        self.assertContains(res, f'data-events-url="{reverse("tasks:events")}"')
+        self.assertContains(res, '<div id="task-results">')
+        with override_settings(TASKS_EVENTS=False):
+            cache.clear()
+            res = self.client.get(reverse("tasks:list"))
+        self.assertNotContains(res, "data-events-url")
+
+
+class TaskCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tasks = [
+            Task.objects.create(title=f"Counted {idx}", is_done=idx == 0)
+            for idx in range(4)
+        ]
+
+    def assertCounted(self, open_, done):
+        counts = counters.get()
+        self.assertEqual((counts.open, counts.done), (open_, done))
+        self.assertEqual(
+            (counts.open, counts.done),
+            (
+                Task.objects.filter(is_done=False).count(),
+                Task.objects.filter(is_done=True).count(),
+            ),
+        )
+
+    def test_every_write_path_keeps_counts(self):
+        self.assertCounted(3, 1)
+        task = self.tasks[1]
+        self.client.post(reverse("tasks:toggle", args=[task.pk]))
+        self.assertCounted(2, 2)
+        self.client.post(
+            reverse("tasks:update", args=[task.pk]),
+            {"title": task.title, "description": "", "is_done": ""},
+        )
+        self.assertCounted(3, 1)
+        self.client.post(reverse("tasks:create"), {"title": "Counted new"})
+        self.assertCounted(4, 1)
+        self.client.post(reverse("tasks:delete", args=[task.pk]))
+        self.assertCounted(3, 1)
+        ids = [t.pk for t in Task.objects.all()]
+        self.client.post(reverse("tasks:bulk"), {"action": "done", "ids": ids})
+        self.assertCounted(0, 4)
+        bulk.create_tasks([Task(title="Bulk one"), Task(title="Bulk two")])
+        self.assertCounted(2, 4)
+        Task.objects.filter(is_done=True).delete()
+        self.assertCounted(2, 0)
+        self.assertEqual(bulk.delete_tasks(Task.objects.all(), chunk_size=1), 2)
+        self.assertCounted(0, 0)
+
+    def test_save_paths_without_a_loaded_status(self):
+        task = self.tasks[1]
+        Task(
+            pk=task.pk, title=task.title, is_done=True, created_at=task.created_at
+        ).save()
+        self.assertCounted(2, 2)
+        task.title = "Counted renamed"
+        task.save(update_fields=["title"])
+        self.assertCounted(2, 2)
+        Task.objects.filter(pk=self.tasks[2].pk).only("pk").delete()
+        self.assertCounted(1, 2)
+
+    def test_form_save_after_concurrent_toggle(self):
+        task = self.tasks[1]
+        stale = Task.objects.get(pk=task.pk)
+        self.client.post(reverse("tasks:toggle", args=[task.pk]))
+        self.assertCounted(2, 2)
+        # Saving the stale instance as done does not move it a second time.
+        stale.is_done = True
+        stale.save()
+        self.assertCounted(2, 2)
+        # Saving it as open moves it back, although it was loaded as open.
+        stale = Task.objects.get(pk=task.pk)
+        Task.objects.filter(pk=task.pk).update(is_done=False)
+        counters.move(False, 1)
+        self.client.post(
+            reverse("tasks:update", args=[task.pk]),
+            {"title": task.title, "description": "", "is_done": ""},
+        )
+        self.assertCounted(3, 1)
+        stale.is_done = False
+        stale.save()
+        self.assertCounted(3, 1)
+
+    def test_bulk_set_done_reports_changed_rows(self):
+        self.assertEqual(bulk.set_done(Task.objects.all(), is_done=True), 3)
+        self.assertEqual(bulk.set_done(Task.objects.all(), is_done=True), 0)
+        self.assertCounted(0, 4)
+
+    def test_counts_roll_back_with_the_change(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Task.objects.create(title="Counted rollback")
+            bulk.set_done(Task.objects.all(), is_done=True)
+            raise RuntimeError
+        self.assertCounted(3, 1)
+
+    def test_missing_rows_are_rebuilt(self):
+        TaskCounter.objects.all().delete()
+        self.assertIsNone(counters.get())
+        # The list falls back to counting.
+        self.assertEqual(self.client.get(reverse("tasks:list")).status_code, 200)
+        Task.objects.create(title="Counted after flush")
+        self.assertCounted(4, 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        TaskCounter.objects.filter(status="open").update(count=99)
+        out = StringIO()
+        call_command("reconcile_task_counters", stdout=out)
+        self.assertIn("open: 99 -> 3", out.getvalue())
+        self.assertIn("1 counter(s) repaired.", out.getvalue())
+        self.assertCounted(3, 1)
+        out = StringIO()
+        call_command("reconcile_task_counters", stdout=out)
+        self.assertIn("Counters are up to date.", out.getvalue())
+
+    def test_list_reads_counts_without_counting(self):
+        for params in ({}, {"status": "open"}, {"status": "done", "page": "1"}):
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as ctx:
+                    res = self.client.get(reverse("tasks:list"), params)
+                self.assertFalse(
+                    any("COUNT(" in q["sql"].upper() for q in ctx.captured_queries)
+                )
+                self.assertContains(res, "すべて (4)")
+                self.assertContains(res, "未完了のみ (3)")
+                self.assertContains(res, "完了のみ (1)")
+        res = self.client.get(reverse("tasks:list"), {"q": "Counted"})
+        self.assertContains(res, "未完了のみ (3)")
+
+    def test_list_etag_changes_with_counts(self):
+        first = self.client.get(reverse("tasks:list"), {"status": "open"})
+        Task.objects.filter(pk=self.tasks[0].pk).delete()
+        res = self.client.get(
+            reverse("tasks:list"),
+            {"status": "open"},
+            headers={"if-none-match": first["ETag"]},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, "完了のみ (0)")
+
+    def test_admin_changelist_uses_counters(self):
+        user = User.objects.create_superuser("admin", "a@example.com", "pw")
+        self.client.force_login(user)
+        url = reverse("admin:tasks_task_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        counts = [q for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()]
+        self.assertEqual(counts, [])
+        self.assertContains(res, "4 tasks")
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, {"q": "Counted 1"})
+        counts = [q for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()]
+        # Only the filtered result is counted; the total comes from counters.
+        self.assertEqual(len(counts), 1)
+        self.assertContains(res, "全 4 件")
+
+
+class TaskArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.old = [
+            Task.objects.create(title=f"Archived {idx}", is_done=True)
+            for idx in range(3)
+        ]
+        self.recent = Task.objects.create(title="Recently done", is_done=True)
+        self.open = Task.objects.create(title="Still open")
+        Task.objects.filter(pk__in=[t.pk for t in self.old] + [self.open.pk]).update(
+            updated_at=timezone.now() - timedelta(days=100)
+        )
+
+    def archive(self, **kwargs):
+        cutoff = timezone.now() - timedelta(days=90)
+        return archive.archive_done_tasks(cutoff, **kwargs)
+
+    def test_moves_only_old_done_tasks(self):
+        logged = []
+        self.assertEqual(self.archive(batch_size=1, log=logged.append), 3)
+        self.assertEqual(len(logged), 3)
+        self.assertQuerySetEqual(
+            ArchivedTask.objects.order_by("id").values_list("id", "title"),
+            [(t.pk, t.title) for t in self.old],
+        )
+        self.assertEqual(
+            set(Task.objects.values_list("pk", flat=True)),
+            {self.recent.pk, self.open.pk},
+        )
+        counts = counters.get()
+        self.assertEqual((counts.open, counts.done), (1, 1))
+        # Running again finds nothing left to move.
+        self.assertEqual(self.archive(), 0)
+
+    @override_settings(TASKS_EVENTS=True)
+    def test_each_batch_invalidates_and_announces_itself(self):
+        seen = []
+        with mock.patch.object(events, "_send") as send:
+            self.archive(
+                batch_size=1,
+                log=lambda line: seen.append(
+                    (page_cache.get_version(), send.call_count)
+                ),
+            )
+        versions, sent = zip(*seen)
+        self.assertEqual(len(set(versions)), 3)
+        self.assertEqual(sent, (1, 2, 3))
+        self.assertEqual(
+            [call.args[0] for call in send.call_args_list],
+            [{"type": "deleted", "ids": [t.pk]} for t in self.old],
+        )
+
+    def test_skips_tasks_changed_since_they_were_picked(self):
+        cutoff = timezone.now() - timedelta(days=90)
+        pks = [t.pk for t in self.old]
+        Task.objects.filter(pk=pks[0]).update(is_done=False)
+        Task.objects.filter(pk=pks[1]).update(updated_at=timezone.now())
+        self.assertEqual(archive.archive_batch(pks, cutoff), 1)
+        self.assertEqual(
+            list(ArchivedTask.objects.values_list("id", flat=True)), [pks[2]]
+        )
+
+    def test_list_includes_archive_on_request(self):
+        self.archive()
+        res = self.client.get(reverse("tasks:list"), {"status": "done"})
+        self.assertNotContains(res, "Archived 0")
+        self.assertContains(res, "Recently done")
+        res = self.client.get(
+            reverse("tasks:list"), {"status": "done", "archived": "1"}
+        )
+        tasks = list(res.context["tasks"])
+        self.assertEqual(
+            [t.title for t in tasks],
+            ["Recently done", "Archived 2", "Archived 1", "Archived 0"],
+        )
+        self.assertEqual([t.archived for t in tasks], [False, True, True, True])
+        self.assertEqual(res.context["page_obj"].paginator.count, 4)
+        self.assertContains(res, "Archived</span>", count=3)
+        # Only done tasks are archived, so other filters ignore the flag.
+        res = self.client.get(reverse("tasks:list"), {"archived": "1"})
+        self.assertNotContains(res, "Archived 0")
+
+    def test_search_covers_archive(self):
+        self.archive()
+        res = self.client.get(
+            reverse("tasks:list"),
+            {"status": "done", "archived": "1", "q": "Archived 1"},
+        )
+        self.assertEqual([t.title for t in res.context["tasks"]], ["Archived 1"])
+
+    def test_export_includes_archive_on_request(self):
+        self.archive()
+        res = self.client.get(
+            reverse("tasks:export"), {"status": "done", "archived": "1"}
+        )
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        out = StringIO()
+        call_command("export_tasks", "--status=done", "--archived", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+        with self.assertRaises(CommandError):
+            call_command("export_tasks", "--archived", stdout=StringIO())
+
+    def test_archive_command(self):
+        out = StringIO()
+        call_command("archive_tasks", "--older-than=90d", "--dry-run", stdout=out)
+        self.assertIn("3 task(s) would be archived.", out.getvalue())
+        self.assertEqual(ArchivedTask.objects.count(), 0)
+        out = StringIO()
+        call_command("archive_tasks", "--older-than=12w", "--batch-size=2", stdout=out)
+        self.assertIn("3 task(s) archived", out.getvalue())
+        for bad in ("--older-than=soon", "--older-than=90d --batch-size=0"):
+            with self.subTest(args=bad), self.assertRaises(CommandError):
+                call_command("archive_tasks", *bad.split(), stdout=StringIO())
+
+    def test_parse_age(self):
+        self.assertEqual(archive.parse_age("90d"), timedelta(days=90))
+        self.assertEqual(archive.parse_age("12h"), timedelta(hours=12))
+        self.assertEqual(archive.parse_age("2w"), timedelta(weeks=2))
+        self.assertEqual(archive.parse_age("30"), timedelta(days=30))
+        with self.assertRaises(ValueError):
+            archive.parse_age("-1d")
+
+
+class TaskJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.jobs_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jobs_dir, ignore_errors=True)
+        settings = override_settings(
+            TASKS_JOBS_DIR=self.jobs_dir, TASKS_JOBS_INLINE_LIMIT=2
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def work(self):
+        return jobs.work("test-worker", burst=True)
+
+    def test_bulk_action_above_limit_is_queued(self):
+        ids = [Task.objects.create(title=f"Queued {n}").pk for n in range(3)]
+        res = self.client.post(
+            reverse("tasks:bulk"),
+            {"action": "done", "ids": ids},
+            headers={"accept": "application/json"},
+        )
+        self.assertEqual(res.status_code, 202)
+        job = Job.objects.get(pk=res.json()["job"])
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertFalse(Task.objects.filter(is_done=True).exists())
+
+        self.assertEqual(self.work(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual((job.progress, job.total), (3, 3))
+        self.assertEqual(job.result["count"], 3)
+        self.assertEqual(job.message, "3件のタスクを完了にしました。")
+        self.assertEqual(Task.objects.filter(is_done=True).count(), 3)
+        self.assertEqual(counters.get().done, 3)
+
+        res = self.client.get(reverse("tasks:job", args=[job.pk]))
+        self.assertContains(res, "完了")
+        self.assertNotContains(res, 'http-equiv="refresh"')
+        res = self.client.get(
+            reverse("tasks:job", args=[job.pk]),
+            headers={"accept": "application/json"},
+        )
+        self.assertEqual(res.json()["status"], "succeeded")
+
+    def test_small_bulk_action_runs_inline(self):
+        task = Task.objects.create(title="Inline")
+        res = self.client.post(
+            reverse("tasks:bulk"), {"action": "done", "ids": task.pk}
+        )
+        self.assertRedirects(res, reverse("tasks:list"))
+        self.assertFalse(Job.objects.exists())
+
+    def test_export_job_writes_a_download(self):
+        Task.objects.create(title="Exported open")
+        Task.objects.create(title="Exported done", is_done=True)
+        res = self.client.post(
+            reverse("tasks:job_export"), {"format": "csv", "status": "open"}
+        )
+        job = Job.objects.get()
+        self.assertRedirects(res, reverse("tasks:job", args=[job.pk]))
+        res = self.client.get(reverse("tasks:job", args=[job.pk]))
+        self.assertContains(res, 'http-equiv="refresh"')
+        self.assertEqual(
+            self.client.get(reverse("tasks:job_download", args=[job.pk])).status_code,
+            404,
+        )
+
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.result["rows"], 1)
+        res = self.client.get(reverse("tasks:job_download", args=[job.pk]))
+        self.assertIn('filename="tasks.csv"', res["Content-Disposition"])
+        rows = list(csv.reader(StringIO(b"".join(res.streaming_content).decode())))
+        self.assertEqual([row[1] for row in rows], ["title", "Exported open"])
+        # The partial file was renamed into place.
+        self.assertEqual(os.listdir(self.jobs_dir), [job.result["file"]])
+
+    def test_failed_job_is_retried_then_fails(self):
+        job = jobs.enqueue("bulk", {"action": "bogus"}, max_attempts=2)
+        self.assertEqual(self.work(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("Unknown bulk action", job.error)
+        # Backed off: not runnable yet.
+        self.assertEqual(self.work(), 0)
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(self.work(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claim_never_hands_out_a_job_twice(self):
+        first = jobs.enqueue("archive", {"older_than": "1d"})
+        second = jobs.enqueue("archive", {"older_than": "1d"})
+        self.assertEqual(jobs.claim("a"), first)
+        self.assertEqual(jobs.claim("b"), second)
+        self.assertIsNone(jobs.claim("c"))
+        first.refresh_from_db()
+        self.assertEqual(
+            (first.status, first.worker, first.attempts), ("running", "a", 1)
+        )
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue("archive", {"older_than": "1d"}, max_attempts=1)
+        other = jobs.enqueue("archive", {"older_than": "1d"})
+        jobs.claim("lost")
+        jobs.claim("lost")
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 2)
+        job.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(other.status, Job.QUEUED)
+
+    def test_job_taken_over_is_not_finished_twice(self):
+        def take_over(job, progress):
+            Job.objects.filter(pk=job.pk).update(status=Job.QUEUED)
+            self.assertEqual(jobs.claim("other"), job)
+            if job.params["report"]:
+                progress(1, 1)
+            return {"done": True}
+
+        for report in (True, False):
+            with (
+                self.subTest(report=report),
+                mock.patch.dict(jobs.HANDLERS, {"take_over": take_over}),
+            ):
+                job = jobs.enqueue("take_over", {"report": report})
+                self.assertEqual(self.work(), 1)
+                job.refresh_from_db()
+                # Neither the heartbeat nor the outcome of the first worker
+                # overwrote the second one's claim.
+                self.assertEqual((job.status, job.worker), (Job.RUNNING, "other"))
+                self.assertEqual((job.progress, job.result), (0, None))
+
+    def test_bulk_job_commits_chunk_by_chunk(self):
+        ids = [Task.objects.create(title=f"Chunked {n}").pk for n in range(3)]
+        job = jobs.enqueue("bulk", {"action": "done", "ids": ids, "batch_size": 2})
+        saved = []
+        save_owned = jobs.save_owned
+
+        def record(job, *fields):
+            saved.append((job.progress, Task.objects.filter(is_done=True).count()))
+            save_owned(job, *fields)
+
+        with (
+            mock.patch.object(jobs.Progress, "interval", 0),
+            mock.patch.object(jobs, "save_owned", side_effect=record),
+        ):
+            self.assertEqual(self.work(), 1)
+        self.assertEqual(saved[:3], [(0, 0), (2, 2), (3, 3)])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result["count"]), (Job.SUCCEEDED, 3))
+        self.assertEqual(counters.get().done, 3)
+
+        job = jobs.enqueue(
+            "bulk", {"action": "create", "titles": "New 1\nNew 1\nNew 2"}
+        )
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual((job.result["count"], job.result["rejected"]), (2, 1))
+        self.assertEqual(job.result["rejects"][0]["line"], 2)
+
+    def test_commands_enqueue_and_workers_run_them(self):
+        old = Task.objects.create(title="Old done", is_done=True)
+        Task.objects.filter(pk=old.pk).update(
+            updated_at=timezone.now() - timedelta(days=10)
+        )
+        path = Path(self.jobs_dir, "in.ndjson")
+        path.write_text('{"title": "Imported"}\n{"title": ""}\n', encoding="utf-8")
+        out = StringIO()
+        call_command("archive_tasks", "--older-than=1w", "--enqueue", stdout=out)
+        call_command("import_tasks", str(path), "--enqueue", stdout=out)
+        self.assertEqual(out.getvalue().count("Queued job"), 2)
+        self.assertEqual(ArchivedTask.objects.count(), 0)
+
+        out = StringIO()
+        call_command("run_workers", "--burst", stdout=out)
+        self.assertIn("2 job(s) run.", out.getvalue())
+        archive_job, import_job = Job.objects.order_by("id")
+        self.assertEqual(archive_job.result, {"archived": 1})
+        self.assertEqual(import_job.result["inserted"], 1)
+        self.assertEqual(import_job.result["rejected"], 1)
+        self.assertTrue(Task.objects.filter(title="Imported").exists())
+        self.assertEqual(ArchivedTask.objects.get().pk, old.pk)
+
+        res = self.client.get(reverse("tasks:jobs"))
+        self.assertContains(res, "archive")
+        self.assertContains(res, "import")
+
+    def test_run_workers_rejects_bad_pool_sizes(self):
+        with self.assertRaises(CommandError):
+            call_command("run_workers", "--threads=0", stdout=StringIO())
@@ -0,0 +1,188 @@
+"""Per-request timing: database queries, template rendering and total time.
+
+``RequestTimingMiddleware`` samples ``TASKS_TIMING_SAMPLE_RATE`` of requests.
+For a sampled request it collects every query (through a wrapper registered
+with each connection's ``execute_wrappers``, the mechanism behind
+``connection.execute_wrapper()``) and the time spent in top-level template
+renders, then adds a ``Server-Timing`` header and logs one JSON line. Requests
+slower than ``TASKS_TIMING_SLOW_MS`` are logged as warnings with their SQL.
+
+The recorder lives in a context variable, so queries run by async views in
+``sync_to_async`` threads are attributed to the right request. With a sample
+rate of 0 the middleware removes itself and nothing is patched or wrapped.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_recorder: ContextVar[Recorder | None] = ContextVar("tasks_timing", default=None)
+_installed = False
+
+
+@dataclass
+class Recorder:
+    started: float = field(default_factory=time.perf_counter)
+    queries: list[tuple[str, str, float]] = field(default_factory=list)
+    template_time: float = 0.0
+    template_depth: int = 0
+
+    @property
+    def db_time(self) -> float:
+        return sum(duration for _, _, duration in self.queries)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        alias = context["connection"].alias
+        recorder.queries.append((alias, sql, time.perf_counter() - started))
+
+
+def _add_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _wrap_open_connections(**kwargs):
+    # Connections are per thread; request_started runs in the thread that
+    # serves the request (the sync thread for ASGI), so wrap whatever it has.
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(connection)
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        recorder = _recorder.get()
+        if recorder is None:
+            return render(self, context)
+        # Only the outermost render counts; includes are part of it.
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_time += time.perf_counter() - started
+
+    wrapper.__wrapped__ = render
+    return wrapper
+
+
+def install() -> None:
+    """Hook query and template timing in once per process."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_wrapper)
+    request_started.connect(_wrap_open_connections)
+    _wrap_open_connections()
+    Template.render = _timed_render(Template.render)
+
+
+def server_timing(recorder: Recorder, total: float) -> str:
+    queries = len(recorder.queries)
+    return ", ".join(
+        [
+            f'db;dur={recorder.db_time * 1000:.2f};desc="{queries} queries"',
+            f"tpl;dur={recorder.template_time * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ]
+    )
+
+
+def log_request(request, response, recorder: Recorder, total: float) -> None:
+    aliases: dict[str, int] = {}
+    for alias, _, _ in recorder.queries:
+        aliases[alias] = aliases.get(alias, 0) + 1
+    record = {
+        "event": "request",
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "total_ms": round(total * 1000, 2),
+        "db_ms": round(recorder.db_time * 1000, 2),
+        "queries": len(recorder.queries),
+        "databases": aliases,
+        "template_ms": round(recorder.template_time * 1000, 2),
+    }
+    slow_ms = getattr(settings, "TASKS_TIMING_SLOW_MS", 500)
+    if slow_ms and total * 1000 >= slow_ms:
+        record["sql"] = [
+            {"db": alias, "ms": round(duration * 1000, 2), "sql": sql}
+            for alias, sql, duration in recorder.queries
+        ]
+        record["event"] = "slow_request"
+        logger.warning(json.dumps(record, ensure_ascii=False))
+    else:
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, "TASKS_TIMING_SAMPLE_RATE", 0.0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder)
+
+    def finish(self, request, response, recorder: Recorder):
+        # Streaming bodies are produced later; this covers the view only.
+        total = time.perf_counter() - recorder.started
+        response["Server-Timing"] = server_timing(recorder, total)
+        log_request(request, response, recorder, total)
+        return response
@@ -15,16 +15,35 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+from .replicas import use_replicas
 
 app_name = "tasks"
 
+if getattr(settings, "TASKS_ASYNC_VIEWS", False):
+    list_view = use_replicas(async_views.AsyncTaskListView.as_view())
+    toggle_view = async_views.toggle_done
+    item_view = async_views.task_item
+else:
+    list_view = use_replicas(views.TaskListView.as_view())
+    toggle_view = views.toggle_done
+    item_view = views.task_item
+
 urlpatterns = [
-    path("", views.TaskListView.as_view(), name="list"),
+    path("", list_view, name="list"),
     path("create/", views.TaskCreateView.as_view(), name="create"),
+    path("bulk/", views.bulk_action, name="bulk"),
+    path("export/", use_replicas(views.export_tasks), name="export"),
     path("<int:pk>/update/", views.TaskUpdateView.as_view(), name="update"),
     path("<int:pk>/delete/", views.TaskDeleteView.as_view(), name="delete"),
-    path("<int:pk>/toggle/", views.toggle_done, name="toggle"),
+    path("<int:pk>/toggle/", toggle_view, name="toggle"),
+    path("<int:pk>/fragment/", item_view, name="item"),
+    path("events/", async_views.task_events, name="events"),
+    path("jobs/", views.job_list, name="jobs"),
+    path("jobs/export/", views.enqueue_export, name="job_export"),
+    path("jobs/<int:pk>/", views.job_detail, name="job"),
+    path("jobs/<int:pk>/download/", views.job_download, name="job_download"),
 ]
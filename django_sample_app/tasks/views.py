@@ -1,12 +1,29 @@
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.messages.views import SuccessMessageMixin
-from django.db.models import Q
-from django.shortcuts import get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import require_GET, require_POST
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
+from . import archive, bulk, conditional, counters, events, export, jobs
+from . import cache as page_cache
 from .forms import TaskForm
-from .models import Task
+from .models import DUPLICATE_TITLE_MESSAGE, Job, Task, is_duplicate_title_error
+from .pagination import CursorPaginator, InvalidCursor, WindowedPaginator
+
+JOB_LIST_SIZE = 50
 
 
 class TaskListView(ListView):
@@ -14,41 +31,162 @@ class TaskListView(ListView):
     template_name = "tasks/task_list.html"
     context_object_name = "tasks"
     paginate_by = 10
+    paginator_class = WindowedPaginator
+    pagination_mode = None
+    results_template_name = "tasks/partials/task_results.html"
+    page_cache_status = None
+    list_state = None
+    cursor_page = None
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        status = self.request.GET.get("status")
-        if status == "open":
-            queryset = queryset.filter(is_done=False)
-        elif status == "done":
-            queryset = queryset.filter(is_done=True)
-
-        query = (self.request.GET.get("q") or "").strip()
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) | Q(description__icontains=query)
+    def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        if self.uses_cursor_pagination():
+            # Cursor pages never count; validate against the page's own rows.
+            self.cursor_page = self.paginate_by_cursor(self.object_list)
+            self.list_state = conditional.page_state(
+                self.cursor_page, counters.get(self.object_list.db)
             )
+        else:
+            self.list_state = conditional.list_state(self.object_list, request.GET)
+        etag = conditional.list_etag(
+            request.GET, self.get_pagination_mode(), self.list_state
+        )
+        last_modified = self.list_state["last_modified"]
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            response = self.render_to_response(self.get_context_data())
+        return conditional.set_validators(response, etag, last_modified)
+
+    def get_pagination_mode(self):
+        return self.pagination_mode or getattr(settings, "TASKS_PAGINATION", "offset")
 
+    def uses_cursor_pagination(self):
+        return self.get_pagination_mode() == "cursor"
+
+    def get_paginate_by(self, queryset):
+        if self.uses_cursor_pagination():
+            return None
+        return super().get_paginate_by(queryset)
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, **kwargs)
+        if self.list_state and "count" in self.list_state:
+            # The conditional GET check already counted the filtered set.
+            paginator.count = self.list_state["count"]
+        return paginator
+
+    def paginate_by_cursor(self, queryset):
+        paginator = CursorPaginator(queryset, self.paginate_by)
+        try:
+            return paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor as exc:
+            raise Http404("無効なカーソルです。") from exc
+
+    def get_queryset(self):
+        query = (self.request.GET.get("q") or "").strip()
+        queryset = (
+            super().get_queryset().filter_list(self.request.GET.get("status"), query)
+        )
+        if self.includes_archived():
+            queryset = archive.union_archived(queryset, query)
+        if query and not self.uses_cursor_pagination():
+            queryset = queryset.order_by("-search_rank", "-created_at", "-id")
         return queryset
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def includes_archived(self):
+        # Cursor pages filter the queryset, which a UNION does not allow.
+        return (
+            archive.wants_archived(self.request.GET)
+            and not self.uses_cursor_pagination()
+        )
+
+    def get_filter_context(self):
         current_status = self.request.GET.get("status", "all")
         query = (self.request.GET.get("q") or "").strip()
         params = self.request.GET.copy()
         params.pop("page", None)
-        context.update(
-            {
-                "current_status": current_status,
-                "query": query,
-                "active_filters": {"status": current_status, "query": query},
-                "query_urlencode": params.urlencode(),
-            }
-        )
+        params.pop("cursor", None)
+        return {
+            "current_status": current_status,
+            "query": query,
+            "active_filters": {"status": current_status, "query": query},
+            "query_urlencode": params.urlencode(),
+            "events_url": reverse("tasks:events") if settings.TASKS_EVENTS else "",
+            "status_counts": (self.list_state or {}).get("counts"),
+            "include_archived": self.includes_archived(),
+        }
+
+    def render_results(self, filters, **kwargs):
+        """Query, paginate and render the task list and its pagination nav."""
+        if self.uses_cursor_pagination():
+            if self.cursor_page is None:
+                self.cursor_page = self.paginate_by_cursor(self.object_list)
+            kwargs.setdefault("object_list", self.cursor_page.object_list)
+        context = super().get_context_data(**kwargs)
+        context.update(filters, cursor_page=self.cursor_page)
+        if context.get("is_paginated"):
+            context["page_links"] = context["paginator"].window(
+                context["page_obj"].number
+            )
+        return render_to_string(self.results_template_name, context, self.request)
+
+    def get_context_data(self, **kwargs):
+        context = self.get_filter_context()
+        if page_cache.is_enabled():
+            key = page_cache.page_key(self.request.GET, self.get_pagination_mode())
+            results_html = page_cache.get_page(key)
+            self.page_cache_status = "MISS" if results_html is None else "HIT"
+            if results_html is None:
+                results_html = self.render_results(context, **kwargs)
+                page_cache.set_page(key, results_html)
+        else:
+            results_html = self.render_results(context, **kwargs)
+        context.update({"view": self, "results_html": mark_safe(results_html)})
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        if self.page_cache_status:
+            response["X-Tasks-Cache"] = self.page_cache_status
+        return response
+
+
+class TaskFormMixin:
+    """Flash ``success_message`` after a save.
+
+    A concurrent duplicate-title insert becomes the usual form error.
+    """
+
+    success_message = ""
+
+    def form_valid(self, form):
+        try:
+            with transaction.atomic():
+                response = super().form_valid(form)
+        except IntegrityError as exc:
+            if not is_duplicate_title_error(exc):
+                raise
+            form.add_error("title", DUPLICATE_TITLE_MESSAGE)
+            return self.form_invalid(form)
+        # Lean nodes (DJANGO_APP_PROFILE) have no messages app; skip the flash.
+        messages.success(self.request, self.success_message, fail_silently=True)
+        return response
 
-class TaskCreateView(SuccessMessageMixin, CreateView):
+
+class ConditionalObjectMixin:
+    """Answer GETs of a single task's page with ETag / Last-Modified."""
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        etag = conditional.task_etag(self.object)
+        last_modified = self.object.updated_at
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            response = self.render_to_response(self.get_context_data())
+        return conditional.set_validators(response, etag, last_modified)
+
+
+class TaskCreateView(TaskFormMixin, CreateView):
     model = Task
     form_class = TaskForm
     template_name = "tasks/task_form.html"
@@ -56,7 +194,7 @@ class TaskCreateView(SuccessMessageMixin, CreateView):
     success_message = "タスクを作成しました。"
 
 
-class TaskUpdateView(SuccessMessageMixin, UpdateView):
+class TaskUpdateView(ConditionalObjectMixin, TaskFormMixin, UpdateView):
     model = Task
     form_class = TaskForm
     template_name = "tasks/task_form.html"
@@ -64,23 +202,221 @@ class TaskUpdateView(SuccessMessageMixin, UpdateView):
     success_message = "タスクを更新しました。"
 
 
-class TaskDeleteView(DeleteView):
+class TaskDeleteView(ConditionalObjectMixin, DeleteView):
     model = Task
     template_name = "tasks/task_confirm_delete.html"
     success_url = reverse_lazy("tasks:list")
 
     def delete(self, request, *args, **kwargs):
         response = super().delete(request, *args, **kwargs)
-        messages.success(request, "タスクを削除しました。")
+        messages.success(request, "タスクを削除しました。", fail_silently=True)
         return response
 
 
-def toggle_done(request, pk):
+def wants_json(request):
+    accept = request.headers.get("Accept", "")
+    return accept.split(",")[0].strip().startswith("application/json")
+
+
+def is_fetch(request):
+    return request.headers.get("X-Requested-With") in {"fetch", "XMLHttpRequest"}
+
+
+@require_GET
+def export_tasks(request):
+    """Stream the (filtered) task list as NDJSON or CSV, optionally gzipped."""
+    fmt = request.GET.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return HttpResponseBadRequest(
+            "format は ndjson または csv を指定してください。"
+        )
+    compress = request.GET.get("gzip") in {"1", "true", "on"}
+    # Bind the database now: the rows are read after the view has returned.
+    queryset = Task.objects.using(router.db_for_read(Task)).filter_list(
+        request.GET.get("status"), request.GET.get("q")
+    )
+    if archive.wants_archived(request.GET):
+        queryset = archive.union_archived(queryset, request.GET.get("q"))
+
+    filename = f"tasks.{fmt}" + (".gz" if compress else "")
+    response = StreamingHttpResponse(
+        export.stream(queryset, fmt, compress=compress),
+        content_type="application/gzip" if compress else export.FORMATS[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_POST
+def bulk_action(request):
+    """Apply one operation to many tasks in a single request and transaction.
+
+    Selections larger than ``TASKS_JOBS_INLINE_LIMIT`` run as a background
+    job instead; the response then points at the job's status page.
+    """
+    action = request.POST.get("action")
+    if action not in bulk.ACTION_MESSAGES:
+        return HttpResponseBadRequest("不明な操作です。")
+
+    try:
+        ids = [int(pk) for pk in request.POST.getlist("ids")]
+    except ValueError:
+        return HttpResponseBadRequest("ids は整数で指定してください。")
+    titles = request.POST.get("titles", "")
+    size = len(bulk.title_lines(titles)) if action == "create" else len(ids)
+    if jobs.should_enqueue(size):
+        job = jobs.enqueue("bulk", {"action": action, "ids": ids, "titles": titles})
+        status_url = reverse("tasks:job", args=[job.pk])
+        if wants_json(request):
+            return JsonResponse(
+                {"action": action, "job": job.pk, "status_url": status_url},
+                status=202,
+            )
+        messages.info(
+            request,
+            f"{size}件の処理をバックグラウンドで実行します。",
+            fail_silently=True,
+        )
+        return redirect(status_url)
+
+    count, rejected = bulk.apply_action(action, ids, titles)
+    if wants_json(request):
+        return JsonResponse(
+            {
+                "action": action,
+                "count": count,
+                "rejected": [
+                    {"line": line, "error": error} for line, error in rejected
+                ],
+            }
+        )
+
+    messages.success(
+        request,
+        bulk.ACTION_MESSAGES[action].format(count=count),
+        fail_silently=True,
+    )
+    if rejected:
+        messages.warning(
+            request,
+            f"{len(rejected)}行をスキップしました（{rejected[0][1]}）。",
+            fail_silently=True,
+        )
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        next_url = reverse("tasks:list")
+    return redirect(next_url)
+
+
+@require_GET
+def task_item(request, pk):
+    """Render one task's list row, e.g. to refresh it in place."""
     task = get_object_or_404(Task, pk=pk)
-    task.is_done = not task.is_done
-    task.save()
+    return render(request, "tasks/partials/task_item.html", {"task": task})
+
+
+def toggle_response(request, task):
+    if wants_json(request):
+        return JsonResponse(
+            {"id": task.pk, "title": task.title, "is_done": task.is_done}
+        )
+    if is_fetch(request):
+        return render(request, "tasks/partials/task_item.html", {"task": task})
+
     messages.info(
         request,
         f"「{task.title}」を{'完了' if task.is_done else '未完了'}に切り替えました。",
+        fail_silently=True,
     )
     return redirect("tasks:list")
+
+
+def flip_done(pk):
+    """Toggle task ``pk`` and its counters in one transaction; ``None`` if gone."""
+    with transaction.atomic(using=router.db_for_write(Task)):
+        # A single UPDATE flips the flag in the database, so concurrent toggles
+        # never lose an update and no other column is rewritten.
+        if not Task.objects.filter(pk=pk).update(is_done=~F("is_done")):
+            return None
+        task = Task.objects.get(pk=pk)
+        counters.move(task.is_done, 1, task._state.db)
+        events.publish(events.TOGGLED, [pk], task._state.db)
+    return task
+
+
+@require_POST
+def toggle_done(request, pk):
+    task = flip_done(pk)
+    if task is None:
+        raise Http404("タスクが見つかりません。")
+    page_cache.bump_version()
+    return toggle_response(request, task)
+
+
+@require_GET
+def job_list(request):
+    """Show the most recent background jobs."""
+    recent = Job.objects.all()[:JOB_LIST_SIZE]
+    return render(request, "tasks/job_list.html", {"jobs": recent})
+
+
+def job_json(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "progress": job.progress,
+        "total": job.total,
+        "message": job.message,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at and job.finished_at.isoformat(),
+    }
+
+
+@require_GET
+def job_detail(request, pk):
+    """A job's status and progress, as a page that reloads itself or JSON."""
+    job = get_object_or_404(Job, pk=pk)
+    if wants_json(request):
+        return JsonResponse(job_json(job))
+    return render(request, "tasks/job_detail.html", {"job": job})
+
+
+@require_GET
+def job_download(request, pk):
+    """Serve the file written by a finished export job."""
+    job = get_object_or_404(Job, pk=pk, kind="export", status=Job.SUCCEEDED)
+    path = jobs.output_path(job, job.result["filename"])
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError as exc:
+        raise Http404("ファイルが見つかりません。") from exc
+    return FileResponse(
+        fh,
+        as_attachment=True,
+        filename=job.result["filename"],
+        content_type=job.result["content_type"],
+    )
+
+
+@require_POST
+def enqueue_export(request):
+    """Queue an export of the filtered list, to download when it is written."""
+    params = {
+        key: request.POST.get(key, "")
+        for key in ("format", "status", "q", "archived", "gzip")
+    }
+    if params["format"] not in export.FORMATS:
+        return HttpResponseBadRequest(
+            "format は ndjson または csv を指定してください。"
+        )
+    job = jobs.enqueue("export", params)
+    messages.info(
+        request, "エクスポートをバックグラウンドで開始しました。", fail_silently=True
+    )
+    return redirect("tasks:job", job.pk)
@@ -0,0 +1,126 @@
+"""Warm a server worker up before it accepts traffic.
+
+Right after a deploy or a worker recycle the first requests used to pay for
+everything that Django and the app do lazily: the database handshake
+(TCP, TLS with ``DJANGO_DB_SSL``, authentication), importing and compiling
+the URLconf, loading and compiling templates, and the first ORM queries.
+:func:`warm_up` does that work up front:
+
+- ``databases``: open every configured connection, filling the psycopg pool
+  to ``min_size`` where one is configured;
+- ``urls``: resolve and reverse the task list to populate the URL resolver;
+- ``templates``: compile the task templates into the cached loader;
+- ``canary``: render ``TaskListView`` once through a ``RequestFactory``.
+
+``gunicorn.conf.py`` calls :func:`on_startup` from ``post_worker_init`` and
+``asgi.py`` when the application is loaded; both are no-ops unless
+``TASKS_WARMUP`` is on. A failing step is logged and skipped: a worker that
+could not warm up still serves, it is just slower at first.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = (
+    "tasks/task_list.html",
+    "tasks/partials/task_results.html",
+    "tasks/partials/task_item.html",
+    "tasks/task_form.html",
+    "tasks/task_confirm_delete.html",
+)
+
+
+def open_databases() -> None:
+    for alias in connections:
+        connection = connections[alias]
+        try:
+            # Only the PostgreSQL backend has a pool (None when disabled).
+            pool = getattr(connection, "pool", None)
+            if pool is not None:
+                pool.open(wait=True, timeout=pool.timeout)
+            connection.ensure_connection()
+        except DatabaseError:
+            logger.warning("Warm-up could not connect to %r", alias, exc_info=True)
+
+
+def load_urls() -> None:
+    url = reverse("tasks:list")
+    get_resolver().resolve(url)
+
+
+def load_templates() -> None:
+    for name in TEMPLATES:
+        get_template(name)
+
+
+def render_canary() -> None:
+    from .views import TaskListView
+
+    request = RequestFactory().get(reverse("tasks:list"))
+    response = TaskListView.as_view()(request)
+    if hasattr(response, "render"):
+        response.render()
+    if response.status_code != 200:
+        raise RuntimeError(f"canary list render returned {response.status_code}")
+
+
+STEPS: dict[str, Callable[[], None]] = {
+    "databases": open_databases,
+    "urls": load_urls,
+    "templates": load_templates,
+    "canary": render_canary,
+}
+
+
+def warm_up() -> dict[str, float]:
+    """Run every step; return how long each took, in milliseconds."""
+    timings = {}
+    for name, step in STEPS.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(
+        "Worker warmed up: %s",
+        ", ".join(f"{name} {ms} ms" for name, ms in timings.items()),
+    )
+    return timings
+
+
+def _warm_up_in_thread() -> None:
+    try:
+        warm_up()
+    finally:
+        # This thread's connections are not reused; pooled ones go back.
+        connections.close_all()
+
+
+def on_startup() -> None:
+    """Warm up if ``TASKS_WARMUP`` is on; the server hooks call this."""
+    if not getattr(settings, "TASKS_WARMUP", False):
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        warm_up()
+        return
+    # ASGI servers load the application inside their event loop, where the
+    # ORM refuses synchronous queries; the loop is not serving yet.
+    thread = threading.Thread(target=_warm_up_in_thread, name="tasks-warmup")
+    thread.start()
+    thread.join()
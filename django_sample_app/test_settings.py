@@ -0,0 +1,20 @@
+"""Settings for the test suites (``manage.py test`` and pytest).
+
+The project settings plus a ``replica1`` alias, so that the test runner
+creates (and migrates) a second test database before it collects the
+databases each test class uses. It is never a mirror of ``default``, which
+is how a lagging replica looks; reads only go to it where a test sets
+``DATABASE_REPLICAS``.
+"""
+
+import copy
+
+from .settings import *  # noqa: F403
+from .settings import DATABASES
+
+if "replica1" not in DATABASES:
+    replica = copy.deepcopy(DATABASES["default"])
+    if not replica["ENGINE"].endswith("sqlite3"):
+        # SQLite test databases are in memory, one per alias.
+        replica["TEST"] = {"NAME": f"test_{replica['NAME']}_replica1"}
+    DATABASES["replica1"] = replica
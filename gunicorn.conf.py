@@ -0,0 +1,12 @@
+"""Gunicorn settings picked up from the project root (``gunicorn -c`` overrides).
+
+Command-line options still apply; this file only adds the worker warm-up.
+"""
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the application is loaded and before it
+    # accepts connections (see django_sample_app/tasks/warmup.py).
+    from django_sample_app.tasks import warmup
+
+    warmup.on_startup()
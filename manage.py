@@ -1,11 +1,17 @@
 #!/usr/bin/env python
 """Django's command-line utility for administrative tasks."""
+
 import os
 import sys
 
 
 def main():
     """Run administrative tasks."""
+    if sys.argv[1:2] == ["test"]:
+        # Adds the database aliases the test classes declare.
+        os.environ.setdefault(
+            "DJANGO_SETTINGS_MODULE", "django_sample_app.test_settings"
+        )
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_sample_app.settings")
     try:
         from django.core.management import execute_from_command_line
@@ -6,4 +6,135 @@ document.addEventListener("DOMContentLoaded", () => {
       toast.show();
     });
   }
+
+  const listForm = document.getElementById("task-list-form");
+  const selectAll = document.querySelector("[data-select-all]");
+  if (listForm && selectAll) {
+    selectAll.addEventListener("change", () => {
+      listForm.querySelectorAll("input[name=ids]").forEach((checkbox) => {
+        checkbox.checked = selectAll.checked;
+      });
+    });
+  }
+
+  // Swap in a freshly rendered row, or drop it when it no longer matches the
+  // active status filter.
+  const replaceRow = (item, html) => {
+    const template = document.createElement("template");
+    template.innerHTML = html.trim();
+    const updated = template.content.firstElementChild;
+    const status = item.closest("[data-status]")?.dataset.status;
+    const isDone = updated.dataset.isDone === "true";
+    if ((status === "open" && isDone) || (status === "done" && !isDone)) {
+      item.remove();
+    } else {
+      item.replaceWith(updated);
+    }
+  };
+
+  if (listForm && window.fetch) {
+    listForm.addEventListener("click", async (event) => {
+      const button = event.target.closest("[data-task-toggle]");
+      if (!button) {
+        return;
+      }
+      event.preventDefault();
+      button.disabled = true;
+
+      const item = button.closest("[data-task-id]");
+      const token = listForm.querySelector("[name=csrfmiddlewaretoken]");
+      try {
+        const response = await fetch(button.formAction, {
+          method: "POST",
+          headers: {
+            "X-CSRFToken": token ? token.value : "",
+            "X-Requested-With": "fetch",
+          },
+          credentials: "same-origin",
+        });
+        if (!response.ok) {
+          throw new Error(`toggle failed: ${response.status}`);
+        }
+        replaceRow(item, await response.text());
+      } catch (error) {
+        // Fall back to a regular form submission (redirect + full page).
+        button.disabled = false;
+        listForm.action = button.formAction;
+        listForm.submit();
+      }
+    });
+  }
+
+  // Live updates: the server pushes compact change events and the page only
+  // refetches what it shows (rows by id, or the results when rows appear).
+  const eventsUrl = listForm?.dataset.eventsUrl;
+  const results = document.getElementById("task-results");
+  if (eventsUrl && results && window.EventSource && window.fetch) {
+    const params = new URLSearchParams(window.location.search);
+    // New tasks can only show up on the newest page.
+    const showsNewest =
+      !params.get("cursor") && (params.get("page") || "1") === "1";
+    const rowUrl = (id) => listForm.dataset.itemUrl.replace("/0/", `/${id}/`);
+
+    let reloadTimer = null;
+    const reload = () => {
+      clearTimeout(reloadTimer);
+      reloadTimer = setTimeout(async () => {
+        const response = await fetch(window.location.href, {
+          credentials: "same-origin",
+        });
+        if (!response.ok) {
+          return;
+        }
+        const page = new DOMParser().parseFromString(
+          await response.text(),
+          "text/html",
+        );
+        const fresh = page.getElementById("task-results");
+        if (fresh) {
+          results.replaceChildren(...fresh.childNodes);
+        }
+      }, 250);
+    };
+
+    const refreshRow = async (item) => {
+      const response = await fetch(rowUrl(item.dataset.taskId), {
+        credentials: "same-origin",
+      });
+      if (response.status === 404) {
+        item.remove();
+      } else if (response.ok) {
+        replaceRow(item, await response.text());
+      }
+    };
+
+    const source = new EventSource(eventsUrl);
+    source.addEventListener("message", (message) => {
+      const change = JSON.parse(message.data);
+      if (change.type === "reset" || (change.type === "created" && showsNewest)) {
+        reload();
+        return;
+      }
+      (change.ids || []).forEach((id) => {
+        const item = document.getElementById(`task-${id}`);
+        if (!item) {
+          return;
+        }
+        if (change.type === "deleted") {
+          item.remove();
+        } else {
+          refreshRow(item);
+        }
+      });
+    });
+
+    // Events sent while disconnected are lost; catch up after a reconnect.
+    let connected = false;
+    source.addEventListener("open", () => {
+      if (connected) {
+        reload();
+      }
+      connected = true;
+    });
+  }
 });
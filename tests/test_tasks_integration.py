@@ -1,6 +1,13 @@
 import pytest
 from django.urls import reverse
 
+from django_sample_app.tasks.budgets import (
+    DATASET_SIZES,
+    URL_BUDGETS,
+    assert_url_budget,
+    query_budget,
+    seed_tasks,
+)
 from django_sample_app.tasks.models import Task
 
 pytestmark = pytest.mark.django_db
@@ -57,8 +64,26 @@ def test_search_finds_title_and_description(client):
 def test_toggle_done_switches_state(client):
     task = Task.objects.create(title="Flip me")
 
-    response = client.get(reverse("tasks:toggle", args=[task.pk]))
+    response = client.post(reverse("tasks:toggle", args=[task.pk]))
 
     assert response.status_code == 302
     task.refresh_from_db()
     assert task.is_done is True
+
+
+@pytest.mark.parametrize("size", DATASET_SIZES)
+@pytest.mark.parametrize("budget", URL_BUDGETS, ids=lambda budget: budget.label)
+def test_url_stays_within_query_budget(client, budget, size):
+    seed_tasks(size)
+    task = Task.objects.create(title="Budget target")
+
+    assert_url_budget(client, budget, task)
+
+
+def test_list_queries_do_not_grow_with_page_size(client):
+    seed_tasks(30)
+
+    with query_budget(2, label="list page 3"):
+        response = client.get(reverse("tasks:list"), {"page": 3})
+
+    assert response.status_code == 200